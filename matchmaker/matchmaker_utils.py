@@ -6,11 +6,14 @@ from django.db.models import prefetch_related_objects, Q
 from reference_data.models import HumanPhenotypeOntology
 from matchmaker.models import MatchmakerSubmission, MatchmakerIncomingQuery, MatchmakerResult
 from seqr.utils.gene_utils import get_genes, get_gene_ids_for_gene_symbols, get_filtered_gene_ids
+from seqr.utils.hpo_utils import get_hpo_ontology, get_phenotype_similarity
 from seqr.views.utils.json_to_orm_utils import create_model_from_json
 from settings import MME_DEFAULT_CONTACT_INSTITUTION
 
 logger = logging.getLogger(__name__)
 
+PHENOTYPE_SIMILARITY_THRESHOLD = 0.7
+
 
 def get_mme_genes_phenotypes_for_results(results, **kwargs):
     return _get_mme_genes_phenotypes(
@@ -166,12 +169,15 @@ def get_mme_matches(patient_data, origin_request_host=None, user=None, originati
             'query_ids': list(genes_by_id.keys()),
             'filter_key': 'genomic_features',
             'id_filter_func': lambda gene_id: {'gene': {'id': gene_id}},
+            'get_match_ids': lambda match: [feature.get('gene', {}).get('id') for feature in match.genomic_features],
         }
     else:
         get_submission_kwargs = {
             'query_ids': feature_ids,
             'filter_key': 'features',
             'id_filter_func': lambda feature_id: {'id': feature_id, 'observed': 'yes'},
+            'get_match_ids': lambda match: [
+                feature['id'] for feature in match.features if feature.get('observed') == 'yes'],
         }
 
     query_patient_id = patient_data['patient']['id']
@@ -204,16 +210,24 @@ def get_mme_matches(patient_data, origin_request_host=None, user=None, originati
             for match_submission, score in scored_matches.items()], incoming_query
 
 
-def _get_matched_submissions(patient_id, get_match_genotype_score, get_match_phenotype_score, query_ids, filter_key, id_filter_func):
+def _get_matched_submissions(patient_id, get_match_genotype_score, get_match_phenotype_score, query_ids, filter_key, id_filter_func, get_match_ids):
     if not query_ids:
         # no valid entities found for provided features
         return {}
 
-    matches = []
+    # All submissions matching any of the queried ids are loaded in a single query, which uses the GIN index on the
+    # filtered field as an inverted index from gene/ phenotype id to submission
+    id_filter = Q()
     for item_id in query_ids:
-        matches += MatchmakerSubmission.objects.filter(deleted_date__isnull=True, **{
-            '{}__contains'.format(filter_key): [id_filter_func(item_id)]
-        }).exclude(submission_id=patient_id)
+        id_filter |= Q(**{'{}__contains'.format(filter_key): [id_filter_func(item_id)]})
+    matches = MatchmakerSubmission.objects.filter(id_filter, deleted_date__isnull=True).exclude(
+        submission_id=patient_id).order_by('id')
+
+    # return matches in the order of the first queried id they match
+    query_id_order = {item_id: i for i, item_id in enumerate(query_ids)}
+    matches = sorted(matches, key=lambda match: min(
+        query_id_order[item_id] for item_id in get_match_ids(match) if item_id in query_id_order
+    ))
 
     scored_matches = {}
     for match in matches:
@@ -232,7 +246,7 @@ def _get_matched_submissions(patient_id, get_match_genotype_score, get_match_phe
 def _get_genotype_score(genomic_features, match):
     match_features_by_gene_id = defaultdict(list)
     for feature in match.genomic_features:
-        match_features_by_gene_id[feature['gene']['id']].append(feature)
+        match_features_by_gene_id[feature.get('gene', {}).get('id')].append(feature)
 
     score = 0
     for feature in genomic_features:
@@ -263,11 +277,19 @@ def _is_same_variant(var1, var2):
 def _get_phenotype_score(hpo_ids, match):
     if not match.features:
         return 0.5
-    matched_hpo_ids = [
-        hpo_id for hpo_id in hpo_ids
-        if any(feature['id'] == hpo_id and feature.get('observed', 'yes') == 'yes' for feature in match.features)
-    ]
-    return float(len(matched_hpo_ids)) / len(hpo_ids) or 0.1
+    observed_hpo_ids = {feature['id'] for feature in match.features if feature.get('observed', 'yes') == 'yes'}
+    ontology = get_hpo_ontology()
+    score = 0
+    for hpo_id in hpo_ids:
+        if hpo_id in observed_hpo_ids:
+            score += 1
+        else:
+            # near-identical phenotypes are scored by their similarity
+            similarity = max(
+                [get_phenotype_similarity(hpo_id, observed_id, ontology) for observed_id in observed_hpo_ids] or [0])
+            if similarity >= PHENOTYPE_SIMILARITY_THRESHOLD:
+                score += similarity
+    return float(score) / len(hpo_ids) or 0.1
 
 
 def get_mme_metrics():
@@ -0,0 +1,22 @@
+# Generated by Django 3.1.10 on 2021-06-15 14:32
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matchmaker', '0003_auto_20201123_2111'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='matchmakersubmission',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['genomic_features'], name='mme_genomic_features_idx', opclasses=['jsonb_path_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='matchmakersubmission',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['features'], name='mme_features_idx', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
 from django.db.models import JSONField
 
 from seqr.models import ModelWithGUID, Individual
@@ -33,6 +34,12 @@ class MatchmakerSubmission(ModelWithGUID):
             'guid', 'created_date', 'last_modified_date', 'deleted_date'
         ]
 
+        # used to look up submissions by gene or phenotype for incoming match requests
+        indexes = [
+            GinIndex(fields=['genomic_features'], opclasses=['jsonb_path_ops'], name='mme_genomic_features_idx'),
+            GinIndex(fields=['features'], opclasses=['jsonb_path_ops'], name='mme_features_idx'),
+        ]
+
 
 class MatchmakerIncomingQuery(ModelWithGUID):
     institution = models.CharField(max_length=255)
@@ -4,7 +4,7 @@ import json
 from datetime import datetime
 from django.test import TestCase
 
-from matchmaker.models import MatchmakerIncomingQuery
+from matchmaker.models import MatchmakerIncomingQuery, MatchmakerSubmission
 
 TEST_ACCESS_TOKEN = 'erjhtg3558324u82'
 TEST_MME_NODES = {TEST_ACCESS_TOKEN: {'name': 'Test Node'}}
@@ -304,4 +304,38 @@ be found found at https://seqr.broadinstitute.org/matchmaker/disclaimer."""
         self.assertListEqual(response.json()['results'], [])
         self.assertEqual(MatchmakerIncomingQuery.objects.filter(institution='Test Institute').count(), 2)
 
+    @mock.patch('matchmaker.views.external_api.EmailMessage')
+    @mock.patch('matchmaker.views.external_api.safe_post_to_slack')
+    def test_mme_match_proxy_multiple_genes(self, mock_post_to_slack, mock_email):
+        url = '/api/matchmaker/v1/match'
+        request_body = {
+            'patient': {
+                'id': '12345',
+                'contact': {'institution': 'Test Institute', 'href': 'test@test.com', 'name': 'PI'},
+                'genomicFeatures': [
+                    {'gene': {'id': 'ENSG00000186092'}},
+                    {'gene': {'id': 'ENSG00000233750'}},
+                    {'gene': {'id': 'ENSG00000223972'}},
+                ],
+            }}
+
+        # Stored genomic features are not required to have a gene
+        submission = MatchmakerSubmission.objects.get(submission_id='P0004515')
+        submission.genomic_features.append({'variant': {'referenceName': '1', 'start': 248367227}})
+        submission.save()
+
+        with self.assertNumQueries(27):
+            response = self._make_mme_request(
+                url, 'post', content_type='application/json', data=json.dumps(request_body))
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
 
+        # each submission is returned once, even when it matches several of the queried genes
+        self.assertListEqual(
+            [result['patient']['id'] for result in results], ['P0004515', 'NA19675_1_01', 'P0004517'])
+        scores = [result['score'] for result in results]
+        self.assertAlmostEqual(scores[0]['_genotypeScore'], 0.7)
+        self.assertDictEqual(scores[0], {'_genotypeScore': scores[0]['_genotypeScore'], '_phenotypeScore': 0, 'patient': 0.7})
+        for score in scores[1:]:
+            self.assertAlmostEqual(score['_genotypeScore'], 0.2333, places=4)
+            self.assertDictEqual(score, {'_genotypeScore': score['_genotypeScore'], '_phenotypeScore': 0, 'patient': 0.2333})
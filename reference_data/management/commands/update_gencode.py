@@ -5,6 +5,7 @@ import os
 from tqdm import tqdm
 
 from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
 
 from reference_data.management.commands.utils.download_utils import download_file
 from reference_data.models import GeneInfo, TranscriptInfo, GENOME_VERSION_GRCh37, GENOME_VERSION_GRCh38
@@ -19,12 +20,16 @@ GENCODE_FILE_HEADER = [
     'chrom', 'source', 'feature_type', 'start', 'end', 'score', 'strand', 'phase', 'info'
 ]
 
+BATCH_SIZE = 50000
+
 
 class Command(BaseCommand):
     help = "Loads the GRCh37 and/or GRCh38 versions of the Gencode GTF from a particular Gencode release"
 
     def add_arguments(self, parser):
-        parser.add_argument('--reset', help="First drop any existing records from GeneInfo and TranscriptInfo", action="store_true")
+        parser.add_argument(
+            '--reset', action="store_true",
+            help="Sync GeneInfo and TranscriptInfo to this release, updating changed records and removing any records not in the release")
         parser.add_argument('--gencode-release', help="gencode release number (eg. 28)", type=int, required=True, choices=range(19, 32))
         parser.add_argument('gencode_gtf_path', nargs="?", help="(optional) gencode GTF file path. If not specified, it will be downloaded.")
         parser.add_argument('genome_version', nargs="?", help="gencode GTF file genome version", choices=[GENOME_VERSION_GRCh37, GENOME_VERSION_GRCh38])
@@ -45,9 +50,10 @@ def update_gencode(gencode_release, gencode_gtf_path=None, genome_version=None,
         gencode_release (int): the gencode release to load (eg. 25)
         gencode_gtf_path (str): optional local file path of gencode GTF file. If not provided, it will be downloaded.
         genome_version (str): '37' or '38'. Required only if gencode_gtf_path is specified.
-        reset (bool): If True, all records will be deleted from GeneInfo and TranscriptInfo before loading the new data.
-            Setting this to False can be useful to sequentially load more than one gencode release so that data in the
-            tables represents the union of multiple gencode releases.
+        reset (bool): If True, GeneInfo and TranscriptInfo will be synced to the new data: existing records which have
+            changed will be updated, and records which are not in the new data will be deleted. Setting this to False can
+            be useful to sequentially load more than one gencode release so that data in the tables represents the union
+            of multiple gencode releases.
     """
     if gencode_gtf_path and genome_version and os.path.isfile(gencode_gtf_path):
         if gencode_release == 19 and genome_version != GENOME_VERSION_GRCh37:
@@ -76,15 +82,14 @@ def update_gencode(gencode_release, gencode_gtf_path=None, genome_version=None,
             gencode_gtf_paths.update({genome_version: local_filename})
 
     if reset:
-        logger.info("Dropping the {} existing TranscriptInfo entries".format(TranscriptInfo.objects.count()))
-        TranscriptInfo.objects.all().delete()
-        logger.info("Dropping the {} existing GeneInfo entries".format(GeneInfo.objects.count()))
-        GeneInfo.objects.all().delete()
-
-    existing_gene_ids = {gene.gene_id for gene in GeneInfo.objects.all().only('gene_id')}
-    existing_transcript_ids = {
-        transcript.transcript_id for transcript in TranscriptInfo.objects.all().only('transcript_id')
-    }
+        # All records are parsed, so they can be compared to the existing ones once parsing is complete
+        existing_gene_ids = set()
+        existing_transcript_ids = set()
+    else:
+        existing_gene_ids = {gene.gene_id for gene in GeneInfo.objects.all().only('gene_id')}
+        existing_transcript_ids = {
+            transcript.transcript_id for transcript in TranscriptInfo.objects.all().only('transcript_id')
+        }
 
     counters = collections.defaultdict(int)
     new_genes = collections.defaultdict(dict)
@@ -142,6 +147,7 @@ def update_gencode(gencode_release, gencode_gtf_path=None, genome_version=None,
                         "gencode_gene_type": record["gene_type"],
                         "gencode_release": int(gencode_release),
                     })
+                    new_genes[record['gene_id']].setdefault(coding_region_size_field_name, 0)
 
                 elif record['feature_type'] == 'transcript':
                     if record["transcript_id"] in existing_transcript_ids:
@@ -156,6 +162,7 @@ def update_gencode(gencode_release, gencode_gtf_path=None, genome_version=None,
                         "end_grch{}".format(genome_version): record["end"],
                         "strand_grch{}".format(genome_version): record["strand"],
                     })
+                    new_transcripts[record['transcript_id']].setdefault(coding_region_size_field_name, 0)
 
                 elif record['feature_type'] == 'CDS':
                     if record["transcript_id"] in existing_transcript_ids:
@@ -170,18 +177,76 @@ def update_gencode(gencode_release, gencode_gtf_path=None, genome_version=None,
                             transcript_size > new_genes[record['gene_id']].get(coding_region_size_field_name, 0):
                         new_genes[record['gene_id']][coding_region_size_field_name] = transcript_size
 
-    logger.info('Creating {} GeneInfo records'.format(len(new_genes)))
-    counters["genes_created"] = len(new_genes)
-    GeneInfo.objects.bulk_create([GeneInfo(**record) for record in new_genes.values()])
-    gene_id_to_gene_info = {g.gene_id: g for g in GeneInfo.objects.all().only('gene_id')}
-
-    logger.info('Creating {} TranscriptInfo records'.format(len(new_transcripts)))
-    counters["transcripts_created"] = len(new_transcripts)
-    TranscriptInfo.objects.bulk_create([
-        TranscriptInfo(gene=gene_id_to_gene_info[record.pop('gene_id')], **record) for record in new_transcripts.values()
-    ], batch_size=50000)
+    with transaction.atomic(using=router.db_for_write(GeneInfo)):
+        if reset:
+            retired_gene_ids = _sync_records(GeneInfo, 'gene_id', new_genes, counters, 'genes')
+        else:
+            _create_records(GeneInfo, new_genes, counters, 'genes')
+        gene_id_to_pk = dict(GeneInfo.objects.values_list('gene_id', 'id'))
+
+        for record in new_transcripts.values():
+            record['gene_id'] = gene_id_to_pk[record['gene_id']]
+        if reset:
+            retired_transcript_ids = _sync_records(TranscriptInfo, 'transcript_id', new_transcripts, counters, 'transcripts')
+            _delete_records(TranscriptInfo, retired_transcript_ids, counters, 'transcripts')
+            _delete_records(GeneInfo, retired_gene_ids, counters, 'genes')
+        else:
+            _create_records(TranscriptInfo, new_transcripts, counters, 'transcripts')
 
     logger.info("Done")
     logger.info("Stats: ")
     for k, v in counters.items():
         logger.info("  %s: %s" % (k, v))
+
+
+def _create_records(model_cls, records_by_id, counters, record_type):
+    logger.info('Creating {} {} records'.format(len(records_by_id), model_cls.__name__))
+    counters['{}_created'.format(record_type)] = len(records_by_id)
+    model_cls.objects.bulk_create(
+        [model_cls(**record) for record in records_by_id.values()], batch_size=BATCH_SIZE)
+
+
+def _sync_records(model_cls, id_field, records_by_id, counters, record_type):
+    """Creates new records and updates any existing records whose parsed fields differ from the stored values.
+
+    Returns:
+        list: database ids of the existing records which are not present in the parsed records
+    """
+    fields = {field for record in records_by_id.values() for field in record.keys()}
+    existing_models = {
+        getattr(model, id_field): model for model in model_cls.objects.only(*fields).iterator(chunk_size=BATCH_SIZE)
+    }
+
+    new_records = {}
+    updated_models = []
+    update_fields = set()
+    for record_id, record in records_by_id.items():
+        model = existing_models.pop(record_id, None)
+        if not model:
+            new_records[record_id] = record
+            continue
+
+        changed_fields = [field for field, value in record.items() if getattr(model, field) != value]
+        if changed_fields:
+            for field in changed_fields:
+                setattr(model, field, record[field])
+            update_fields.update(changed_fields)
+            updated_models.append(model)
+        else:
+            counters['{}_unchanged'.format(record_type)] += 1
+
+    _create_records(model_cls, new_records, counters, record_type)
+
+    logger.info('Updating {} {} records'.format(len(updated_models), model_cls.__name__))
+    counters['{}_updated'.format(record_type)] = len(updated_models)
+    if updated_models:
+        model_cls.objects.bulk_update(updated_models, sorted(update_fields), batch_size=BATCH_SIZE)
+
+    return [model.id for model in existing_models.values()]
+
+
+def _delete_records(model_cls, ids, counters, record_type):
+    logger.info('Deleting {} {} records'.format(len(ids), model_cls.__name__))
+    counters['{}_deleted'.format(record_type)] = len(ids)
+    for i in range(0, len(ids), BATCH_SIZE):
+        model_cls.objects.filter(id__in=ids[i:i + BATCH_SIZE]).delete()
@@ -3,12 +3,16 @@ import os
 import gzip
 from tqdm import tqdm
 from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
 from reference_data.management.commands.utils.download_utils import download_file
 from reference_data.management.commands.utils.gene_utils import get_genes_by_symbol_and_id
 from reference_data.models import GeneInfo
 
 logger = logging.getLogger(__name__)
 
+# Number of parsed records held in memory and inserted at a time, for handlers that do not specify a batch_size
+DEFAULT_BATCH_SIZE = 10000
+
 
 class ReferenceDataHandler(object):
 
@@ -73,10 +77,38 @@ def update_records(reference_data_handler, file_path=None):
     model_cls = reference_data_handler.model_cls
     model_name = model_cls.__name__
     model_objects = getattr(model_cls, 'objects')
+    batch_size = reference_data_handler.batch_size or DEFAULT_BATCH_SIZE
+
+    def _create_models(models):
+        logger.info("Creating {} {} records".format(len(models), model_name))
+        model_objects.bulk_create(models, batch_size=batch_size)
+
+    # The existing records are replaced in a single transaction, so readers continue to see the previous version of the
+    # table until the new records are fully loaded
+    with transaction.atomic(using=router.db_for_write(model_cls)):
+        if not reference_data_handler.keep_existing_records:
+            logger.info("Deleting {} existing {} records".format(model_objects.count(), model_name))
+            model_objects.all().delete()
+
+        skip_counter = _load_models(reference_data_handler, file_path, _create_models, batch_size)
+
+    logger.info("Done")
+    logger.info("Loaded {} {} records from {}. Skipped {} records with unrecognized genes.".format(
+        model_objects.count(), model_name, file_path, skip_counter))
+    if skip_counter > 0:
+        logger.info('Running ./manage.py update_gencode to update the gencode version might fix missing genes')
 
-    if not reference_data_handler.keep_existing_records:
-        logger.info("Deleting {} existing {} records".format(model_objects.count(), model_name))
-        model_objects.all().delete()
+
+def _load_models(reference_data_handler, file_path, create_models, batch_size):
+    """
+    Parses the file and creates its models in batches of at most batch_size. Handlers which post-process their models
+    require every model to be parsed first, so for those all models are created together once parsing is complete.
+
+    Returns:
+        int: the number of records skipped because their gene was not found
+    """
+    model_cls = reference_data_handler.model_cls
+    post_process_models = reference_data_handler.post_process_models
 
     models = []
     skip_counter = 0
@@ -100,15 +132,14 @@ def update_records(reference_data_handler, file_path=None):
                     continue
 
                 models.append(model_cls(**record))
+                if len(models) >= batch_size and not post_process_models:
+                    create_models(models)
+                    models = []
 
-    if reference_data_handler.post_process_models:
-        reference_data_handler.post_process_models(models)
+    if post_process_models:
+        post_process_models(models)
 
-    logger.info("Creating {} {} records".format(len(models), model_name))
-    model_objects.bulk_create(models)
+    if models:
+        create_models(models)
 
-    logger.info("Done")
-    logger.info("Loaded {} {} records from {}. Skipped {} records with unrecognized genes.".format(
-        model_objects.count(), model_name, file_path, skip_counter))
-    if skip_counter > 0:
-        logger.info('Running ./manage.py update_gencode to update the gencode version might fix missing genes')
+    return skip_counter
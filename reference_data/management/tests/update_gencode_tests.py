@@ -186,25 +186,35 @@ class UpdateGencodeTest(TestCase):
         self.assertEqual(trans_info.gene.gene_id, 'ENSG00000284662')
 
         # Test normal command function with a --reset option
+        existing_gene_pk = GeneInfo.objects.get(gene_id='ENSG00000223972').id
         mock_logger.reset_mock()
         call_command('update_gencode', '--reset', '--gencode-release=31', self.temp_file_path, '37')
         calls = [
-            mock.call('Dropping the 2 existing TranscriptInfo entries'),
-            mock.call('Dropping the 50 existing GeneInfo entries'),
             mock.call(
                 'Loading {} (genome version: 37)'.format(self.temp_file_path)),
-            mock.call('Creating 2 GeneInfo records'),
-            mock.call('Creating 2 TranscriptInfo records'),
+            mock.call('Creating 0 GeneInfo records'),
+            mock.call('Updating 1 GeneInfo records'),
+            mock.call('Creating 0 TranscriptInfo records'),
+            mock.call('Updating 0 TranscriptInfo records'),
+            mock.call('Deleting 0 TranscriptInfo records'),
+            mock.call('Deleting 48 GeneInfo records'),
             mock.call('Done'),
             mock.call('Stats: '),
-            mock.call('  genes_created: 2'),
-            mock.call('  transcripts_created: 2')
+            mock.call('  genes_unchanged: 1'),
+            mock.call('  genes_created: 0'),
+            mock.call('  genes_updated: 1'),
+            mock.call('  transcripts_unchanged: 2'),
+            mock.call('  transcripts_created: 0'),
+            mock.call('  transcripts_updated: 0'),
+            mock.call('  transcripts_deleted: 0'),
+            mock.call('  genes_deleted: 48'),
         ]
         mock_logger.info.assert_has_calls(calls)
 
         self.assertEqual(GeneInfo.objects.all().count(), 2)
         gene_info = GeneInfo.objects.get(gene_id = 'ENSG00000223972')
         self.assertEqual(gene_info.gencode_release, 31)
+        self.assertEqual(gene_info.id, existing_gene_pk)
         gene_info = GeneInfo.objects.get(gene_id = 'ENSG00000284662')
         self.assertEqual(gene_info.start_grch37, 621059)
         self.assertEqual(gene_info.chrom_grch37, '1')
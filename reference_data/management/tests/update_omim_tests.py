@@ -139,13 +139,15 @@ class UpdateOmimTest(TestCase):
         with self.assertRaises(CommandError) as ce:
             call_command('update_omim', '--omim-key=test_key')
         self.assertEqual(str(ce.exception), 'Expected 1 omim entries but recieved 0')
+        # failed updates do not remove the existing records
+        self.assertEqual(Omim.objects.count(), 3)
 
         # Test without a file_path parameter
         mock_utils_logger.reset_mock()
         call_command('update_omim', '--omim-key=test_key')
 
         calls = [
-            mock.call('Deleting 0 existing Omim records'),
+            mock.call('Deleting 3 existing Omim records'),
             mock.call('Parsing file'),
             mock.call('Creating 2 Omim records'),
             mock.call('Done'),
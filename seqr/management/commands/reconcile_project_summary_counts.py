@@ -0,0 +1,19 @@
+import logging
+from django.core.management.base import BaseCommand
+from seqr.models import Project
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Recompute the project summary counts displayed on the dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', help='optional project to reconcile counts for')
+
+    def handle(self, *args, **options):
+        project_name = options['project']
+        project_ids = [Project.objects.get(name=project_name).id] if project_name else None
+        num_updated = Project.update_summary_counts(project_ids)
+        logger.info(u'Updated summary counts for {} out of date project(s) in {}'.format(
+            num_updated, project_name or 'all projects'))
@@ -36,5 +36,6 @@ class Command(BaseCommand):
 
         logger.info("Updating families")
         families.update(project=to_project)
+        Project.update_summary_counts([from_project.id, to_project.id])
 
         logger.info("Done.")
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from seqr.models import Project, Family, Individual
+
+PROJECT_NAME = '1kg project nåme with uniçøde'
+
+
+class ReconcileProjectSummaryCountsTest(TestCase):
+    fixtures = ['users', '1kg_project']
+
+    @mock.patch('seqr.management.commands.reconcile_project_summary_counts.logger')
+    def test_command(self, mock_logger):
+        call_command('reconcile_project_summary_counts')
+        mock_logger.info.assert_called_with('Updated summary counts for 0 out of date project(s) in all projects')
+
+        Project.objects.filter(guid='R0001_1kg').update(num_families=0, num_individuals=0)
+        Project.objects.filter(guid='R0003_test').update(num_saved_variants=10)
+
+        call_command('reconcile_project_summary_counts', '--project={}'.format(PROJECT_NAME))
+        mock_logger.info.assert_called_with('Updated summary counts for 1 out of date project(s) in {}'.format(PROJECT_NAME))
+        project = Project.objects.get(guid='R0001_1kg')
+        self.assertEqual(project.num_families, 11)
+        self.assertEqual(project.num_individuals, 14)
+        self.assertEqual(project.num_saved_variants, 4)
+        self.assertEqual(Project.objects.get(guid='R0003_test').num_saved_variants, 10)
+
+        call_command('reconcile_project_summary_counts')
+        mock_logger.info.assert_called_with('Updated summary counts for 1 out of date project(s) in all projects')
+        self.assertEqual(Project.objects.get(guid='R0003_test').num_saved_variants, 2)
+
+    def test_model_updates(self):
+        project = Project.objects.get(guid='R0001_1kg')
+        family = Family.objects.create(project=project, family_id='new_family')
+        for individual_id in ['a', 'b']:
+            Individual.objects.create(family=family, individual_id=individual_id)
+        project.refresh_from_db()
+        self.assertEqual(project.num_families, 12)
+        self.assertEqual(project.num_individuals, 16)
+
+        Individual.bulk_delete(None, family=family)
+        project.refresh_from_db()
+        self.assertEqual(project.num_individuals, 14)
+
+        family.delete_model(user=None, user_can_delete=True)
+        project.refresh_from_db()
+        self.assertEqual(project.num_families, 11)
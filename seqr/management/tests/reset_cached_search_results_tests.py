@@ -5,6 +5,7 @@ from django.core.management import call_command
 from django.test import TestCase
 
 from seqr.models import Family, VariantSearchResults
+from seqr.utils.elasticsearch.utils import get_search_results_fingerprint
 
 PROJECT_NAME = '1kg project n\u00e5me with uni\u00e7\u00f8de'
 EMPTY_PROJECT_NAME = 'Empty Project'
@@ -17,18 +18,24 @@ class ResetCachedSearchResultsTest(TestCase):
     def setUpTestData(cls):
         result = VariantSearchResults.objects.create(search_hash='abc', variant_search_id=1)
         result.families.set(Family.objects.filter(pk=1))
-        cls.result_guid = result.guid
+        other_result = VariantSearchResults.objects.create(search_hash='def', variant_search_id=1)
+        other_result.families.set(Family.objects.filter(pk__in=[1, 2]))
+        cls.result_fingerprints = sorted([
+            get_search_results_fingerprint(result), get_search_results_fingerprint(other_result)])
 
-    @mock.patch('seqr.views.utils.variant_utils.redis.StrictRedis')
+    @mock.patch('seqr.utils.redis_utils.redis.StrictRedis')
+    @mock.patch('seqr.views.utils.variant_utils.clear_local_index_metadata')
     @mock.patch('seqr.views.utils.variant_utils.logger')
     @mock.patch('seqr.management.commands.reset_cached_search_results.logger')
-    def test_command(self, mock_command_logger, mock_utils_logger, mock_redis):
+    def test_command(self, mock_command_logger, mock_utils_logger, mock_clear_local_metadata, mock_redis):
         mock_redis.return_value.keys.side_effect = lambda pattern: [pattern]
 
-        # Test command with a --project argument
-        call_command('reset_cached_search_results', '--project={}'.format(PROJECT_NAME))
-        mock_redis.return_value.delete.assert_called_with('search_results__{}*'.format(self.result_guid))
-        mock_utils_logger.info.assert_called_with('Reset 1 cached results')
+        # Test command with a --project argument, loading the fingerprints for all saved results at once
+        with self.assertNumQueries(3):
+            call_command('reset_cached_search_results', '--project={}'.format(PROJECT_NAME))
+        mock_redis.return_value.delete.assert_called_with(
+            *['search_results__{}*'.format(fingerprint) for fingerprint in self.result_fingerprints])
+        mock_utils_logger.info.assert_called_with('Reset 2 cached results')
         mock_command_logger.info.assert_called_with('Reset cached search results for {}'.format(PROJECT_NAME))
 
         # Test for empty project
@@ -44,12 +51,14 @@ class ResetCachedSearchResultsTest(TestCase):
         mock_redis.return_value.delete.assert_called_with('search_results__*')
         mock_utils_logger.info.assert_called_with('Reset 1 cached results')
         mock_command_logger.info.assert_called_with('Reset cached search results for all projects')
+        mock_clear_local_metadata.assert_not_called()
 
         # Test command for reset metadata
         mock_redis.reset_mock()
         call_command('reset_cached_search_results', '--reset-index-metadata')
         mock_redis.return_value.delete.assert_called_with('search_results__*', 'index_metadata__*')
         mock_utils_logger.info.assert_called_with('Reset 2 cached results')
+        mock_clear_local_metadata.assert_called_once()
         mock_command_logger.info.assert_called_with('Reset cached search results for all projects')
 
         # Test with connection error
@@ -2,7 +2,7 @@ from django.core.management import call_command
 from django.test import TestCase
 import mock
 
-from seqr.models import Family, VariantTagType, VariantTag
+from seqr.models import Family, VariantTagType, VariantTag, Project
 
 
 class TransferFamiliesTest(TestCase):
@@ -33,3 +33,12 @@ class TransferFamiliesTest(TestCase):
         new_tags = VariantTag.objects.filter(variant_tag_type=new_tag_type)
         self.assertEqual(len(new_tags), 1)
         self.assertEqual(new_tags[0].saved_variants.first().family, family)
+
+        from_project = Project.objects.get(guid='R0001_1kg')
+        self.assertEqual(from_project.num_families, 10)
+        self.assertEqual(from_project.num_individuals, 11)
+        self.assertEqual(from_project.num_saved_variants, 3)
+        to_project = Project.objects.get(guid='R0003_test')
+        self.assertEqual(to_project.num_families, 3)
+        self.assertEqual(to_project.num_individuals, 6)
+        self.assertEqual(to_project.num_saved_variants, 3)
@@ -0,0 +1,51 @@
+# Generated by Django 3.1.10 on 2021-06-01 12:00
+
+from django.db import migrations, models
+
+
+SUMMARY_COUNT_MODELS = [
+    ('Family', 'project_id', 'num_families'),
+    ('Individual', 'family__project_id', 'num_individuals'),
+    ('SavedVariant', 'family__project_id', 'num_saved_variants'),
+]
+
+
+def populate_project_summary_counts(apps, schema_editor):
+    Project = apps.get_model('seqr', 'Project')
+    db_alias = schema_editor.connection.alias
+    counts = {project_id: {} for project_id in Project.objects.using(db_alias).values_list('id', flat=True)}
+    for model_name, project_id_lookup, count_field in SUMMARY_COUNT_MODELS:
+        model_counts = apps.get_model('seqr', model_name).objects.using(db_alias).values(project_id_lookup).annotate(
+            count=models.Count('*'))
+        for agg in model_counts:
+            counts[agg[project_id_lookup]][count_field] = agg['count']
+
+    for project_id, project_counts in counts.items():
+        if project_counts:
+            Project.objects.using(db_alias).filter(id=project_id).update(**project_counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seqr', '0026_auto_20210521_1836'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='num_families',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='num_individuals',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='num_saved_variants',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(populate_project_summary_counts, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.10 on 2021-06-08 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seqr', '0027_auto_20210601_1200'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='family',
+            name='pedigree_image_hash',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from abc import abstractmethod
+from collections import defaultdict
 import uuid
 import json
 import logging
@@ -8,7 +9,7 @@ from django.contrib.auth.models import User, Group
 from django.contrib.postgres.fields import ArrayField
 from django.core.exceptions import PermissionDenied
 from django.db import models
-from django.db.models import options, ForeignKey, JSONField
+from django.db.models import options, ForeignKey, JSONField, Count, F
 from django.utils import timezone
 from django.utils.text import slugify as __slugify
 
@@ -45,6 +46,11 @@ class ModelWithGUID(models.Model):
     # used for optimistic concurrent write protection (to detect concurrent changes)
     last_modified_date = models.DateTimeField(null=True, blank=True,  db_index=True)
 
+    # For models which are included in the project summary counts, the lookup to the model's project id and the
+    # project field the model is counted in
+    PROJECT_ID_LOOKUP = None
+    PROJECT_SUMMARY_COUNT_FIELD = None
+
     class Meta:
         abstract = True
 
@@ -94,20 +100,38 @@ class ModelWithGUID(models.Model):
             self.guid = self._compute_guid()[:ModelWithGUID.MAX_GUID_SIZE]
             super(ModelWithGUID, self).save()
 
+            self._increment_project_summary_counts([self])
+
     def delete_model(self, user, user_can_delete=False):
         """Helper delete method that logs the deletion"""
         if not (user_can_delete or self.created_by == user):
             raise PermissionDenied('User does not have permission to delete this {}'.format(type(self).__name__))
+        project_id = self._get_project_id() if self.PROJECT_ID_LOOKUP else None
         self.delete()
         log_model_update(logger, self, user, 'delete')
+        if project_id:
+            Project.update_summary_counts([project_id])
 
     @classmethod
     def bulk_create(cls, user, new_models):
-        """Helper bulk create method that logs the creation"""
+        """Helper bulk create method that logs the creation. As in save, guids are computed from the created ids for
+        any models that do not already have a guid"""
+        current_time = timezone.now()
+        compute_guid_models = []
         for model in new_models:
             model.created_by = user
+            if not model.guid:
+                # use a unique temporary guid until the id is generated, to avoid conflicts within the batch
+                model.guid = uuid.uuid4().hex[:ModelWithGUID.MAX_GUID_SIZE]
+                model.last_modified_date = current_time
+                compute_guid_models.append(model)
         models = cls.objects.bulk_create(new_models)
+        if compute_guid_models:
+            for model in compute_guid_models:
+                model.guid = model._compute_guid()[:ModelWithGUID.MAX_GUID_SIZE]
+            cls.objects.bulk_update(compute_guid_models, ['guid'])
         log_model_bulk_update(logger, models, user, 'create')
+        cls._increment_project_summary_counts(models)
         return models
 
     @classmethod
@@ -126,7 +150,31 @@ class ModelWithGUID(models.Model):
         if queryset is None:
             queryset = cls.objects.filter(**filter_kwargs)
         log_model_bulk_update(logger, queryset, user, 'delete')
-        return queryset.delete()
+        project_ids = set(queryset.values_list(cls.PROJECT_ID_LOOKUP, flat=True)) if cls.PROJECT_ID_LOOKUP else None
+        deleted = queryset.delete()
+        if project_ids:
+            Project.update_summary_counts(project_ids)
+        return deleted
+
+    def _get_project_id(self):
+        value = self
+        for field in self.PROJECT_ID_LOOKUP.split('__'):
+            value = getattr(value, field)
+        return value
+
+    @classmethod
+    def _increment_project_summary_counts(cls, new_models):
+        """Counts for new models are incremented in place. Deletions cascade to related models, so the counts for
+        any projects with deleted models are recomputed instead"""
+        if not cls.PROJECT_ID_LOOKUP:
+            return
+        num_models_by_project_id = defaultdict(int)
+        for model in new_models:
+            num_models_by_project_id[model._get_project_id()] += 1
+        for project_id, num_models in num_models_by_project_id.items():
+            Project.objects.filter(id=project_id).update(**{
+                cls.PROJECT_SUMMARY_COUNT_FIELD: F(cls.PROJECT_SUMMARY_COUNT_FIELD) + num_models,
+            })
 
 
 class UserPolicy(models.Model):
@@ -158,6 +206,12 @@ class Project(ModelWithGUID):
     workspace_namespace = models.TextField(null = True, blank = True)
     workspace_name = models.TextField(null = True, blank = True)
 
+    # denormalized counts displayed on the dashboard. These are maintained when the counted models are created or
+    # deleted, and any drift is corrected by the reconcile_project_summary_counts command
+    num_families = models.IntegerField(default=0)
+    num_individuals = models.IntegerField(default=0)
+    num_saved_variants = models.IntegerField(default=0)
+
     def __unicode__(self):
         return self.name.strip()
 
@@ -196,6 +250,31 @@ class Project(ModelWithGUID):
         self.can_edit_group.delete()
         self.can_view_group.delete()
 
+    @classmethod
+    def update_summary_counts(cls, project_ids=None):
+        """Recomputes the summary counts for the given project ids, or for all projects if no ids are given.
+
+        Returns:
+            int: the number of projects whose counts were out of date
+        """
+        projects = cls.objects.all() if project_ids is None else cls.objects.filter(id__in=project_ids)
+        summary_models = [Family, Individual, SavedVariant]
+        summary_fields = [model_class.PROJECT_SUMMARY_COUNT_FIELD for model_class in summary_models]
+
+        existing_counts = {project.pop('id'): project for project in projects.values('id', *summary_fields)}
+        counts = {project_id: {field: 0 for field in summary_fields} for project_id in existing_counts.keys()}
+        for model_class in summary_models:
+            model_counts = model_class.objects.filter(
+                **{'{}__in'.format(model_class.PROJECT_ID_LOOKUP): existing_counts.keys()}
+            ).values(model_class.PROJECT_ID_LOOKUP).annotate(count=Count('*'))
+            for agg in model_counts:
+                counts[agg[model_class.PROJECT_ID_LOOKUP]][model_class.PROJECT_SUMMARY_COUNT_FIELD] = agg['count']
+
+        updated_project_ids = [project_id for project_id, count in counts.items() if count != existing_counts[project_id]]
+        for project_id in updated_project_ids:
+            cls.objects.filter(id=project_id).update(**counts[project_id])
+        return len(updated_project_ids)
+
     def get_collaborators(self, permissions=None):
         if not permissions:
             permissions = {CAN_VIEW, CAN_EDIT}
@@ -234,6 +313,9 @@ class ProjectCategory(ModelWithGUID):
 
 
 class Family(ModelWithGUID):
+    PROJECT_ID_LOOKUP = 'project_id'
+    PROJECT_SUMMARY_COUNT_FIELD = 'num_families'
+
     ANALYSIS_STATUS_ANALYSIS_IN_PROGRESS='I'
     ANALYSIS_STATUS_WAITING_FOR_DATA='Q'
     ANALYSIS_STATUS_CHOICES = (
@@ -270,6 +352,8 @@ class Family(ModelWithGUID):
     description = models.TextField(null=True, blank=True)
 
     pedigree_image = models.ImageField(null=True, blank=True, upload_to='pedigree_images')
+    # hash of the pedigree the current image was generated from, used to skip regenerating unchanged pedigrees
+    pedigree_image_hash = models.CharField(max_length=32, null=True, blank=True)
 
     assigned_analyst = models.ForeignKey(User, null=True, on_delete=models.SET_NULL,
                                     related_name='assigned_families')  # type: ForeignKey
@@ -340,6 +424,9 @@ class YearField(models.PositiveSmallIntegerField):
 
 
 class Individual(ModelWithGUID):
+    PROJECT_ID_LOOKUP = 'family__project_id'
+    PROJECT_SUMMARY_COUNT_FIELD = 'num_individuals'
+
     SEX_MALE = 'M'
     SEX_FEMALE = 'F'
     SEX_UNKNOWN = 'U'
@@ -608,6 +695,9 @@ class IgvSample(ModelWithGUID):
 
 
 class SavedVariant(ModelWithGUID):
+    PROJECT_ID_LOOKUP = 'family__project_id'
+    PROJECT_SUMMARY_COUNT_FIELD = 'num_saved_variants'
+
     family = models.ForeignKey('Family', on_delete=models.CASCADE)
 
     xpos = models.BigIntegerField()
@@ -4,6 +4,9 @@ from seqr.models import Individual
 MAX_VARIANTS = 10000
 MAX_COMPOUND_HET_GENES = 1000
 MAX_INDEX_NAME_LENGTH = 4000
+# Pages past this offset are loaded with a search_after cursor instead of from/size, which gets slower with every page
+# and can not go past MAX_VARIANTS
+SEARCH_AFTER_MIN_OFFSET = 1000
 
 XPOS_SORT_KEY = 'xpos'
 
@@ -10,6 +10,8 @@ logger = logging.getLogger(__name__)
 class EsGeneAggSearch(EsSearch):
     AGGREGATION_NAME = 'gene aggregation'
     CACHED_COUNTS_KEY = None
+    # Gene aggregations attribute families using the matched queries of source-less hits, so all families are named
+    MAX_NAMED_FAMILY_QUERIES = None
 
     def aggregate_by_gene(self):
         searches = [self._search]
@@ -1,5 +1,7 @@
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
+from django.db.models import Count
 import elasticsearch
 from elasticsearch_dsl import Search, Q, MultiSearch
 import hashlib
@@ -16,10 +18,11 @@ from seqr.utils.elasticsearch.constants import XPOS_SORT_KEY, COMPOUND_HET, RECE
     SORTED_TRANSCRIPTS_FIELD_KEY, CORE_FIELDS_CONFIG, NESTED_FIELDS, PREDICTION_FIELDS_CONFIG, INHERITANCE_FILTERS, \
     QUERY_FIELD_NAMES, REF_REF, ANY_AFFECTED, GENOTYPE_QUERY_MAP, CLINVAR_SIGNFICANCE_MAP, HGMD_CLASS_MAP, \
     SORT_FIELDS, MAX_VARIANTS, MAX_COMPOUND_HET_GENES, MAX_INDEX_NAME_LENGTH, QUALITY_FIELDS, \
-    GRCH38_LOCUS_FIELD
-from seqr.utils.redis_utils import safe_redis_get_json, safe_redis_set_json
-from seqr.utils.xpos_utils import get_xpos, MIN_POS, MAX_POS
+    GRCH38_LOCUS_FIELD, SEARCH_AFTER_MIN_OFFSET
+from seqr.utils.redis_utils import safe_redis_get_json, safe_redis_set_json, safe_redis_mget_json
+from seqr.utils.xpos_utils import get_xpos, get_merged_xpos_intervals, MIN_POS, MAX_POS
 from seqr.views.utils.json_utils import _to_camel_case
+from settings import ELASTICSEARCH_MAX_CONCURRENT_SEARCHES
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +31,10 @@ class EsSearch(object):
 
     AGGREGATION_NAME = 'compound het'
     CACHED_COUNTS_KEY = 'loaded_variant_counts'
+    SEARCH_AFTER_KEY = 'search_after'
+    # Indices with more families than this have any family whose filter only checks for alt alleles in its samples
+    # collapsed into shared terms clauses, and these families are matched to hits by the parser instead of by name
+    MAX_NAMED_FAMILY_QUERIES = 100
 
     def __init__(self, families, previous_search_results=None, inheritance_search=None,
                  return_all_queried_families=False):
@@ -87,6 +94,8 @@ class EsSearch(object):
 
         self.previous_search_results = previous_search_results or {}
         self._return_all_queried_families = return_all_queried_families
+        self._index_parse_configs = {}
+        self._paginated_start_indices = {}
 
         self._search = Search()
         self._index_searches = defaultdict(list)
@@ -96,13 +105,17 @@ class EsSearch(object):
         self._filtered_variant_ids = None
         self._no_sample_filters = False
         self._any_affected_sample_filters = False
+        self._collapsed_family_samples = {}
+        self._collapsed_compound_het_family_samples = {}
+        self._index_sample_counts = None
 
-    def _set_index_name(self):
+    def _set_index_name(self, cached_values=None):
         self.index_name = ','.join(sorted(self._indices))
-        if len(self.index_name) > MAX_INDEX_NAME_LENGTH:
-            alias = hashlib.md5(self.index_name.encode('utf-8')).hexdigest()
-            cache_key = 'index_alias__{}'.format(alias)
-            if safe_redis_get_json(cache_key) != self.index_name:
+        alias = _get_index_alias(self.index_name)
+        if alias:
+            cache_key = _index_alias_cache_key(alias)
+            cached_index_name = cached_values.get(cache_key) if cached_values is not None else safe_redis_get_json(cache_key)
+            if cached_index_name != self.index_name:
                 self._client.indices.update_aliases(body={'actions': [
                     {'add': {'indices': self._indices, 'alias': alias}}
                 ]})
@@ -110,9 +123,31 @@ class EsSearch(object):
             self.index_name = alias
 
     def _set_index_metadata(self):
-        self._set_index_name()
-        from seqr.utils.elasticsearch.utils import get_index_metadata
-        self.index_metadata = get_index_metadata(self.index_name, self._client, include_fields=True)
+        from seqr.utils.elasticsearch.utils import get_index_metadata, get_index_metadata_cache_key, \
+            get_local_index_metadata, set_local_index_metadata
+        index_name = ','.join(sorted(self._indices))
+        alias = _get_index_alias(index_name)
+
+        local_metadata = get_local_index_metadata(alias or index_name)
+        if local_metadata:
+            # Any required alias was already created when the metadata was cached
+            self.index_name = alias or index_name
+            self.index_metadata = local_metadata
+            return
+
+        # Fetch the index alias and the index metadata from redis in a single round trip
+        metadata_cache_key = get_index_metadata_cache_key(alias or index_name)
+        cache_keys = [metadata_cache_key]
+        if alias:
+            cache_keys.append(_index_alias_cache_key(alias))
+        cached_values = safe_redis_mget_json(cache_keys)
+
+        self._set_index_name(cached_values=cached_values)
+        self.index_metadata = cached_values.get(metadata_cache_key)
+        if self.index_metadata:
+            set_local_index_metadata(self.index_name, self.index_metadata)
+        else:
+            self.index_metadata = get_index_metadata(self.index_name, self._client, include_fields=True)
 
     def update_dataset_type(self, dataset_type, keep_previous=False):
         new_indices = self.indices_by_dataset_type[dataset_type]
@@ -199,7 +234,7 @@ class EsSearch(object):
             self.filter(pathogenicity_filter)
         return dataset_type
 
-    def filter_by_location(self, genes=None, intervals=None, rs_ids=None, variant_ids=None, locus=None):
+    def filter_by_location(self, gene_ids=None, intervals=None, rs_ids=None, variant_ids=None, locus=None):
         genome_version = locus and locus.get('genomeVersion')
         variant_id_genome_versions = {variant_id: genome_version for variant_id in variant_ids or []}
         if variant_id_genome_versions and genome_version:
@@ -216,8 +251,8 @@ class EsSearch(object):
                         variant_id_genome_versions[lifted_variant_id] = lifted_genome_version
                         variant_ids.append(lifted_variant_id)
 
-        self.filter(_location_filter(genes, intervals, rs_ids, variant_ids, locus))
-        if not (genes or intervals or rs_ids) and len({genome_version for genome_version in variant_id_genome_versions.values()}) > 1:
+        self.filter(_location_filter(gene_ids, intervals, rs_ids, variant_ids, locus))
+        if not (gene_ids or intervals or rs_ids) and len({genome_version for genome_version in variant_id_genome_versions.values()}) > 1:
             self._filtered_variant_ids = variant_id_genome_versions
         return self
 
@@ -279,7 +314,7 @@ class EsSearch(object):
             genotypes_q = None
             if all_sample_search:
                 search_sample_count = sum(len(samples) for samples in family_samples_by_id.values()) + self._skipped_sample_count[index]
-                index_sample_count = Sample.objects.filter(elasticsearch_index=index, is_active=True).count()
+                index_sample_count = self._get_index_sample_counts().get(index, 0)
                 if search_sample_count == index_sample_count:
                     if inheritance_mode == ANY_AFFECTED:
                         sample_ids = []
@@ -297,7 +332,19 @@ class EsSearch(object):
                         continue
 
             if not genotypes_q:
+                collapsed_family_samples = self._get_collapsed_family_samples(
+                    family_samples_by_id, quality_filters_by_family,
+                    lambda family_guid, samples_by_id: self._get_family_alt_allele_fields(
+                        family_guid, samples_by_id, index_fields, inheritance_mode, inheritance_filter),
+                )
+                if collapsed_family_samples:
+                    self._collapsed_family_samples[index] = collapsed_family_samples
+                    genotypes_q = _collapsed_family_sample_q(collapsed_family_samples)
+                collapsed_families = _get_collapsed_families(collapsed_family_samples)
+
                 for family_guid in sorted(family_samples_by_id.keys()):
+                    if family_guid in collapsed_families:
+                        continue
                     family_samples_q = self._get_family_sample_query(
                         family_guid, family_samples_by_id, quality_filters_by_family,
                         index_fields, inheritance_mode, inheritance_filter
@@ -313,6 +360,17 @@ class EsSearch(object):
             for index in no_filter_indices:
                 self._index_searches[index].append(self._search)
 
+    def _get_index_sample_counts(self):
+        # Sample counts for all searched indices are loaded in a single query. They are not cached across searches, as
+        # loading a project into an existing index changes its count and other workers would not see the change
+        if self._index_sample_counts is None:
+            self._index_sample_counts = {
+                agg['elasticsearch_index']: agg['count'] for agg in Sample.objects.filter(
+                    elasticsearch_index__in=list(self.samples_by_family_index.keys()), is_active=True,
+                ).values('elasticsearch_index').annotate(count=Count('id'))
+            }
+        return self._index_sample_counts
+
     def _get_family_sample_query(self, family_guid, family_samples_by_id, quality_filters_by_family, index_fields, inheritance_mode, inheritance_filter):
         samples_by_id = family_samples_by_id[family_guid]
         affected_status = self._family_individual_affected_status.get(family_guid)
@@ -347,6 +405,43 @@ class EsSearch(object):
 
         return _named_family_sample_q(family_samples_q, family_guid, quality_filters_by_family)
 
+    def _get_collapsed_family_samples(self, family_samples_by_id, quality_filters_by_family, get_family_alt_allele_fields):
+        """Returns a mapping of alt allele field to sample id to family guids for all families whose genotype filter only
+        requires that any of its samples has a value in any of a set of alt allele fields. The same callset can be
+        loaded in multiple projects, so a sample id may belong to more than one family"""
+        collapsed_family_samples = defaultdict(lambda: defaultdict(set))
+        if self.MAX_NAMED_FAMILY_QUERIES is None or len(family_samples_by_id) <= self.MAX_NAMED_FAMILY_QUERIES:
+            return collapsed_family_samples
+
+        for family_guid, samples_by_id in family_samples_by_id.items():
+            if family_guid in quality_filters_by_family:
+                continue
+            alt_allele_fields = get_family_alt_allele_fields(family_guid, samples_by_id)
+            if alt_allele_fields:
+                sample_ids, fields = alt_allele_fields
+                for field in fields:
+                    for sample_id in sample_ids:
+                        collapsed_family_samples[field][sample_id].add(family_guid)
+        return collapsed_family_samples
+
+    def _get_family_alt_allele_fields(self, family_guid, samples_by_id, index_fields, inheritance_mode, inheritance_filter):
+        if inheritance_mode == ANY_AFFECTED:
+            affected_status = self._family_individual_affected_status[family_guid]
+            return [sample_id for sample_id, sample in samples_by_id.items()
+                    if affected_status[sample.individual.guid] == Individual.AFFECTED_STATUS_AFFECTED], HAS_ALT_FIELD_KEYS
+        elif not (inheritance_filter or inheritance_mode):
+            return list(samples_by_id.keys()), HAS_ALT_FIELD_KEYS
+        elif inheritance_mode in {RECESSIVE, X_LINKED_RECESSIVE}:
+            # Recessive filters also include a contig filter for X-linked inheritance
+            return None
+
+        if inheritance_mode:
+            inheritance_filter.update(INHERITANCE_FILTERS[inheritance_mode])
+        return _get_alt_allele_fields(_get_sample_genotype_filters(
+            inheritance_mode, inheritance_filter, samples_by_id, self._family_individual_affected_status.get(family_guid),
+            index_fields,
+        ))
+
     def _filter_compound_hets(self, quality_filters_by_family, annotations_secondary_search):
         indices = set(self._indices)
 
@@ -378,7 +473,24 @@ class EsSearch(object):
             for pair_index, families in paired_index_families[index].items():
                 paired_families.update({family: pair_index for family in families})
 
+            collapsed_family_samples = self._get_collapsed_family_samples(
+                {family_guid: samples_by_id for family_guid, samples_by_id in family_samples_by_id.items()
+                 if family_guid not in paired_families},
+                quality_filters_by_family,
+                lambda family_guid, samples_by_id: _get_alt_allele_fields(_get_sample_genotype_filters(
+                    COMPOUND_HET, INHERITANCE_FILTERS[COMPOUND_HET], samples_by_id,
+                    self._family_individual_affected_status[family_guid], index_fields,
+                )),
+            )
+            if collapsed_family_samples:
+                self._collapsed_compound_het_family_samples[index] = collapsed_family_samples
+                comp_het_q_by_index[index] = _collapsed_family_sample_q(collapsed_family_samples)
+            collapsed_families = _get_collapsed_families(collapsed_family_samples)
+
             for family_guid in sorted(family_samples_by_id.keys()):
+                if family_guid in collapsed_families:
+                    continue
+
                 paired_index = paired_families.get(family_guid)
                 if paired_index and paired_index in seen_paired_indices:
                     continue
@@ -463,6 +575,7 @@ class EsSearch(object):
             self.index_name, page=page, num_results=num_results_for_search, start_index=start_index
         )[0]
         response = self._execute_search(search)
+        self._update_search_after(self.index_name, self._get_search_after(self.index_name, response))
         parsed_response = self._parse_response(response)
         return self._process_single_search_response(
             parsed_response, page=page, num_results=num_results, deduplicate=deduplicate, **kwargs)
@@ -495,7 +608,8 @@ class EsSearch(object):
         if self.CACHED_COUNTS_KEY and not self.previous_search_results.get(self.CACHED_COUNTS_KEY):
             self.previous_search_results[self.CACHED_COUNTS_KEY] = {}
 
-        ms = MultiSearch()
+        searched_indices = []
+        index_searches = []
         for index_name in indices:
             start_index = 0
             if self.CACHED_COUNTS_KEY:
@@ -508,14 +622,67 @@ class EsSearch(object):
                     self.previous_search_results[self.CACHED_COUNTS_KEY][index_name] = {'loaded': 0, 'total': 0}
 
             searches = self._get_paginated_searches(index_name, start_index=start_index, **kwargs)
-            ms = ms.index(index_name.split(','))
-            for search in searches:
-                ms = ms.add(search)
+            searched_indices.append(index_name)
+            index_searches += [(index_name, search) for search in searches]
 
-        responses = self._execute_search(ms) if ms._searches else []
-        parsed_responses = [self._parse_response(response) for response in responses]
+        if ELASTICSEARCH_MAX_CONCURRENT_SEARCHES > 1 and len(index_searches) > 1:
+            parsed_responses = self._execute_concurrent_searches(index_searches)
+        else:
+            ms = MultiSearch()
+            for index_name in searched_indices:
+                ms = ms.index(index_name.split(','))
+            for _, search in index_searches:
+                ms = ms.add(search)
+            responses = self._execute_search(ms) if ms._searches else []
+            parsed_responses = []
+            for (index_name, _), response in zip(index_searches, responses):
+                self._update_search_after(index_name, self._get_search_after(index_name, response))
+                parsed_responses.append(self._parse_response(response))
         return self._process_multi_search_responses(parsed_responses, **kwargs)
 
+    def _execute_concurrent_searches(self, index_searches):
+        # Each response is parsed as soon as it is returned, so parsing overlaps with the slower searches. Results are
+        # returned in the same order as a multi-search so the merged results are identical. The shared search state is
+        # only updated from the calling thread once all searches complete
+        def _execute_index_search(index_name, search):
+            response = self._execute_search(search)
+            return self._get_search_after(index_name, response), self._parse_response(response)
+
+        max_workers = min(ELASTICSEARCH_MAX_CONCURRENT_SEARCHES, len(index_searches))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_execute_index_search, index_name, search) for index_name, search in index_searches
+            ]
+            responses = [future.result() for future in futures]
+
+        parsed_responses = []
+        for (index_name, _), (search_after, parsed_response) in zip(index_searches, responses):
+            self._update_search_after(index_name, search_after)
+            parsed_responses.append(parsed_response)
+        return parsed_responses
+
+    def _get_search_after(self, index_name, response):
+        """Returns the cursor for continuing the search from the last loaded hit, or None if it should not be cached"""
+        # Only top level hits are paginated, compound het results are all loaded from the aggregation at once
+        if hasattr(response.aggregations, 'genes') or not response.hits:
+            return None
+        last_sort = getattr(response.hits[-1].meta, 'sort', None)
+        if last_sort is None:
+            return None
+
+        loaded = self._paginated_start_indices.get(index_name, 0) + len(response.hits)
+        # Cursors are only cached once paging is deep enough that they are faster than an offset
+        if loaded < SEARCH_AFTER_MIN_OFFSET:
+            return None
+        return {'loaded': loaded, 'sort': list(last_sort)}
+
+    def _update_search_after(self, index_name, search_after):
+        if not search_after:
+            return
+        if not self.previous_search_results.get(self.SEARCH_AFTER_KEY):
+            self.previous_search_results[self.SEARCH_AFTER_KEY] = {}
+        self.previous_search_results[self.SEARCH_AFTER_KEY][index_name] = search_after
+
     def _process_multi_search_responses(self, parsed_responses, page=1, num_results=100):
         new_results = []
         compound_het_results = self.previous_search_results.get('compound_het_results', [])
@@ -568,14 +735,42 @@ class EsSearch(object):
         logger.info('Total hits: {} ({} seconds)'.format(response_total, response.took / 1000.0))
         return [self._parse_hit(hit) for hit in response], response_total, False, index_name
 
-    def _parse_hit(self, raw_hit):
+    def _get_index_parse_config(self, index_name):
+        # Field lookups depend only on the index metadata, so are compiled once per index rather than for every hit
+        if index_name not in self._index_parse_configs:
+            index_metadata = self.index_metadata[index_name]
+            self._index_parse_configs[index_name] = {
+                'is_sv': index_metadata.get('datasetType') == Sample.DATASET_TYPE_SV_CALLS,
+                'genome_version': index_metadata['genomeVersion'],
+                'population_accessors': {
+                    population: _compile_field_accessors(
+                        POPULATION_RESPONSE_FIELD_CONFIGS, format_response_key=lambda key: key.lower(),
+                        lookup_field_prefix=population, existing_fields=index_metadata['fields'],
+                        get_addl_fields=lambda field: pop_config[field] if isinstance(pop_config[field], list) else [pop_config[field]],
+                    )
+                    for population, pop_config in POPULATIONS.items()
+                },
+            }
+        return self._index_parse_configs[index_name]
+
+    def _parse_hit(self, raw_hit, is_compound_het=False):
         hit = {k: raw_hit[k] for k in QUERY_FIELD_NAMES if k in raw_hit}
         index_name = raw_hit.meta.index
         index_family_samples = self.samples_by_family_index[index_name]
-        is_sv = self.index_metadata[index_name].get('datasetType') == Sample.DATASET_TYPE_SV_CALLS
-
-        if hasattr(raw_hit.meta, 'matched_queries'):
-            family_guids = list(raw_hit.meta.matched_queries)
+        index_parse_config = self._get_index_parse_config(index_name)
+        is_sv = index_parse_config['is_sv']
+
+        collapsed_family_samples = (
+            self._collapsed_compound_het_family_samples if is_compound_het else self._collapsed_family_samples
+        ).get(index_name)
+        if hasattr(raw_hit.meta, 'matched_queries') or collapsed_family_samples:
+            family_guids = list(getattr(raw_hit.meta, 'matched_queries', []))
+            if collapsed_family_samples:
+                family_guids += sorted({
+                    family_guid for field in collapsed_family_samples.keys()
+                    for sample_id in hit.get(field) or [] if sample_id in collapsed_family_samples[field]
+                    for family_guid in collapsed_family_samples[field][sample_id]
+                } - set(family_guids))
         elif self._return_all_queried_families:
             family_guids = list(index_family_samples.keys())
         else:
@@ -604,14 +799,14 @@ class EsSearch(object):
                 sample = samples_by_id.get(genotype_hit['sample_id'])
                 if sample:
                     genotype_hit['sample_type'] = sample.sample_type
-                    genotypes[sample.individual.guid] = _get_field_values(genotype_hit, GENOTYPE_FIELDS_CONFIG)
+                    genotypes[sample.individual.guid] = _get_compiled_field_values(genotype_hit, GENOTYPE_FIELD_ACCESSORS)
 
             if len(samples_by_id) != len(genotypes) and is_sv:
                 # Family members with no variants are not included in the SV index
                 for sample_id, sample in samples_by_id.items():
                     if sample.individual.guid not in genotypes:
-                        genotypes[sample.individual.guid] = _get_field_values(
-                            {'sample_id': sample_id}, GENOTYPE_FIELDS_CONFIG)
+                        genotypes[sample.individual.guid] = _get_compiled_field_values(
+                            {'sample_id': sample_id}, GENOTYPE_FIELD_ACCESSORS)
                         genotypes[sample.individual.guid]['isRef'] = True
                         if hit['contig'] == 'X' and sample.individual.sex == Individual.SEX_MALE:
                             genotypes[sample.individual.guid]['cn'] = 1
@@ -634,16 +829,16 @@ class EsSearch(object):
                     gen['start'] = None
                     gen['end'] = None
 
-        result = _get_field_values(hit, CORE_FIELDS_CONFIG, format_response_key=str)
+        result = _get_compiled_field_values(hit, CORE_FIELD_ACCESSORS)
         result.update({
-            field_name: _get_field_values(hit, fields, lookup_field_prefix=field_name)
-            for field_name, fields in NESTED_FIELDS.items()
+            field_name: _get_compiled_field_values(hit, accessors)
+            for field_name, accessors in NESTED_FIELD_ACCESSORS.items()
         })
         if hasattr(raw_hit.meta, 'sort'):
             result['_sort'] = [_parse_es_sort(sort, self._sort[i]) for i, sort in enumerate(raw_hit.meta.sort)]
 
 
-        genome_version = self.index_metadata[index_name]['genomeVersion']
+        genome_version = index_parse_config['genome_version']
         lifted_over_genome_version = None
         lifted_over_chrom = None
         lifted_over_pos = None
@@ -666,13 +861,8 @@ class EsSearch(object):
                         lifted_over_pos = grch37_coord[0][1]
 
         populations = {
-            population: _get_field_values(
-                hit, POPULATION_RESPONSE_FIELD_CONFIGS, format_response_key=lambda key: key.lower(),
-                lookup_field_prefix=population,
-                existing_fields=self.index_metadata[index_name]['fields'],
-                get_addl_fields=lambda field: pop_config[field] if isinstance(pop_config[field], list) else [pop_config[field]],
-            )
-            for population, pop_config in POPULATIONS.items()
+            population: _get_compiled_field_values(hit, accessors)
+            for population, accessors in index_parse_config['population_accessors'].items()
         }
 
         sorted_transcripts = [
@@ -694,9 +884,7 @@ class EsSearch(object):
             'liftedOverPos': lifted_over_pos,
             'mainTranscriptId': main_transcript_id,
             'populations': populations,
-            'predictions': _get_field_values(
-                hit, PREDICTION_FIELDS_CONFIG, format_response_key=lambda key: key.split('_')[1].lower()
-            ),
+            'predictions': _get_compiled_field_values(hit, PREDICTION_FIELD_ACCESSORS),
             'transcripts': dict(transcripts),
         })
         return result
@@ -706,31 +894,41 @@ class EsSearch(object):
             from seqr.utils.elasticsearch.utils import InvalidSearchException
             raise InvalidSearchException('This search returned too many compound heterozygous variants. Please add stricter filters')
 
-        family_unaffected_individual_guids = {
-            family_guid: {individual_guid for individual_guid, affected_status in individual_affected_status.items() if
-                          affected_status == Individual.AFFECTED_STATUS_UNAFFECTED}
-            for family_guid, individual_affected_status in self._family_individual_affected_status.items()
-        }
-
+        # Unaffected individuals are each assigned a bit, so checking whether any unaffected individual in a family is
+        # an alt carrier for both variants in a pair is a single bitwise operation
+        unaffected_individual_bits = {}
+        family_unaffected_masks = defaultdict(int)
+        for family_guid, individual_affected_status in self._family_individual_affected_status.items():
+            for individual_guid, affected_status in individual_affected_status.items():
+                if affected_status == Individual.AFFECTED_STATUS_UNAFFECTED:
+                    if individual_guid not in unaffected_individual_bits:
+                        unaffected_individual_bits[individual_guid] = 1 << len(unaffected_individual_bits)
+                    family_unaffected_masks[family_guid] |= unaffected_individual_bits[individual_guid]
+
+        allowed_gene_consequences = set(
+            self._allowed_consequences + (self._allowed_consequences_secondary or [])
+        ) if self._allowed_consequences else None
+
+        parsed_hits = {}
         compound_het_pairs_by_gene = {}
         for gene_agg in response.aggregations.genes.buckets:
-            gene_variants = [self._parse_hit(hit) for hit in gene_agg['vars_by_gene']]
             gene_id = gene_agg['key']
 
             if gene_id in compound_het_pairs_by_gene:
                 continue
 
+            unaffected_alt_masks = {}
+            gene_variants = []
+            for hit in gene_agg['vars_by_gene']:
+                variant, unaffected_alt_mask = self._get_compound_het_variant(hit, parsed_hits, unaffected_individual_bits)
+                unaffected_alt_masks[id(variant)] = unaffected_alt_mask
+                gene_variants.append(variant)
+
             # Variants are returned if any transcripts have the filtered consequence, but to be compound het
             # the filtered consequence needs to be present in at least one transcript in the gene of interest
-            if self._allowed_consequences:
-                for variant in gene_variants:
-                    variant['gene_consequences'] = {
-                        k: [variant['svType']] if variant.get('svType') else [
-                            transcript['majorConsequence'] for transcript in transcripts
-                        ] for k, transcripts in variant['transcripts'].items()}
-
+            if allowed_gene_consequences:
                 gene_variants = [variant for variant in gene_variants if any(
-                    consequence in self._allowed_consequences + (self._allowed_consequences_secondary or [])
+                    consequence in allowed_gene_consequences
                     for consequence in variant['gene_consequences'].get(gene_id, [])
                 )]
 
@@ -748,7 +946,8 @@ class EsSearch(object):
                 for family_guid in variant['familyGuids']:
                     family_compound_het_pairs[family_guid].append(variant)
 
-            self._filter_invalid_family_compound_hets(gene_id, family_compound_het_pairs, family_unaffected_individual_guids)
+            self._filter_invalid_family_compound_hets(
+                gene_id, family_compound_het_pairs, family_unaffected_masks, unaffected_alt_masks)
 
             gene_compound_het_pairs = [ch_pair for ch_pairs in family_compound_het_pairs.values() for ch_pair in ch_pairs]
             for compound_het_pair in gene_compound_het_pairs:
@@ -799,39 +998,61 @@ class EsSearch(object):
                     return False
         return True
 
-    def _filter_invalid_family_compound_hets(self, gene_id, family_compound_het_pairs, family_unaffected_individual_guids):
+    def _get_compound_het_variant(self, hit, parsed_hits, unaffected_individual_bits):
+        # The same hit is often returned in multiple gene buckets, so each unique hit is only parsed once. The matched
+        # queries determine the hit's families, so they are part of what makes a hit unique
+        hit_key = (hit.meta.index, hit.meta.id, tuple(getattr(hit.meta, 'matched_queries', None) or []))
+        if hit_key not in parsed_hits:
+            variant = self._parse_hit(hit, is_compound_het=True)
+            if self._allowed_consequences:
+                variant['gene_consequences'] = {
+                    k: [variant['svType']] if variant.get('svType') else [
+                        transcript['majorConsequence'] for transcript in transcripts
+                    ] for k, transcripts in variant['transcripts'].items()}
+
+            unaffected_alt_mask = 0
+            for individual_guid, genotype in variant['genotypes'].items():
+                individual_bit = unaffected_individual_bits.get(individual_guid)
+                if individual_bit and genotype and genotype.get('numAlt') != 0 and not genotype.get('isRef'):
+                    unaffected_alt_mask |= individual_bit
+            parsed_hits[hit_key] = (variant, unaffected_alt_mask)
+
+        variant, unaffected_alt_mask = parsed_hits[hit_key]
+        # Family GUIDs and genotypes are updated independently for each gene, so each gene gets its own copy
+        return dict(variant, genotypes=dict(variant['genotypes'])), unaffected_alt_mask
+
+    def _filter_invalid_family_compound_hets(self, gene_id, family_compound_het_pairs, family_unaffected_masks,
+                                             unaffected_alt_masks):
+        check_secondary_consequences = self._allowed_consequences and self._allowed_consequences_secondary
         for family_guid, variants in family_compound_het_pairs.items():
-            unaffected_individuals = family_unaffected_individual_guids.get(family_guid, [])
-
-            valid_combinations = []
+            family_unaffected_mask = family_unaffected_masks.get(family_guid, 0)
+            variant_masks = [unaffected_alt_masks[id(variant)] & family_unaffected_mask for variant in variants]
+
+            if check_secondary_consequences:
+                variant_consequences = [variant['gene_consequences'].get(gene_id, []) for variant in variants]
+                has_primary = [
+                    any(consequence in self._allowed_consequences for consequence in consequences)
+                    for consequences in variant_consequences
+                ]
+                has_secondary = [
+                    any(consequence in self._allowed_consequences_secondary for consequence in consequences)
+                    for consequences in variant_consequences
+                ]
+
+            valid_pairs = []
             for ch_1_index, ch_2_index in combinations(range(len(variants)), 2):
-                variant_1 = variants[ch_1_index]
-                variant_2 = variants[ch_2_index]
-
-                is_valid_for_individual = True
-                for individual_guid in unaffected_individuals:
-                    genotype_1 = variant_1['genotypes'].get(individual_guid)
-                    genotype_2 = variant_2['genotypes'].get(individual_guid)
-                    if genotype_1 and genotype_2 and genotype_1.get('numAlt') != 0 and not genotype_1.get('isRef') and \
-                            genotype_2.get('numAlt') != 0 and not genotype_2.get('isRef'):
-                        is_valid_for_individual = False
-                        break
-                if not is_valid_for_individual:
+                # Pairs are invalid if any unaffected individual has alt alleles for both variants
+                if variant_masks[ch_1_index] & variant_masks[ch_2_index]:
                     continue
 
-                if self._allowed_consequences and self._allowed_consequences_secondary:
-                    # Make a copy of lists to prevent blowing up memory usage
-                    consequences = [] + variant_1['gene_consequences'].get(gene_id, [])
-                    consequences += variant_2['gene_consequences'].get(gene_id, [])
-                    if all(consequence not in self._allowed_consequences for consequence in consequences) or all(
-                            consequence not in self._allowed_consequences_secondary for consequence in consequences):
-                        continue
+                if check_secondary_consequences and not (
+                        (has_primary[ch_1_index] or has_primary[ch_2_index]) and
+                        (has_secondary[ch_1_index] or has_secondary[ch_2_index])):
+                    continue
 
-                valid_combinations.append([ch_1_index, ch_2_index])
+                valid_pairs.append([variants[ch_1_index], variants[ch_2_index]])
 
-            family_compound_het_pairs[family_guid] = [
-                [variants[valid_ch_1_index], variants[valid_ch_2_index]] for
-                valid_ch_1_index, valid_ch_2_index in valid_combinations]
+            family_compound_het_pairs[family_guid] = valid_pairs
 
     def _deduplicate_results(self, sorted_new_results):
         original_result_count = len(sorted_new_results)
@@ -909,30 +1130,28 @@ class EsSearch(object):
     def _deduplicate_compound_het_results(self, compound_het_results):
         duplicates = 0
         results = {}
+        pair_indices = {}
         for gene_compound_het_pair in compound_het_results:
             gene = next(iter(gene_compound_het_pair))
             compound_het_pair = gene_compound_het_pair[gene]
-            if gene in results:
-                variant_ids = {variant['variantId'] for variant in compound_het_pair}
-                existing_index = next(
-                    (i for i, existing in enumerate(results[gene]) if
-                     {variant['variantId'] for variant in existing} == variant_ids), None,
-                )
-                if existing_index is not None:
-                    existing_compound_het_pair = results[gene][existing_index]
-
-                    def _update_existing_variant(existing_variant, variant):
-                        existing_variant['genotypes'].update(variant['genotypes'])
-                        existing_variant['familyGuids'] = sorted(
-                            existing_variant['familyGuids'] + variant['familyGuids']
-                        )
-                    _update_existing_variant(existing_compound_het_pair[0], compound_het_pair[0])
-                    _update_existing_variant(existing_compound_het_pair[1], compound_het_pair[1])
-                    duplicates += 1
-                else:
-                    results[gene].append(compound_het_pair)
+            pair_key = (gene, frozenset(variant['variantId'] for variant in compound_het_pair))
+            existing_index = pair_indices.get(pair_key)
+            if existing_index is not None:
+                existing_compound_het_pair = results[gene][existing_index]
+
+                def _update_existing_variant(existing_variant, variant):
+                    existing_variant['genotypes'].update(variant['genotypes'])
+                    existing_variant['familyGuids'] = sorted(
+                        existing_variant['familyGuids'] + variant['familyGuids']
+                    )
+                _update_existing_variant(existing_compound_het_pair[0], compound_het_pair[0])
+                _update_existing_variant(existing_compound_het_pair[1], compound_het_pair[1])
+                duplicates += 1
             else:
-                results[gene] = [compound_het_pair]
+                if gene not in results:
+                    results[gene] = []
+                pair_indices[pair_key] = len(results[gene])
+                results[gene].append(compound_het_pair)
 
         deduplicated_results = []
         for gene, compound_het_pairs in results.items():
@@ -986,13 +1205,19 @@ class EsSearch(object):
                 end_index = page * num_results
                 if start_index is None:
                     start_index = end_index - num_results
-                if end_index > MAX_VARIANTS:
-                    # ES request size limits are limited by offset + size, which is the same as end_index
-                    from seqr.utils.elasticsearch.utils import InvalidSearchException
-                    raise InvalidSearchException(
-                        'Unable to load more than {} variants ({} requested)'.format(MAX_VARIANTS, end_index))
-
-                search = search[start_index:end_index]
+                search_after = self.previous_search_results.get(self.SEARCH_AFTER_KEY, {}).get(index_name)
+                if search_after and search_after['loaded'] == start_index:
+                    # Continue on from the last loaded hit, so deep pages are as fast as the first page
+                    search = search.extra(search_after=search_after['sort'], size=end_index - start_index)
+                else:
+                    if end_index > MAX_VARIANTS:
+                        # ES request size limits are limited by offset + size, which is the same as end_index
+                        from seqr.utils.elasticsearch.utils import InvalidSearchException
+                        raise InvalidSearchException(
+                            'Unable to load more than {} variants ({} requested)'.format(MAX_VARIANTS, end_index))
+
+                    search = search[start_index:end_index]
+                self._paginated_start_indices[index_name] = start_index
                 search = search.source(QUERY_FIELD_NAMES)
                 logger.info('Loading {} records {}-{}'.format(index_name, start_index, end_index))
 
@@ -1054,6 +1279,16 @@ class EsSearch(object):
         return var_fields[0].lstrip('chr'), int(var_fields[1]), var_fields[2], var_fields[3]
 
 
+def _get_index_alias(index_name):
+    if len(index_name) > MAX_INDEX_NAME_LENGTH:
+        return hashlib.md5(index_name.encode('utf-8')).hexdigest()
+    return None
+
+
+def _index_alias_cache_key(alias):
+    return 'index_alias__{}'.format(alias)
+
+
 # TODO  move liftover to hail pipeline once upgraded to 0.2 (https://github.com/broadinstitute/seqr/issues/1010)
 LIFTOVER_GRCH38_TO_GRCH37 = None
 def _liftover_grch38_to_grch37():
@@ -1129,19 +1364,39 @@ def _any_affected_sample_filter(sample_ids):
 
 def _family_genotype_inheritance_filter(inheritance_mode, inheritance_filter, samples_by_id, individual_affected_status, index_fields):
     samples_q = None
+    if inheritance_mode == X_LINKED_RECESSIVE:
+        samples_q = Q('match', contig='X')
+
+    sample_genotype_filters = _get_sample_genotype_filters(
+        inheritance_mode, inheritance_filter, samples_by_id, individual_affected_status, index_fields)
+    for sample_id, num_alt_to_filter, is_allowed in sample_genotype_filters:
+        sample_filters = [{num_alt_key: sample_id} for num_alt_key in num_alt_to_filter]
+
+        sample_q = _build_or_filter('term', sample_filters)
+        if not is_allowed:
+            sample_q = ~Q(sample_q)
+
+        if not samples_q:
+            samples_q = sample_q
+        else:
+            samples_q &= sample_q
+
+    return samples_q
 
-    individuals = [sample.individual for sample in samples_by_id.values()]
 
+def _get_sample_genotype_filters(inheritance_mode, inheritance_filter, samples_by_id, individual_affected_status, index_fields):
+    """Returns a list of (sample id, num_alt fields, is allowed) tuples for every sample with a genotype requirement"""
     individual_genotype_filter = inheritance_filter.get('genotype') or {}
 
     if inheritance_mode == X_LINKED_RECESSIVE:
-        samples_q = Q('match', contig='X')
-        for individual in individuals:
+        for sample in samples_by_id.values():
+            individual = sample.individual
             if individual_affected_status[individual.guid] == Individual.AFFECTED_STATUS_UNAFFECTED \
                     and individual.sex == Individual.SEX_MALE:
                 individual_genotype_filter[individual.guid] = REF_REF
 
     is_sv_comp_het = inheritance_mode == COMPOUND_HET and 'samples' in index_fields
+    sample_genotype_filters = []
     for sample_id, sample in sorted(samples_by_id.items()):
 
         individual_guid = sample.individual.guid
@@ -1162,19 +1417,36 @@ def _family_genotype_inheritance_filter(inheritance_mode, inheritance_filter, sa
                 num_alt for num_alt in GENOTYPE_QUERY_MAP[genotype].get('allowed_num_alt', [])
                 if num_alt in index_fields
             ]
-            num_alt_to_filter = not_allowed_num_alt or allowed_num_alt
-            sample_filters = [{num_alt_key: sample_id} for num_alt_key in num_alt_to_filter]
+            sample_genotype_filters.append((sample_id, not_allowed_num_alt or allowed_num_alt, not not_allowed_num_alt))
 
-            sample_q = _build_or_filter('term', sample_filters)
-            if not_allowed_num_alt:
-                sample_q = ~Q(sample_q)
+    return sample_genotype_filters
 
-            if not samples_q:
-                samples_q = sample_q
-            else:
-                samples_q &= sample_q
 
-    return samples_q
+def _get_alt_allele_fields(sample_genotype_filters):
+    """
+    A family filter can be collapsed with other families if it requires a single sample to have a value in one of the
+    alt allele fields returned in the variant source, so that the parser can determine which families a hit matched
+    """
+    if len(sample_genotype_filters) != 1:
+        return None
+    sample_id, num_alt_to_filter, is_allowed = sample_genotype_filters[0]
+    if not (is_allowed and num_alt_to_filter and set(num_alt_to_filter).issubset(HAS_ALT_FIELD_KEYS)):
+        return None
+    return [sample_id], num_alt_to_filter
+
+
+def _get_collapsed_families(collapsed_family_samples):
+    return {
+        family_guid for samples in collapsed_family_samples.values() for family_guids in samples.values()
+        for family_guid in family_guids
+    }
+
+
+def _collapsed_family_sample_q(collapsed_family_samples):
+    return _build_or_filter('terms', [
+        {field: sorted(collapsed_family_samples[field].keys())} for field in HAS_ALT_FIELD_KEYS
+        if collapsed_family_samples.get(field)
+    ])
 
 
 def _named_family_sample_q(family_samples_q, family_guid, quality_filters_by_family):
@@ -1186,36 +1458,39 @@ def _named_family_sample_q(family_samples_q, family_guid, quality_filters_by_fam
     return Q('bool', must=sample_queries, _name=family_guid)
 
 
-def _location_filter(genes, intervals, rs_ids, variant_ids, location_filter):
+def _location_filter(gene_ids, intervals, rs_ids, variant_ids, location_filter):
     q = None
     if intervals:
-        for interval in intervals:
-            if interval.get('offset'):
-                offset_pos = int((interval['end'] - interval['start']) * interval['offset'])
-                interval_q = Q(
-                    'range', xpos=_pos_offset_range_filter(interval['chrom'], interval['start'], offset_pos)) & Q(
-                    'range', xstop=_pos_offset_range_filter(interval['chrom'], interval['end'], offset_pos))
-            else:
-                xstart = get_xpos(interval['chrom'], interval['start'])
-                xstop = get_xpos(interval['chrom'], interval['end'])
-                range_filters = [{
-                    key: {
-                        'gte': xstart,
-                        'lte': xstop,
-                    }
-                } for key in ['xpos', 'xstop']]
-                interval_q = _build_or_filter('range', range_filters)
-                interval_q |= Q('range', xpos={'lte': xstart}) & Q('range', xstop={'gte': xstop})
-
-            if q:
-                q |= interval_q
-            else:
-                q = interval_q
+        # Overlapping intervals match the same variants as a single merged interval. Offset intervals match variants with
+        # breakpoints near both interval ends, so they can not be merged and only exact duplicates are removed
+        merged_intervals = get_merged_xpos_intervals([interval for interval in intervals if not interval.get('offset')])
+        offset_intervals = {
+            (interval['chrom'], interval['start'], interval['end'], interval['offset']): interval
+            for interval in intervals if interval.get('offset')
+        }
 
-        logger.info(q.to_dict())
+        for xstart, xstop in merged_intervals:
+            range_filters = [{
+                key: {
+                    'gte': xstart,
+                    'lte': xstop,
+                }
+            } for key in ['xpos', 'xstop']]
+            interval_q = _build_or_filter('range', range_filters)
+            interval_q |= Q('range', xpos={'lte': xstart}) & Q('range', xstop={'gte': xstop})
+            q = q | interval_q if q else interval_q
+
+        for interval in offset_intervals.values():
+            offset_pos = int((interval['end'] - interval['start']) * interval['offset'])
+            interval_q = Q(
+                'range', xpos=_pos_offset_range_filter(interval['chrom'], interval['start'], offset_pos)) & Q(
+                'range', xstop=_pos_offset_range_filter(interval['chrom'], interval['end'], offset_pos))
+            q = q | interval_q if q else interval_q
+
+        logger.info('Filtering on {} merged and {} offset intervals'.format(len(merged_intervals), len(offset_intervals)))
 
     filters = [
-        {'geneIds': list((genes or {}).keys())},
+        {'geneIds': gene_ids},
         {'rsid': rs_ids},
         {'variantId': variant_ids},
     ]
@@ -1328,21 +1603,39 @@ def _parse_es_sort(sort, sort_config):
     return sort
 
 
-def _get_field_values(hit, field_configs, format_response_key=_to_camel_case, get_addl_fields=None, lookup_field_prefix='', existing_fields=None):
-    return {
-        field_config.get('response_key', format_response_key(field)): _value_if_has_key(
-            hit,
-            (get_addl_fields(field) if get_addl_fields else []) +
-            ['{}_{}'.format(lookup_field_prefix, field) if lookup_field_prefix else field],
-            existing_fields=existing_fields,
-            **field_config
-        )
-        for field, field_config in field_configs.items()
-    }
-
-
-def _value_if_has_key(hit, keys, format_value=None, default_value=None, existing_fields=None, **kwargs):
-    for key in keys:
-        if key in hit:
-            return format_value(default_value if hit[key] is None else hit[key]) if format_value else hit[key]
-    return default_value if not existing_fields or any(key in existing_fields for key in keys) else None
\ No newline at end of file
+def _compile_field_accessors(field_configs, format_response_key=_to_camel_case, get_addl_fields=None, lookup_field_prefix='', existing_fields=None):
+    accessors = []
+    for field, field_config in field_configs.items():
+        keys = (get_addl_fields(field) if get_addl_fields else []) + \
+               ['{}_{}'.format(lookup_field_prefix, field) if lookup_field_prefix else field]
+        default_value = field_config.get('default_value')
+        missing_value = default_value if not existing_fields or any(key in existing_fields for key in keys) else None
+        accessors.append((
+            field_config.get('response_key', format_response_key(field)), keys, field_config.get('format_value'),
+            default_value, missing_value,
+        ))
+    return accessors
+
+
+def _get_compiled_field_values(hit, accessors):
+    values = {}
+    for response_key, keys, format_value, default_value, missing_value in accessors:
+        value = missing_value
+        for key in keys:
+            if key in hit:
+                value = hit[key]
+                if format_value:
+                    value = format_value(default_value if value is None else value)
+                break
+        values[response_key] = value
+    return values
+
+
+CORE_FIELD_ACCESSORS = _compile_field_accessors(CORE_FIELDS_CONFIG, format_response_key=str)
+NESTED_FIELD_ACCESSORS = {
+    field_name: _compile_field_accessors(fields, lookup_field_prefix=field_name)
+    for field_name, fields in NESTED_FIELDS.items()
+}
+PREDICTION_FIELD_ACCESSORS = _compile_field_accessors(
+    PREDICTION_FIELDS_CONFIG, format_response_key=lambda key: key.split('_')[1].lower())
+GENOTYPE_FIELD_ACCESSORS = _compile_field_accessors(GENOTYPE_FIELDS_CONFIG)
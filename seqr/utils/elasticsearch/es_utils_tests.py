@@ -10,10 +10,12 @@ from elasticsearch.exceptions import ConnectionTimeout, TransportError
 from sys import maxsize
 from urllib3.exceptions import ReadTimeoutError
 
-from seqr.models import Family, Sample, VariantSearch, VariantSearchResults
+from seqr.models import Family, Individual, Project, Sample, VariantSearch, VariantSearchResults
 from seqr.utils.elasticsearch.utils import get_es_variants_for_variant_tuples, get_single_es_variant, get_es_variants, \
-    get_es_variant_gene_counts, get_es_variants_for_variant_ids, InvalidIndexException, InvalidSearchException
+    get_es_variant_gene_counts, get_es_variants_for_variant_ids, InvalidIndexException, InvalidSearchException, \
+    clear_local_index_metadata, get_search_results_fingerprint
 from seqr.utils.elasticsearch.es_search import EsSearch, _get_family_affected_status, _liftover_grch38_to_grch37
+from seqr.utils.redis_utils import safe_redis_get_json
 from seqr.views.utils.test_utils import urllib3_responses, PARSED_VARIANTS, PARSED_SV_VARIANT, TRANSCRIPT_2
 
 INDEX_NAME = 'test_index'
@@ -813,11 +815,18 @@ RECESSIVE_INHERITANCE_QUERY = {
 ANNOTATION_QUERY = {'terms': {'transcriptConsequenceTerms': ['frameshift_variant']}}
 
 REDIS_CACHE = {}
-def _set_cache(k, v):
+def _get_cache_key(results_model, sort='xpos', skip_genotype_filter=False):
+    fingerprint = get_search_results_fingerprint(results_model)
+    if skip_genotype_filter:
+        fingerprint = '{}__no_genotype_filter'.format(fingerprint)
+    return 'search_results__{}__{}'.format(fingerprint, sort)
+def _set_cache(k, v, ex=None):
     REDIS_CACHE[k] = v
 MOCK_REDIS = mock.MagicMock()
 MOCK_REDIS.get.side_effect = REDIS_CACHE.get
+MOCK_REDIS.mget.side_effect = lambda keys: [REDIS_CACHE.get(k) for k in keys]
 MOCK_REDIS.set.side_effect =_set_cache
+MOCK_REDIS.pipeline.return_value.set.side_effect = _set_cache
 
 def mock_hits(hits, increment_sort=False, include_matched_queries=True, sort=None, index=INDEX_NAME):
     parsed_hits = deepcopy(hits)
@@ -950,6 +959,10 @@ class EsUtilsTest(TestCase):
     def setUp(self):
         Sample.objects.filter(sample_id='NA19678').update(is_active=False)
         self.families = Family.objects.filter(guid__in=['F000003_3', 'F000002_2', 'F000005_5'])
+        clear_local_index_metadata()
+        # Identical searches share cached results, so results cached by other tests are cleared
+        for cache_key in [k for k in REDIS_CACHE.keys() if k.startswith('search_results__')]:
+            REDIS_CACHE.pop(cache_key)
 
     def assertExecutedSearch(self, filters=None, start_index=0, size=2, index=INDEX_NAME, **kwargs):
         executed_search = urllib3_responses.call_request_json()
@@ -968,10 +981,11 @@ class EsUtilsTest(TestCase):
             self.assertSameSearch(executed_search[(i * 2) + 1], expected_search)
 
     def assertSameSearch(self, executed_search, expected_search_params):
-        expected_search = {
-            'from': expected_search_params['start_index'],
-            'size': expected_search_params['size']
-        }
+        expected_search = {'size': expected_search_params['size']}
+        if expected_search_params.get('search_after'):
+            expected_search['search_after'] = expected_search_params['search_after']
+        else:
+            expected_search['from'] = expected_search_params['start_index']
 
         if expected_search_params['filters']:
             expected_search['query'] = {
@@ -1007,9 +1021,16 @@ class EsUtilsTest(TestCase):
             self.assertSetEqual(SOURCE_FIELDS, set(source))
 
     def assertCachedResults(self, results_model, expected_results, sort='xpos'):
-        cache_key = 'search_results__{}__{}'.format(results_model.guid, sort)
-        self.assertDictEqual(json.loads(REDIS_CACHE.get(cache_key)), expected_results)
-        MOCK_REDIS.expire.assert_called_with(cache_key, timedelta(weeks=2))
+        cache_key = _get_cache_key(results_model, sort)
+        cached_results = safe_redis_get_json(cache_key)
+        all_results_count = cached_results.pop('all_results_count', None)
+        if all_results_count is not None:
+            cached_results['all_results'] = []
+            for i in range((all_results_count + 99) // 100):
+                cached_results['all_results'] += safe_redis_get_json('{}__results__{}'.format(cache_key, i))
+            self.assertEqual(len(cached_results['all_results']), all_results_count)
+        self.assertDictEqual(cached_results, expected_results)
+        MOCK_REDIS.pipeline.return_value.set.assert_called_with(cache_key, mock.ANY, ex=timedelta(weeks=2))
 
     @urllib3_responses.activate
     def test_get_es_variants_for_variant_tuples(self):
@@ -1065,6 +1086,22 @@ class EsUtilsTest(TestCase):
             get_single_es_variant(self.families, '10-10334333-A-G')
         self.assertEqual(str(cm.exception), 'Variant 10-10334333-A-G not found')
 
+    @urllib3_responses.activate
+    def test_local_index_metadata_cache(self):
+        setup_responses()
+        get_es_variants_for_variant_ids(self.families, ['2-103343353-GAGA-G'])
+
+        # Does not re-fetch metadata from redis or elasticsearch
+        MOCK_REDIS.mget.reset_mock()
+        urllib3_responses.reset()
+        setup_search_response()
+        get_es_variants_for_variant_ids(self.families, ['2-103343353-GAGA-G'])
+        MOCK_REDIS.mget.assert_not_called()
+
+        clear_local_index_metadata()
+        get_es_variants_for_variant_ids(self.families, ['2-103343353-GAGA-G'])
+        MOCK_REDIS.mget.assert_called_with(['index_metadata__{},{}'.format(INDEX_NAME, SV_INDEX_NAME)])
+
     @mock.patch('seqr.utils.elasticsearch.es_search.MAX_COMPOUND_HET_GENES', 1)
     @mock.patch('seqr.utils.elasticsearch.es_gene_agg_search.MAX_COMPOUND_HET_GENES', 1)
     @urllib3_responses.activate
@@ -1163,6 +1200,7 @@ class EsUtilsTest(TestCase):
             'This search is not supported for large numbers of cases. Try removing family-based inheritance filters or sample-level quality filters')
 
         _set_cache('index_metadata__test_index,test_index_sv', None)
+        clear_local_index_metadata()
         urllib3_responses.add(
             urllib3_responses.GET, '/test_index,test_index_sv/_mapping', body=Exception('Connection error'))
         with self.assertRaises(InvalidIndexException) as cm:
@@ -1233,6 +1271,262 @@ class EsUtilsTest(TestCase):
         self.assertEqual(len(variants), 5)
         self.assertListEqual(variants, PARSED_VARIANTS + PARSED_VARIANTS + PARSED_VARIANTS[:1])
 
+    @urllib3_responses.activate
+    @mock.patch('seqr.utils.elasticsearch.es_search.EsSearch.MAX_NAMED_FAMILY_QUERIES', 1)
+    def test_collapsed_family_get_es_variants(self):
+        setup_responses()
+        search_model = VariantSearch.objects.create(search={'annotations': {'frameshift': ['frameshift_variant']}})
+        results_model = VariantSearchResults.objects.create(variant_search=search_model)
+        results_model.families.set(self.families)
+
+        variants, total_results = get_es_variants(results_model, num_results=2)
+        self.assertListEqual(variants, PARSED_VARIANTS)
+        self.assertEqual(total_results, 5)
+
+        sample_ids = ['HG00731', 'HG00732', 'HG00733', 'NA20870', 'NA20874']
+        self.assertExecutedSearch(filters=[ANNOTATION_QUERY, {'bool': {'should': [
+            {'terms': {'samples_num_alt_1': sample_ids}},
+            {'terms': {'samples_num_alt_2': sample_ids}},
+            {'terms': {'samples': sample_ids}},
+        ]}}])
+
+    def _create_shared_sample_family(self, family_id='shared_sample', sample_id='NA20870'):
+        # The same callset is loaded in another project, so a sample id in the index belongs to multiple families
+        family = Family.objects.create(project=Project.objects.get(guid='R0003_test'), family_id=family_id)
+        individual = Individual.objects.create(family=family, individual_id='{}_{}'.format(sample_id, family_id), affected='A')
+        Sample.objects.create(
+            individual=individual, sample_id=sample_id, elasticsearch_index=INDEX_NAME, is_active=True,
+            sample_type=Sample.SAMPLE_TYPE_WES, dataset_type=Sample.DATASET_TYPE_VARIANT_CALLS,
+            loaded_date=Sample.objects.get(sample_id='NA20870').loaded_date)
+        return family
+
+    @urllib3_responses.activate
+    @mock.patch('seqr.utils.elasticsearch.es_search.EsSearch.MAX_NAMED_FAMILY_QUERIES', 1)
+    def test_collapsed_shared_sample_get_es_variants(self):
+        setup_responses()
+        shared_family = self._create_shared_sample_family()
+        search_model = VariantSearch.objects.create(search={'annotations': {'frameshift': ['frameshift_variant']}})
+        results_model = VariantSearchResults.objects.create(variant_search=search_model)
+        results_model.families.set(list(self.families) + [shared_family])
+
+        variants, _ = get_es_variants(results_model, num_results=2)
+        self.assertListEqual(
+            [variant['familyGuids'] for variant in variants],
+            [['F000003_3', shared_family.guid], ['F000002_2', 'F000003_3', shared_family.guid]])
+
+        sample_ids = ['HG00731', 'HG00732', 'HG00733', 'NA20870', 'NA20874']
+        self.assertExecutedSearch(filters=[ANNOTATION_QUERY, {'bool': {'should': [
+            {'terms': {'samples_num_alt_1': sample_ids}},
+            {'terms': {'samples_num_alt_2': sample_ids}},
+            {'terms': {'samples': sample_ids}},
+        ]}}])
+
+    @urllib3_responses.activate
+    @mock.patch('seqr.utils.elasticsearch.es_search.EsSearch.MAX_NAMED_FAMILY_QUERIES', 1)
+    def test_collapsed_any_affected_get_es_variants(self):
+        setup_responses()
+        shared_family = self._create_shared_sample_family()
+        search_model = VariantSearch.objects.create(search={
+            'annotations': {'frameshift': ['frameshift_variant']}, 'inheritance': {'mode': 'any_affected'},
+        })
+        results_model = VariantSearchResults.objects.create(variant_search=search_model)
+        results_model.families.set(list(self.families) + [shared_family])
+
+        variants, _ = get_es_variants(results_model, num_results=2)
+        # Families are only returned if an affected individual has an alt allele
+        self.assertListEqual(
+            [variant['familyGuids'] for variant in variants],
+            [['F000003_3', shared_family.guid], ['F000003_3', shared_family.guid]])
+
+        sample_ids = ['HG00731', 'NA20870']
+        self.assertExecutedSearch(filters=[ANNOTATION_QUERY, {'bool': {'should': [
+            {'terms': {'samples_num_alt_1': sample_ids}},
+            {'terms': {'samples_num_alt_2': sample_ids}},
+            {'terms': {'samples': sample_ids}},
+        ]}}])
+
+    @urllib3_responses.activate
+    @mock.patch('seqr.utils.elasticsearch.es_search.EsSearch.MAX_NAMED_FAMILY_QUERIES', 1)
+    def test_collapsed_de_novo_get_es_variants(self):
+        setup_responses()
+        shared_family = self._create_shared_sample_family()
+        search_model = VariantSearch.objects.create(search={
+            'annotations': {'frameshift': ['frameshift_variant']}, 'inheritance': {'mode': 'de_novo'},
+        })
+        results_model = VariantSearchResults.objects.create(variant_search=search_model)
+        results_model.families.set(Family.objects.filter(guid__in=['F000002_2', 'F000003_3', shared_family.guid]))
+
+        variants, _ = get_es_variants(results_model, num_results=2)
+        # Singleton families are matched by the parser and the trio is matched by its named query
+        self.assertListEqual(
+            [variant['familyGuids'] for variant in variants],
+            [['F000003_3', shared_family.guid], ['F000002_2', 'F000003_3', shared_family.guid]])
+
+        executed_search = urllib3_responses.call_request_json()
+        genotype_filters = executed_search['query']['bool']['filter'][1]['bool']['should']
+        self.assertListEqual(genotype_filters[:2], [
+            {'terms': {'samples_num_alt_1': ['NA20870']}},
+            {'terms': {'samples_num_alt_2': ['NA20870']}},
+        ])
+        self.assertListEqual([f['bool'].get('_name') for f in genotype_filters[2:]], ['F000002_2'])
+
+    @urllib3_responses.activate
+    @mock.patch('seqr.utils.elasticsearch.es_search.EsSearch.MAX_NAMED_FAMILY_QUERIES', 1)
+    def test_collapsed_compound_het_get_es_variants(self):
+        setup_responses()
+        shared_family = self._create_shared_sample_family(sample_id='NA20885')
+        search_model = VariantSearch.objects.create(search={
+            'annotations': {'frameshift': ['frameshift_variant']}, 'inheritance': {'mode': 'compound_het'},
+        })
+        results_model = VariantSearchResults.objects.create(variant_search=search_model)
+        results_model.families.set(list(self.families) + [shared_family])
+
+        # No named family matches these hits, so families can only be added by the parser
+        unmatched_variants = deepcopy(ES_VARIANTS)
+        for variant in unmatched_variants:
+            variant['matched_queries'] = {}
+        with mock.patch.dict(COMPOUND_HET_INDEX_VARIANTS, {
+                INDEX_NAME: {'ENSG00000135953': [], 'ENSG00000228198': unmatched_variants}}):
+            variants, total_results = get_es_variants(results_model, num_results=2)
+        self.assertEqual(total_results, 1)
+        self.assertListEqual([variant['variantId'] for variant in variants[0]], ['1-248367227-TC-T', '2-103343353-GAGA-G'])
+        self.assertListEqual([variant['familyGuids'] for variant in variants[0]], [[shared_family.guid]] * 2)
+
+        # Singleton families are collapsed and the trio is named
+        executed_search = urllib3_responses.call_request_json()
+        genotype_filters = executed_search['query']['bool']['filter'][1]['bool']['should']
+        self.assertListEqual([f['bool'].get('_name') for f in genotype_filters[:1]], ['F000002_2'])
+        self.assertListEqual(genotype_filters[1:], [{'terms': {'samples_num_alt_1': ['NA20870', 'NA20885']}}])
+
+    @urllib3_responses.activate
+    def test_get_es_variants_genotype_order(self):
+        setup_responses()
+        search_model = VariantSearch.objects.create(search={'annotations': {'frameshift': ['frameshift_variant']}})
+        results_model = VariantSearchResults.objects.create(variant_search=search_model)
+        results_model.families.set(self.families)
+
+        # Genotypes are returned in the order of the hit, which is used for the exported sample columns
+        reordered_variants = deepcopy(ES_VARIANTS)
+        reordered_variants[1]['_source']['genotypes'].reverse()
+        with mock.patch.dict(INDEX_ES_VARIANTS, {INDEX_NAME: reordered_variants}):
+            variants, _ = get_es_variants(results_model, num_results=2)
+        self.assertDictEqual(variants[1], PARSED_VARIANTS[1])
+        self.assertListEqual(
+            list(variants[1]['genotypes'].keys()),
+            ['I000007_na20870', 'I000006_hg00733', 'I000005_hg00732', 'I000004_hg00731'])
+
+    @urllib3_responses.activate
+    def test_get_es_variants_shared_cache(self):
+        setup_responses()
+        search_model = VariantSearch.objects.create(search={'annotations': {'frameshift': ['frameshift_variant']}})
+        results_model = VariantSearchResults.objects.create(variant_search=search_model, search_hash='abc')
+        results_model.families.set(self.families)
+
+        get_es_variants(results_model, num_results=2)
+        self.assertExecutedSearch(filters=[ANNOTATION_QUERY, ALL_INHERITANCE_QUERY])
+        MOCK_REDIS.incr.assert_called_with('search_results_cache_stats__misses')
+
+        # Identical searches over the same families share cached results
+        other_search_model = VariantSearch.objects.create(
+            search={'annotations': {'frameshift': ['frameshift_variant']}})
+        other_results_model = VariantSearchResults.objects.create(
+            variant_search=other_search_model, search_hash='def')
+        other_results_model.families.set(self.families)
+        self.assertEqual(
+            get_search_results_fingerprint(results_model), get_search_results_fingerprint(other_results_model))
+
+        # Cached results are returned after a single query for the searched families and indices
+        urllib3_responses.reset()
+        with self.assertNumQueries(1):
+            variants, total_results = get_es_variants(other_results_model, num_results=2)
+        self.assertListEqual(variants, PARSED_VARIANTS)
+        self.assertEqual(total_results, 5)
+        MOCK_REDIS.incr.assert_called_with('search_results_cache_stats__hits')
+
+        # Searches without genotype filters over the same families do not share results
+        setup_responses()
+        get_es_variants(other_results_model, num_results=2, skip_genotype_filter=True)
+        self.assertExecutedSearch(filters=[ANNOTATION_QUERY])
+        MOCK_REDIS.incr.assert_called_with('search_results_cache_stats__misses')
+        self.assertNotEqual(_get_cache_key(results_model), _get_cache_key(results_model, skip_genotype_filter=True))
+
+        urllib3_responses.reset()
+        variants, _ = get_es_variants(results_model, num_results=2)
+        self.assertListEqual(variants, PARSED_VARIANTS)
+        MOCK_REDIS.incr.assert_called_with('search_results_cache_stats__hits')
+
+        # Searches over different families or with a different search do not share results
+        other_results_model.families.set(self.families[:1])
+        self.assertNotEqual(
+            get_search_results_fingerprint(results_model), get_search_results_fingerprint(other_results_model))
+        other_search_model.search = {'annotations': {'frameshift': ['frameshift_variant']}, 'freqs': {}}
+        other_search_model.save()
+        other_results_model.families.set(self.families)
+        self.assertNotEqual(
+            get_search_results_fingerprint(results_model), get_search_results_fingerprint(other_results_model))
+
+    @mock.patch('seqr.utils.elasticsearch.es_search.SEARCH_AFTER_MIN_OFFSET', 2)
+    @urllib3_responses.activate
+    def test_get_es_variants_search_after(self):
+        setup_responses()
+        search_model = VariantSearch.objects.create(search={'annotations': {'frameshift': ['frameshift_variant']}})
+        results_model = VariantSearchResults.objects.create(variant_search=search_model)
+        results_model.families.set(self.families)
+
+        get_es_variants(results_model, num_results=2)
+        self.assertExecutedSearch(filters=[ANNOTATION_QUERY, ALL_INHERITANCE_QUERY])
+        self.assertCachedResults(results_model, {
+            'all_results': PARSED_VARIANTS,
+            'total_results': 5,
+            'search_after': {INDEX_NAME: {'loaded': 2, 'sort': [2103343353]}},
+        })
+
+        # next consecutive page continues from the last loaded hit
+        variants, total_results = get_es_variants(results_model, page=2, num_results=2)
+        self.assertEqual(len(variants), 2)
+        self.assertEqual(total_results, 5)
+        self.assertExecutedSearch(
+            filters=[ANNOTATION_QUERY, ALL_INHERITANCE_QUERY], size=2, search_after=[2103343353])
+        self.assertCachedResults(results_model, {
+            'all_results': PARSED_VARIANTS + PARSED_VARIANTS,
+            'total_results': 5,
+            'search_after': {INDEX_NAME: {'loaded': 4, 'sort': [2103343353]}},
+        })
+
+        # non-consecutive pages fall back to offset pagination
+        get_es_variants(results_model, page=5, num_results=2)
+        self.assertExecutedSearch(filters=[ANNOTATION_QUERY, ALL_INHERITANCE_QUERY], start_index=8, size=2)
+
+    @mock.patch('seqr.utils.elasticsearch.utils.CACHED_RESULTS_CHUNK_SIZE', 1)
+    @urllib3_responses.activate
+    def test_get_es_variants_cached_chunks(self):
+        setup_responses()
+        search_model = VariantSearch.objects.create(search={'annotations': {'frameshift': ['frameshift_variant']}})
+        results_model = VariantSearchResults.objects.create(variant_search=search_model)
+        results_model.families.set(self.families)
+        cache_key = _get_cache_key(results_model)
+
+        get_es_variants(results_model, num_results=2)
+        self.assertDictEqual(safe_redis_get_json(cache_key), {'all_results_count': 2, 'total_results': 5})
+        self.assertListEqual(safe_redis_get_json('{}__results__0'.format(cache_key)), [PARSED_VARIANTS[0]])
+        self.assertListEqual(safe_redis_get_json('{}__results__1'.format(cache_key)), [PARSED_VARIANTS[1]])
+
+        # only loads the cached chunks needed for the requested page
+        urllib3_responses.reset()
+        MOCK_REDIS.mget.reset_mock()
+        variants, total_results = get_es_variants(results_model, page=2, num_results=1)
+        self.assertListEqual(variants, [PARSED_VARIANTS[1]])
+        self.assertEqual(total_results, 5)
+        MOCK_REDIS.mget.assert_called_once_with(['{}__results__1'.format(cache_key)])
+
+        # re-runs the search if cached chunks have expired
+        setup_responses()
+        REDIS_CACHE.pop('{}__results__1'.format(cache_key))
+        variants, total_results = get_es_variants(results_model, page=2, num_results=1)
+        self.assertEqual(len(variants), 1)
+        self.assertEqual(total_results, 5)
+        self.assertExecutedSearch(filters=[ANNOTATION_QUERY, ALL_INHERITANCE_QUERY], start_index=1, size=1)
+
     @urllib3_responses.activate
     def test_filtered_get_es_variants(self):
         setup_responses()
@@ -1495,6 +1789,43 @@ class EsUtilsTest(TestCase):
             }}
         ], sort=[{'cadd_PHRED': {'order': 'desc', 'unmapped_type': 'keyword'}}, 'xpos', 'variantId'])
 
+    @urllib3_responses.activate
+    def test_locus_list_get_es_variants(self):
+        setup_responses()
+        search_model = VariantSearch.objects.create(search={
+            'annotations': {'frameshift': ['frameshift_variant']},
+            'locus': {
+                'locusListGuid': 'LL00049_pid_genes_autosomal_do',
+                'rawItems': 'DDX11L1, chr2:5000-6000, chr2:1234-5678, chr2:6001-7000',
+            },
+        })
+        results_model = VariantSearchResults.objects.create(variant_search=search_model)
+        results_model.families.set(self.families)
+
+        variants, _ = get_es_variants(results_model, num_results=2)
+        self.assertListEqual(variants, PARSED_VARIANTS)
+
+        self.assertExecutedSearch(filters=[
+            {'bool': {'should': [
+                {'range': {'xpos': {'gte': 2000001234, 'lte': 2000007000}}},
+                {'range': {'xstop': {'gte': 2000001234, 'lte': 2000007000}}},
+                {'bool': {'must': [
+                    {'range': {'xpos': {'lte': 2000001234}}},
+                    {'range': {'xstop': {'gte': 2000007000}}}]}},
+                {'terms': {'geneIds': ['ENSG00000223972']}},
+            ]}},
+            ANNOTATION_QUERY,
+            ALL_INHERITANCE_QUERY,
+        ])
+
+        cached_items = json.loads(REDIS_CACHE['locus_list_items__LL00049_pid_genes_autosomal_do'])
+        self.assertListEqual(cached_items['geneIds'], ['ENSG00000223972'])
+        self.assertListEqual(cached_items['intervals'], [
+            {'chrom': '2', 'start': 5000, 'end': 6000, 'offset': None},
+            {'chrom': '2', 'start': 1234, 'end': 5678, 'offset': None},
+            {'chrom': '2', 'start': 6001, 'end': 7000, 'offset': None},
+        ])
+
     @urllib3_responses.activate
     def test_sv_get_es_variants(self):
         setup_responses()
@@ -1559,6 +1890,56 @@ class EsUtilsTest(TestCase):
             dict(filters=[path_filter, ALL_INHERITANCE_QUERY], start_index=0, size=5, index=INDEX_NAME),
         ])
 
+    @mock.patch('seqr.utils.elasticsearch.es_search.ELASTICSEARCH_MAX_CONCURRENT_SEARCHES', 4)
+    @urllib3_responses.activate
+    def test_concurrent_multi_dataset_get_es_variants(self):
+        setup_responses()
+
+        search_model = VariantSearch.objects.create(search={'pathogenicity': {
+            'clinvar': ['pathogenic'],
+        }})
+        results_model = VariantSearchResults.objects.create(variant_search=search_model)
+        results_model.families.set(self.families)
+
+        variants, _ = get_es_variants(results_model, num_results=5)
+        self.assertListEqual(variants, [PARSED_SV_VARIANT] + PARSED_VARIANTS)
+
+        # Each index is searched separately instead of with a multi-search
+        search_calls = [call for call in urllib3_responses.calls if call.request.method == 'POST']
+        self.assertListEqual(
+            sorted([call.request.url.split('?')[0] for call in search_calls]),
+            ['/{}/_search'.format(INDEX_NAME), '/{}/_search'.format(SV_INDEX_NAME)])
+        path_filter = {'terms': {
+            'clinvar_clinical_significance': [
+                'Pathogenic', 'Pathogenic/Likely_pathogenic'
+            ]
+        }}
+        executed_searches = {
+            get_indices_from_url(call.request.url): json.loads(call.request.body) for call in search_calls
+        }
+        self.assertSameSearch(
+            executed_searches[SV_INDEX_NAME], dict(filters=[path_filter], start_index=0, size=5))
+        self.assertSameSearch(
+            executed_searches[INDEX_NAME], dict(filters=[path_filter, ALL_INHERITANCE_QUERY], start_index=0, size=5))
+
+    @mock.patch('seqr.utils.elasticsearch.es_search.SEARCH_AFTER_MIN_OFFSET', 1)
+    @mock.patch('seqr.utils.elasticsearch.es_search.ELASTICSEARCH_MAX_CONCURRENT_SEARCHES', 4)
+    @urllib3_responses.activate
+    def test_concurrent_search_after_get_es_variants(self):
+        setup_responses()
+
+        search_model = VariantSearch.objects.create(search={'pathogenicity': {
+            'clinvar': ['pathogenic'],
+        }})
+        results_model = VariantSearchResults.objects.create(variant_search=search_model)
+        results_model.families.set(self.families)
+
+        get_es_variants(results_model, num_results=5)
+
+        # The cursor for every concurrently searched index is kept
+        cached_results = safe_redis_get_json(_get_cache_key(results_model))
+        self.assertSetEqual(set(cached_results['search_after'].keys()), {INDEX_NAME, SV_INDEX_NAME})
+
     @urllib3_responses.activate
     def test_compound_het_get_es_variants(self):
         setup_responses()
@@ -1637,7 +2018,7 @@ class EsUtilsTest(TestCase):
             'annotations_secondary': {'other': ['intron']},
         }
         search_model.save()
-        _set_cache('search_results__{}__xpos'.format(results_model.guid), None)
+        _set_cache(_get_cache_key(results_model), None)
 
         variants, total_results = get_es_variants(results_model, num_results=2)
         self.assertIsNone(variants)
@@ -2113,7 +2494,7 @@ class EsUtilsTest(TestCase):
 
         # If one project is fully loaded, only query the second project
         cache_results['loaded_variant_counts'][INDEX_NAME]['total'] = 4
-        _set_cache('search_results__{}__xpos'.format(results_model.guid), json.dumps(cache_results))
+        _set_cache(_get_cache_key(results_model), json.dumps(cache_results))
         get_es_variants(results_model, num_results=2, page=3)
         project_2_search['start_index'] = 2
         project_2_search['size'] = 4
@@ -2165,7 +2546,7 @@ class EsUtilsTest(TestCase):
         )
 
         # test skipping page fetches all consecutively
-        _set_cache('search_results__{}__xpos'.format(results_model.guid), None)
+        _set_cache(_get_cache_key(results_model), None)
         get_es_variants(results_model, num_results=2, page=2)
         self.assertExecutedSearch(
             index='{},{}'.format(INDEX_NAME, SECOND_INDEX_NAME),
@@ -2254,7 +2635,7 @@ class EsUtilsTest(TestCase):
         mock_liftover.assert_not_called()
 
         # Test using python liftover
-        _set_cache('search_results__{}__xpos'.format(results_model.guid), None)
+        _set_cache(_get_cache_key(results_model), None)
         Sample.objects.filter(elasticsearch_index=SECOND_INDEX_NAME).update(elasticsearch_index=NO_LIFT_38_INDEX_NAME)
 
         mock_liftover.side_effect = Exception()
@@ -2270,7 +2651,7 @@ class EsUtilsTest(TestCase):
         self.assertIsNone(_liftover_grch38_to_grch37())
         mock_liftover.assert_called_with('hg38', 'hg19')
 
-        _set_cache('search_results__{}__xpos'.format(results_model.guid), None)
+        _set_cache(_get_cache_key(results_model), None)
         mock_liftover.side_effect = None
         mock_liftover.return_value.convert_coordinate.side_effect = lambda chrom, pos: [[chrom, pos - 10]]
         variants, _ = get_es_variants(results_model, num_results=2)
@@ -2308,7 +2689,7 @@ class EsUtilsTest(TestCase):
         # Test liftover variant to hg37
         mock_liftover.side_effect = None
         mock_liftover.return_value.convert_coordinate.side_effect = lambda chrom, pos: [[chrom, pos - 10]]
-        _set_cache('search_results__{}__xpos'.format(results_model.guid), None)
+        _set_cache(_get_cache_key(results_model), None)
         variants, _ = get_es_variants(results_model, num_results=2)
         self.assertEqual(len(variants), 1)
         self.assertDictEqual(variants[0], PARSED_MULTI_GENOME_VERSION_VARIANT)
@@ -2332,7 +2713,7 @@ class EsUtilsTest(TestCase):
         search_model.search['locus']['genomeVersion'] = '37'
         search_model.save()
         mock_liftover.side_effect = Exception()
-        _set_cache('search_results__{}__xpos'.format(results_model.guid), None)
+        _set_cache(_get_cache_key(results_model), None)
         get_es_variants(results_model, num_results=2)
         self.assertExecutedSearch(
             index='{},{}'.format(INDEX_NAME, SECOND_INDEX_NAME),
@@ -2346,7 +2727,7 @@ class EsUtilsTest(TestCase):
         # Test liftover variant to hg38
         mock_liftover.side_effect = None
         mock_liftover.return_value.convert_coordinate.side_effect = lambda chrom, pos: [[chrom, pos + 10]]
-        _set_cache('search_results__{}__xpos'.format(results_model.guid), None)
+        _set_cache(_get_cache_key(results_model), None)
         get_es_variants(results_model, num_results=2)
         self.assertExecutedSearch(
             index='{},{}'.format(INDEX_NAME, SECOND_INDEX_NAME),
@@ -2395,7 +2776,7 @@ class EsUtilsTest(TestCase):
             'loaded_variant_counts': {'test_index_compound_het': {'total': 2, 'loaded': 2}, INDEX_NAME: {'loaded': 2, 'total': 5}},
             'total_results': 7,
         }
-        _set_cache('search_results__{}__xpos'.format(results_model.guid), json.dumps(initial_cached_results))
+        _set_cache(_get_cache_key(results_model), json.dumps(initial_cached_results))
 
         #  Test gene counts
         gene_counts = get_es_variant_gene_counts(results_model)
@@ -2436,7 +2817,7 @@ class EsUtilsTest(TestCase):
             },
             'total_results': 13,
         }
-        _set_cache('search_results__{}__xpos'.format(results_model.guid), json.dumps(initial_cached_results))
+        _set_cache(_get_cache_key(results_model), json.dumps(initial_cached_results))
 
         #  Test gene counts
         gene_counts = get_es_variant_gene_counts(results_model)
@@ -2483,7 +2864,7 @@ class EsUtilsTest(TestCase):
         })
         results_model = VariantSearchResults.objects.create(variant_search=search_model)
         results_model.families.set(Family.objects.all())
-        _set_cache('search_results__{}__xpos'.format(results_model.guid), json.dumps({'total_results': 5}))
+        _set_cache(_get_cache_key(results_model), json.dumps({'total_results': 5}))
         gene_counts = get_es_variant_gene_counts(results_model)
 
         self.assertDictEqual(gene_counts, {
@@ -2543,7 +2924,7 @@ class EsUtilsTest(TestCase):
     def test_cached_get_es_variant_gene_counts(self):
         search_model = VariantSearch.objects.create(search={})
         results_model = VariantSearchResults.objects.create(variant_search=search_model)
-        cache_key = 'search_results__{}__xpos'.format(results_model.guid)
+        cache_key = _get_cache_key(results_model)
 
         cached_gene_counts = {
             'ENSG00000135953': {'total': 5, 'families': {'F000003_3': 2, 'F000002_2': 1, 'F000011_11': 4}},
@@ -2664,7 +3045,7 @@ class EsUtilsTest(TestCase):
         search_model = VariantSearch.objects.create(search={})
         results_model = VariantSearchResults.objects.create(variant_search=search_model)
         results_model.families.set(Family.objects.filter(guid='F000002_2'))
-        cache_key = 'search_results__{}__xpos'.format(results_model.guid)
+        cache_key = _get_cache_key(results_model)
 
         def _execute_inheritance_search(
                 mode=None, inheritance_filter=None, expected_filter=None, expected_comp_het_filter=None,
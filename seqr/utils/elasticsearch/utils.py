@@ -1,15 +1,22 @@
+from collections import defaultdict, OrderedDict
 from datetime import timedelta
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db.models import Case, F, When
 import elasticsearch
 from elasticsearch_dsl import Q
+import hashlib
+import json
 import logging
+import time
 
 from settings import ELASTICSEARCH_SERVICE_HOSTNAME, ELASTICSEARCH_SERVICE_PORT, ELASTICSEARCH_CREDENTIALS, ELASTICSEARCH_PROTOCOL, ES_SSL_CONTEXT
-from seqr.models import Sample
-from seqr.utils.redis_utils import safe_redis_get_json, safe_redis_set_json
+from seqr.models import Sample, VariantSearchResults
+from seqr.utils.redis_utils import safe_redis_get_json, safe_redis_set_json, safe_redis_mget_json, \
+    safe_redis_mset_json, safe_redis_incr, safe_redis_delete
 from seqr.utils.elasticsearch.constants import XPOS_SORT_KEY, MAX_VARIANTS
 from seqr.utils.elasticsearch.es_gene_agg_search import EsGeneAggSearch
 from seqr.utils.elasticsearch.es_search import EsSearch
-from seqr.utils.gene_utils import parse_locus_list_items
+from seqr.utils.gene_utils import parse_locus_list_gene_ids
 from seqr.utils.xpos_utils import get_xpos, get_chrom_pos
 
 logger = logging.getLogger(__name__)
@@ -21,6 +28,9 @@ class InvalidIndexException(Exception):
 class InvalidSearchException(Exception):
     pass
 
+class ExpiredCachedResultsException(Exception):
+    pass
+
 
 def get_es_client(timeout=60, **kwargs):
     client_kwargs = {
@@ -36,11 +46,51 @@ def get_es_client(timeout=60, **kwargs):
     return elasticsearch.Elasticsearch(**client_kwargs, **kwargs)
 
 
+# Index mappings only change when a new dataset is loaded, so each worker keeps recently used metadata in memory
+INDEX_METADATA_LOCAL_CACHE_SIZE = 256
+INDEX_METADATA_LOCAL_CACHE_TTL_SECONDS = 600
+INDEX_METADATA_LOCAL_CACHE = OrderedDict()
+
+
+def get_local_index_metadata(index_name):
+    cached = INDEX_METADATA_LOCAL_CACHE.get(index_name)
+    if not cached:
+        return None
+    expires_at, index_metadata = cached
+    if expires_at < time.monotonic():
+        INDEX_METADATA_LOCAL_CACHE.pop(index_name, None)
+        return None
+    INDEX_METADATA_LOCAL_CACHE.move_to_end(index_name)
+    return index_metadata
+
+
+def set_local_index_metadata(index_name, index_metadata):
+    INDEX_METADATA_LOCAL_CACHE[index_name] = (time.monotonic() + INDEX_METADATA_LOCAL_CACHE_TTL_SECONDS, index_metadata)
+    INDEX_METADATA_LOCAL_CACHE.move_to_end(index_name)
+    while len(INDEX_METADATA_LOCAL_CACHE) > INDEX_METADATA_LOCAL_CACHE_SIZE:
+        INDEX_METADATA_LOCAL_CACHE.popitem(last=False)
+
+
+def clear_local_index_metadata():
+    INDEX_METADATA_LOCAL_CACHE.clear()
+
+
+def get_index_metadata_cache_key(index_name):
+    return 'index_metadata__{}'.format(index_name)
+
+
 def get_index_metadata(index_name, client, include_fields=False, use_cache=True):
+    if use_cache and include_fields:
+        local_metadata = get_local_index_metadata(index_name)
+        if local_metadata:
+            return local_metadata
+
     if use_cache:
-        cache_key = 'index_metadata__{}'.format(index_name)
+        cache_key = get_index_metadata_cache_key(index_name)
         cached_metadata = safe_redis_get_json(cache_key)
         if cached_metadata:
+            if include_fields:
+                set_local_index_metadata(index_name, cached_metadata)
             return cached_metadata
 
     try:
@@ -49,16 +99,17 @@ def get_index_metadata(index_name, client, include_fields=False, use_cache=True)
         raise InvalidIndexException('{} - Error accessing index: {}'.format(
             index_name, e.error if hasattr(e, 'error') else str(e)))
     index_metadata = {}
-    for index_name, mapping in mappings.items():
+    for index, mapping in mappings.items():
         variant_mapping = mapping['mappings']
-        index_metadata[index_name] = variant_mapping.get('_meta', {})
+        index_metadata[index] = variant_mapping.get('_meta', {})
         if include_fields:
-            index_metadata[index_name]['fields'] = {
+            index_metadata[index]['fields'] = {
                 field: field_props.get('type') for field, field_props in variant_mapping['properties'].items()
             }
     if use_cache and include_fields:
         # Only cache metadata with fields
         safe_redis_set_json(cache_key, index_metadata)
+        set_local_index_metadata(index_name, index_metadata)
     return index_metadata
 
 
@@ -88,21 +139,200 @@ def get_es_variants_for_variant_tuples(families, xpos_ref_alt_tuples):
     return get_es_variants_for_variant_ids(families, variant_ids, dataset_type=Sample.DATASET_TYPE_VARIANT_CALLS)
 
 
-def get_es_variants(search_model, es_search_cls=EsSearch, sort=XPOS_SORT_KEY, skip_genotype_filter=False, load_all=False, **kwargs):
-    cache_key = 'search_results__{}__{}'.format(search_model.guid, sort or XPOS_SORT_KEY)
+SEARCH_RESULTS_CACHE_EXPIRE = timedelta(weeks=2)
+CACHED_RESULTS_CHUNK_SIZE = 100
+
+
+class CachedResultsList(object):
+    """
+    List-like view of the "all_results" for a cached search. Results are stored in redis in fixed size chunks, and only
+    the chunks needed for the requested slice are fetched. Appended results are held in memory until the search is saved
+    """
+
+    def __init__(self, cache_key, count, loaded_chunks=None, new_results=None):
+        self._cache_key = cache_key
+        self._persisted_count = count
+        self._loaded_chunks = loaded_chunks if loaded_chunks is not None else {}
+        self._new_results = new_results or []
+
+    def __len__(self):
+        return self._persisted_count + len(self._new_results)
+
+    def __add__(self, results):
+        return CachedResultsList(
+            self._cache_key, self._persisted_count, loaded_chunks=self._loaded_chunks,
+            new_results=self._new_results + list(results),
+        )
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            index = key + len(self) if key < 0 else key
+            if index < 0 or index >= len(self):
+                raise IndexError('list index out of range')
+            return self[index:index + 1][0]
+
+        start, stop, step = key.indices(len(self))
+        if stop <= start:
+            return []
+
+        results = []
+        if start < self._persisted_count:
+            persisted_stop = min(stop, self._persisted_count)
+            chunks = self._load_chunks(range(start // CACHED_RESULTS_CHUNK_SIZE, (persisted_stop - 1) // CACHED_RESULTS_CHUNK_SIZE + 1))
+            chunk_offset = (start // CACHED_RESULTS_CHUNK_SIZE) * CACHED_RESULTS_CHUNK_SIZE
+            results = chunks[start - chunk_offset:persisted_stop - chunk_offset]
+        if stop > self._persisted_count:
+            results += self._new_results[max(start - self._persisted_count, 0):stop - self._persisted_count]
+        return results[::step]
+
+    def _load_chunks(self, chunk_indices):
+        missing_keys = [
+            _cached_results_chunk_key(self._cache_key, i) for i in chunk_indices if i not in self._loaded_chunks
+        ]
+        cached_chunks = safe_redis_mget_json(missing_keys)
+        for i in chunk_indices:
+            if i not in self._loaded_chunks:
+                chunk = cached_chunks.get(_cached_results_chunk_key(self._cache_key, i))
+                if chunk is None:
+                    raise ExpiredCachedResultsException('Missing cached results chunk {} for {}'.format(i, self._cache_key))
+                self._loaded_chunks[i] = chunk
+        return [result for i in chunk_indices for result in self._loaded_chunks[i]]
+
+    def get_updated_chunks(self):
+        """Returns the chunks containing new results, and the indices of the previously saved chunks that are unchanged"""
+        first_updated_chunk = self._persisted_count // CACHED_RESULTS_CHUNK_SIZE
+        if not self._new_results:
+            return {}, list(range(_num_chunks(self._persisted_count)))
+        first_updated_index = first_updated_chunk * CACHED_RESULTS_CHUNK_SIZE
+        return _get_chunks(self[first_updated_index:], first_updated_chunk), list(range(first_updated_chunk))
+
+
+def _cached_results_chunk_key(cache_key, chunk_index):
+    return '{}__results__{}'.format(cache_key, chunk_index)
+
+
+def _num_chunks(count):
+    return (count + CACHED_RESULTS_CHUNK_SIZE - 1) // CACHED_RESULTS_CHUNK_SIZE
+
+
+def _get_chunks(results, first_chunk_index=0):
+    return {
+        first_chunk_index + i: results[i * CACHED_RESULTS_CHUNK_SIZE:(i + 1) * CACHED_RESULTS_CHUNK_SIZE]
+        for i in range(_num_chunks(len(results)))
+    }
+
+
+def _get_cached_search_results(cache_key):
     previous_search_results = safe_redis_get_json(cache_key) or {}
+    all_results_count = previous_search_results.pop('all_results_count', None)
+    if all_results_count is not None:
+        previous_search_results['all_results'] = CachedResultsList(cache_key, all_results_count)
+    return previous_search_results
+
+
+def _set_cached_search_results(cache_key, search_results):
+    # Results are cached as a small header and separate chunks of loaded results, so only new chunks need to be written
+    cached_values = {}
+    unchanged_chunk_keys = []
+    header = {k: v for k, v in search_results.items() if k != 'all_results'}
+    all_results = search_results.get('all_results')
+    if all_results is not None:
+        header['all_results_count'] = len(all_results)
+        if isinstance(all_results, CachedResultsList):
+            updated_chunks, unchanged_chunks = all_results.get_updated_chunks()
+            unchanged_chunk_keys = [_cached_results_chunk_key(cache_key, i) for i in unchanged_chunks]
+        else:
+            updated_chunks = _get_chunks(all_results)
+        cached_values.update({
+            _cached_results_chunk_key(cache_key, i): chunk for i, chunk in updated_chunks.items()
+        })
+    cached_values[cache_key] = header
+    safe_redis_mset_json(cached_values, expire=SEARCH_RESULTS_CACHE_EXPIRE, refresh_expire_keys=unchanged_chunk_keys)
+
+
+SEARCH_RESULTS_CACHE_HITS_KEY = 'search_results_cache_stats__hits'
+SEARCH_RESULTS_CACHE_MISSES_KEY = 'search_results_cache_stats__misses'
+
+
+def get_search_results_fingerprints(search_models):
+    """
+    Fingerprints for the results of searches, shared by all users and saved searches running the same query over the
+    same families. The searched indices are included so results are not reused once a new index is loaded. The families
+    and indices for all the searches are loaded in a single query
+    """
+    search_family_indices = defaultdict(dict)
+    for search_family in VariantSearchResults.families.through.objects.filter(
+            variantsearchresults__in=search_models).values('variantsearchresults_id', 'family__guid').annotate(
+            indices=ArrayAgg(Case(When(
+                family__individual__sample__is_active=True, then=F('family__individual__sample__elasticsearch_index'),
+            )), distinct=True)):
+        search_family_indices[search_family['variantsearchresults_id']][search_family['family__guid']] = \
+            search_family['indices']
+
+    fingerprints = {}
+    for search_model in search_models:
+        family_indices = search_family_indices[search_model.id]
+        fingerprint = json.dumps({
+            'search': search_model.variant_search.search,
+            'families': sorted(family_indices.keys()),
+            'indices': sorted({index for indices in family_indices.values() for index in indices if index}),
+        }, sort_keys=True)
+        fingerprints[search_model.id] = hashlib.md5(fingerprint.encode('utf-8')).hexdigest()
+    return fingerprints
+
+
+def get_search_results_fingerprint(search_model):
+    return get_search_results_fingerprints([search_model])[search_model.id]
+
+
+def get_search_results_cache_stats():
+    cached_counts = safe_redis_mget_json([SEARCH_RESULTS_CACHE_HITS_KEY, SEARCH_RESULTS_CACHE_MISSES_KEY])
+    return {
+        'hits': cached_counts.get(SEARCH_RESULTS_CACHE_HITS_KEY, 0),
+        'misses': cached_counts.get(SEARCH_RESULTS_CACHE_MISSES_KEY, 0),
+    }
+
+
+def _get_search_results_cache_key(search_model, sort, skip_genotype_filter):
+    fingerprint = get_search_results_fingerprint(search_model)
+    if skip_genotype_filter:
+        # Searches without genotype filters return different results for the same families
+        fingerprint = '{}__no_genotype_filter'.format(fingerprint)
+    return 'search_results__{}__{}'.format(fingerprint, sort or XPOS_SORT_KEY)
+
+
+def get_es_variants(search_model, es_search_cls=EsSearch, sort=XPOS_SORT_KEY, skip_genotype_filter=False, **kwargs):
+    cache_key = _get_search_results_cache_key(search_model, sort, skip_genotype_filter)
+    try:
+        return _get_es_variants(
+            search_model, cache_key, _get_cached_search_results(cache_key), es_search_cls=es_search_cls, sort=sort,
+            skip_genotype_filter=skip_genotype_filter, **kwargs)
+    except ExpiredCachedResultsException as e:
+        logger.warning('Reloading expired search results: {}'.format(e))
+        return _get_es_variants(
+            search_model, cache_key, {}, es_search_cls=es_search_cls, sort=sort,
+            skip_genotype_filter=skip_genotype_filter, **kwargs)
+
+
+def _get_es_variants(search_model, cache_key, previous_search_results, es_search_cls=EsSearch, sort=XPOS_SORT_KEY,
+                     skip_genotype_filter=False, load_all=False, **kwargs):
     total_results = previous_search_results.get('total_results')
 
     previously_loaded_results, search_kwargs = es_search_cls.process_previous_results(previous_search_results, load_all=load_all, **kwargs)
     if previously_loaded_results is not None:
+        safe_redis_incr(SEARCH_RESULTS_CACHE_HITS_KEY)
         return previously_loaded_results, previous_search_results.get('total_results')
+    safe_redis_incr(SEARCH_RESULTS_CACHE_MISSES_KEY)
 
     if load_all and total_results and int(total_results) >= int(MAX_VARIANTS):
         raise InvalidSearchException('Too many variants to load. Please refine your search and try again')
 
     search = search_model.variant_search.search
 
-    genes, intervals, invalid_items = parse_locus_list_items(search.get('locus', {}))
+    gene_ids, intervals, invalid_items = _parse_locus_list_items(search.get('locus', {}))
     if invalid_items:
         raise InvalidSearchException('Invalid genes/intervals: {}'.format(', '.join(invalid_items)))
     rs_ids, variant_ids, invalid_items = _parse_variant_items(search.get('locus', {}))
@@ -125,10 +355,10 @@ def get_es_variants(search_model, es_search_cls=EsSearch, sort=XPOS_SORT_KEY, sk
     if sort:
         es_search.sort(sort)
 
-    if genes or intervals or rs_ids or variant_ids:
+    if gene_ids or intervals or rs_ids or variant_ids:
         es_search.filter_by_location(
-            genes=genes, intervals=intervals, rs_ids=rs_ids, variant_ids=variant_ids, locus=search['locus'])
-        if (variant_ids or rs_ids) and not (genes or intervals) and not search['locus'].get('excludeLocations'):
+            gene_ids=gene_ids, intervals=intervals, rs_ids=rs_ids, variant_ids=variant_ids, locus=search['locus'])
+        if (variant_ids or rs_ids) and not (gene_ids or intervals) and not search['locus'].get('excludeLocations'):
             search_kwargs['num_results'] = len(variant_ids) + len(rs_ids)
 
     if search.get('freqs'):
@@ -144,7 +374,7 @@ def get_es_variants(search_model, es_search_cls=EsSearch, sort=XPOS_SORT_KEY, sk
 
     variant_results = es_search.search(**search_kwargs)
 
-    safe_redis_set_json(cache_key, es_search.previous_search_results, expire=timedelta(weeks=2))
+    _set_cached_search_results(cache_key, es_search.previous_search_results)
 
     return variant_results, es_search.previous_search_results.get('total_results')
 
@@ -154,6 +384,38 @@ def get_es_variant_gene_counts(search_model):
     return gene_counts
 
 
+LOCUS_LIST_ITEMS_CACHE_EXPIRE = timedelta(weeks=2)
+
+
+def get_locus_list_items_cache_key(locus_list_guid):
+    return 'locus_list_items__{}'.format(locus_list_guid)
+
+
+def clear_cached_locus_list_items(locus_list_guid):
+    safe_redis_delete(get_locus_list_items_cache_key(locus_list_guid))
+
+
+def _parse_locus_list_items(search_json):
+    # Searches on a saved locus list reuse its parsed items, unless the items were edited for this search
+    locus_list_guid = search_json.get('locusListGuid')
+    raw_items = search_json.get('rawItems')
+    if not (locus_list_guid and raw_items):
+        return parse_locus_list_gene_ids(search_json)
+
+    cache_key = get_locus_list_items_cache_key(locus_list_guid)
+    raw_items_hash = hashlib.md5(raw_items.encode('utf-8')).hexdigest()
+    cached_items = safe_redis_get_json(cache_key)
+    if cached_items and cached_items['rawItemsHash'] == raw_items_hash:
+        return cached_items['geneIds'], cached_items['intervals'], []
+
+    gene_ids, intervals, invalid_items = parse_locus_list_gene_ids(search_json)
+    if not invalid_items:
+        safe_redis_set_json(cache_key, {
+            'rawItemsHash': raw_items_hash, 'geneIds': gene_ids, 'intervals': intervals,
+        }, expire=LOCUS_LIST_ITEMS_CACHE_EXPIRE)
+    return gene_ids, intervals, invalid_items
+
+
 def _parse_variant_items(search_json):
     raw_items = search_json.get('rawVariantItems')
     if not raw_items:
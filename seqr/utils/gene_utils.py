@@ -148,6 +148,27 @@ def parse_locus_list_items(request_json):
     if not raw_items:
         return None, None, None
 
+    gene_ids, intervals, invalid_items = _parse_raw_locus_list_items(raw_items)
+    genes_by_id = get_genes(list(gene_ids)) if gene_ids else {}
+    invalid_items += [gene_id for gene_id in gene_ids if not genes_by_id.get(gene_id)]
+    return genes_by_id, intervals, invalid_items
+
+
+def parse_locus_list_gene_ids(request_json):
+    """Parses locus list items the same way as parse_locus_list_items, but only validates gene ids instead of loading
+    the full gene records"""
+    raw_items = request_json.get('rawItems')
+    if not raw_items:
+        return None, None, None
+
+    gene_ids, intervals, invalid_items = _parse_raw_locus_list_items(raw_items)
+    valid_gene_ids = set(
+        GeneInfo.objects.filter(gene_id__in=gene_ids).values_list('gene_id', flat=True)) if gene_ids else set()
+    invalid_items += [gene_id for gene_id in gene_ids if gene_id not in valid_gene_ids]
+    return sorted(valid_gene_ids), intervals, invalid_items
+
+
+def _parse_raw_locus_list_items(raw_items):
     invalid_items = []
     intervals = []
     gene_ids = set()
@@ -181,6 +202,4 @@ def parse_locus_list_items(request_json):
     gene_symbols_to_ids = get_gene_ids_for_gene_symbols(gene_symbols)
     invalid_items += [symbol for symbol in gene_symbols if not gene_symbols_to_ids.get(symbol)]
     gene_ids.update({gene_ids[0] for gene_ids in gene_symbols_to_ids.values() if len(gene_ids)})
-    genes_by_id = get_genes(list(gene_ids)) if gene_ids else {}
-    invalid_items += [gene_id for gene_id in gene_ids if not genes_by_id.get(gene_id)]
-    return genes_by_id, intervals, invalid_items
\ No newline at end of file
+    return gene_ids, intervals, invalid_items
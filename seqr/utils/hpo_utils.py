@@ -0,0 +1,96 @@
+import logging
+import math
+import time
+from collections import defaultdict, namedtuple
+from django.db.models import Max
+
+from reference_data.models import HumanPhenotypeOntology
+
+logger = logging.getLogger(__name__)
+
+# How often to check whether the HPO table has been reloaded since the in-memory ontology was built
+HPO_ONTOLOGY_CHECK_INTERVAL_SECONDS = 600
+
+# Each term is assigned an index such that every term has a higher index than all of its ancestors. Ancestors are
+# stored as an integer bitset of these indices, so the most informative common ancestor of two terms is the highest
+# set bit of the intersection of their ancestor sets
+HpoOntology = namedtuple('HpoOntology', ['term_indices', 'ancestors', 'information_content', 'max_id', 'checked'])
+
+HPO_ONTOLOGY = None
+
+
+def get_hpo_ontology():
+    """Returns the in-memory HPO ontology, building it if it has not been built or if the HPO table has changed"""
+    global HPO_ONTOLOGY
+    if HPO_ONTOLOGY and time.time() - HPO_ONTOLOGY.checked < HPO_ONTOLOGY_CHECK_INTERVAL_SECONDS:
+        return HPO_ONTOLOGY
+
+    max_id = HumanPhenotypeOntology.objects.aggregate(max_id=Max('id'))['max_id']
+    if HPO_ONTOLOGY and HPO_ONTOLOGY.max_id == max_id:
+        HPO_ONTOLOGY = HPO_ONTOLOGY._replace(checked=time.time())
+    else:
+        HPO_ONTOLOGY = _build_hpo_ontology(max_id)
+    return HPO_ONTOLOGY
+
+
+def reset_hpo_ontology():
+    global HPO_ONTOLOGY
+    HPO_ONTOLOGY = None
+
+
+def _build_hpo_ontology(max_id):
+    parent_ids = dict(HumanPhenotypeOntology.objects.values_list('hpo_id', 'parent_id'))
+    children = defaultdict(list)
+    roots = []
+    for hpo_id, parent_id in parent_ids.items():
+        if parent_id in parent_ids:
+            children[parent_id].append(hpo_id)
+        else:
+            roots.append(hpo_id)
+
+    # breadth first ordering guarantees that parents are indexed before their children
+    ordered_hpo_ids = sorted(roots)
+    for hpo_id in ordered_hpo_ids:
+        ordered_hpo_ids += sorted(children[hpo_id])
+    term_indices = {hpo_id: i for i, hpo_id in enumerate(ordered_hpo_ids)}
+
+    ancestors = []
+    for i, hpo_id in enumerate(ordered_hpo_ids):
+        parent_index = term_indices.get(parent_ids[hpo_id])
+        ancestors.append((1 << i) | (ancestors[parent_index] if parent_index is not None else 0))
+
+    # intrinsic information content, based on the fraction of all terms that are descendants of a given term
+    num_descendants = [1] * len(ordered_hpo_ids)
+    for i in reversed(range(len(ordered_hpo_ids))):
+        parent_index = term_indices.get(parent_ids[ordered_hpo_ids[i]])
+        if parent_index is not None:
+            num_descendants[parent_index] += num_descendants[i]
+    information_content = [-math.log(count / len(ordered_hpo_ids)) for count in num_descendants]
+
+    logger.info('Loaded HPO ontology with {} terms'.format(len(ordered_hpo_ids)))
+    return HpoOntology(
+        term_indices=term_indices, ancestors=ancestors, information_content=information_content, max_id=max_id,
+        checked=time.time(),
+    )
+
+
+def get_phenotype_similarity(hpo_id_1, hpo_id_2, ontology=None):
+    """Returns the Lin similarity between two HPO terms, ranging from 0 for unrelated terms to 1 for identical terms"""
+    if hpo_id_1 == hpo_id_2:
+        return 1
+
+    ontology = ontology or get_hpo_ontology()
+    index_1 = ontology.term_indices.get(hpo_id_1)
+    index_2 = ontology.term_indices.get(hpo_id_2)
+    if index_1 is None or index_2 is None:
+        return 0
+
+    common_ancestors = ontology.ancestors[index_1] & ontology.ancestors[index_2]
+    if not common_ancestors:
+        return 0
+
+    total_information_content = ontology.information_content[index_1] + ontology.information_content[index_2]
+    if not total_information_content:
+        return 0
+    most_informative_common_ancestor = common_ancestors.bit_length() - 1
+    return 2 * ontology.information_content[most_informative_common_ancestor] / total_information_content
@@ -0,0 +1,48 @@
+from django.test import TestCase
+import mock
+
+from reference_data.models import HumanPhenotypeOntology
+from seqr.utils.hpo_utils import get_hpo_ontology, get_phenotype_similarity, reset_hpo_ontology
+
+
+class HpoUtilsTest(TestCase):
+    databases = '__all__'
+    fixtures = ['reference_data']
+
+    def setUp(self):
+        reset_hpo_ontology()
+
+    def tearDown(self):
+        reset_hpo_ontology()
+
+    def test_get_phenotype_similarity(self):
+        HumanPhenotypeOntology.objects.bulk_create([
+            HumanPhenotypeOntology(hpo_id=hpo_id, parent_id=parent_id, name=hpo_id) for hpo_id, parent_id in [
+                ('HP:0000001', None), ('HP:0008800', 'HP:0000001'), ('HP:0011458', 'HP:0000001'),
+                ('HP:0011459', 'HP:0011458'),
+            ]])
+
+        self.assertEqual(get_phenotype_similarity('HP:0001252', 'HP:0001252'), 1)
+        self.assertEqual(get_phenotype_similarity('HP:0001252', 'HP:0009999'), 0)
+        # Terms with no common ancestor are unrelated
+        self.assertEqual(get_phenotype_similarity('HP:0001252', 'HP:0012469'), 0)
+        self.assertAlmostEqual(get_phenotype_similarity('HP:0001252', 'HP:0003273'), 0.0528, places=4)
+        self.assertAlmostEqual(get_phenotype_similarity('HP:0001631', 'HP:0003273'), 0.2321, places=4)
+        self.assertAlmostEqual(get_phenotype_similarity('HP:0002017', 'HP:0001252'), 0.4881, places=4)
+        self.assertAlmostEqual(get_phenotype_similarity('HP:0001252', 'HP:0011458'), 0.656, places=4)
+        self.assertEqual(
+            get_phenotype_similarity('HP:0001631', 'HP:0003273'), get_phenotype_similarity('HP:0003273', 'HP:0001631'))
+
+    @mock.patch('seqr.utils.hpo_utils.HPO_ONTOLOGY_CHECK_INTERVAL_SECONDS', 0)
+    def test_get_hpo_ontology(self):
+        ontology = get_hpo_ontology()
+        self.assertEqual(len(ontology.term_indices), 11)
+        self.assertIs(get_hpo_ontology().term_indices, ontology.term_indices)
+
+        # Rebuilds the ontology when the table is reloaded
+        HumanPhenotypeOntology.objects.create(hpo_id='HP:0008800', name='Abnormal joint morphology')
+        updated_ontology = get_hpo_ontology()
+        self.assertEqual(len(updated_ontology.term_indices), 12)
+        parent_index = updated_ontology.term_indices['HP:0008800']
+        child_index = updated_ontology.term_indices['HP:0003273']
+        self.assertTrue(updated_ontology.ancestors[child_index] & (1 << parent_index))
@@ -3,6 +3,7 @@ from django.core.exceptions import PermissionDenied, ObjectDoesNotExist
 from django.core.handlers.exception import get_exception_response
 from django.http import Http404
 from django.http.request import RawPostDataException
+from django.middleware.gzip import GZipMiddleware
 from django.utils.deprecation import MiddlewareMixin
 from django.urls import get_resolver, get_urlconf
 import elasticsearch.exceptions
@@ -91,6 +92,17 @@ class JsonErrorMiddleware(MiddlewareMixin):
         response._has_been_logged = True
         return response
 
+
+class JsonGZipMiddleware(GZipMiddleware):
+    """Compresses json API responses. Other responses are left as is, as static files are already compressed by
+    whitenoise and compressing html pages that include a csrf token is vulnerable to the BREACH attack"""
+
+    def process_response(self, request, response):
+        if not response.get('Content-Type', '').startswith('application/json'):
+            return response
+        return super(JsonGZipMiddleware, self).process_response(request, response)
+
+
 class LogRequestMiddleware(MiddlewareMixin):
 
     @staticmethod
@@ -0,0 +1,32 @@
+import gzip
+import json
+
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from seqr.utils.middleware import JsonGZipMiddleware
+from seqr.views.utils.json_utils import create_json_response
+
+RESPONSE_JSON = {'variants': ['1-248367227-TC-T'] * 50}
+RESPONSE_HTML = '<html><body>{}</body></html>'.format('<div>test</div>' * 50)
+
+
+class JsonGZipMiddlewareTest(TestCase):
+
+    def test_json_gzip_middleware(self):
+        request = RequestFactory().get('/api/test', HTTP_ACCEPT_ENCODING='gzip')
+
+        response = JsonGZipMiddleware(lambda request: create_json_response(RESPONSE_JSON))(request)
+        self.assertEqual(response.get('Content-Encoding'), 'gzip')
+        self.assertDictEqual(json.loads(gzip.decompress(response.content)), RESPONSE_JSON)
+
+        # html responses are not compressed
+        response = JsonGZipMiddleware(lambda request: HttpResponse(RESPONSE_HTML))(request)
+        self.assertIsNone(response.get('Content-Encoding'))
+        self.assertEqual(response.content.decode('utf-8'), RESPONSE_HTML)
+
+        # responses are not compressed for clients that do not accept gzip
+        request = RequestFactory().get('/api/test')
+        response = JsonGZipMiddleware(lambda request: create_json_response(RESPONSE_JSON))(request)
+        self.assertIsNone(response.get('Content-Encoding'))
+        self.assertDictEqual(json.loads(response.content), RESPONSE_JSON)
@@ -1,19 +1,39 @@
 import json
 import logging
 import redis
+import zlib
 
-from settings import REDIS_SERVICE_HOSTNAME
+from settings import REDIS_SERVICE_HOSTNAME, REDIS_SERVICE_PORT, REDIS_MAX_CONNECTIONS, REDIS_SOCKET_CONNECT_TIMEOUT, \
+    REDIS_SOCKET_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
+# Values are stored as plain JSON unless they are large enough that compressing them is worthwhile. Compressed values
+# are prefixed with a versioned header so the encoding can change without invalidating existing cached values
+COMPRESSED_VALUE_HEADER = b'seqr:zlib:1:'
+COMPRESSION_MIN_BYTES = 10 * 1024
+COMPRESSION_LEVEL = 3
+
+REDIS_CONNECTION_POOL = None
+def get_redis_client():
+    # Connections are shared across all calls in the process rather than opened per request
+    global REDIS_CONNECTION_POOL
+    if not REDIS_CONNECTION_POOL:
+        REDIS_CONNECTION_POOL = redis.BlockingConnectionPool(
+            host=REDIS_SERVICE_HOSTNAME, port=REDIS_SERVICE_PORT, max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_SOCKET_CONNECT_TIMEOUT, socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+        )
+    return redis.StrictRedis(connection_pool=REDIS_CONNECTION_POOL)
+
 
 def safe_redis_get_json(cache_key):
     try:
-        redis_client = redis.StrictRedis(host=REDIS_SERVICE_HOSTNAME, socket_connect_timeout=3)
+        redis_client = get_redis_client()
         value = redis_client.get(cache_key)
         if value:
             logger.info('Loaded {} from redis'.format(cache_key))
-            return json.loads(value)
+            return _decode_value(value)
     except ValueError as e:
         logger.warning('Unable to fetch "{}" from redis:\t{}'.format(cache_key, str(e)))
     except Exception as e:
@@ -21,11 +41,81 @@ def safe_redis_get_json(cache_key):
     return None
 
 
+def safe_redis_mget_json(cache_keys):
+    """Fetches multiple keys in a single round trip. Returns a dict of the keys present in the cache"""
+    results = {}
+    if not cache_keys:
+        return results
+    try:
+        redis_client = get_redis_client()
+        values = redis_client.mget(cache_keys)
+    except Exception as e:
+        logger.error('Unable to connect to redis host {}: {}'.format(REDIS_SERVICE_HOSTNAME, str(e)))
+        return results
+
+    for cache_key, value in zip(cache_keys, values):
+        if not value:
+            continue
+        try:
+            results[cache_key] = _decode_value(value)
+            logger.info('Loaded {} from redis'.format(cache_key))
+        except ValueError as e:
+            logger.warning('Unable to fetch "{}" from redis:\t{}'.format(cache_key, str(e)))
+    return results
+
+
 def safe_redis_set_json(cache_key, value, expire=None):
     try:
-        redis_client = redis.StrictRedis(host=REDIS_SERVICE_HOSTNAME, socket_connect_timeout=3)
-        redis_client.set(cache_key, json.dumps(value))
+        redis_client = get_redis_client()
+        redis_client.set(cache_key, _encode_value(value), ex=expire)
+    except Exception as e:
+        logger.error('Unable to write to redis host {}: {}'.format(REDIS_SERVICE_HOSTNAME, str(e)))
+
+
+def safe_redis_mset_json(values_by_key, expire=None, refresh_expire_keys=None):
+    """Writes multiple keys in a single pipelined round trip, optionally resetting the expiry of other existing keys"""
+    if not values_by_key:
+        return
+    try:
+        redis_client = get_redis_client()
+        pipeline = redis_client.pipeline(transaction=False)
+        for cache_key, value in values_by_key.items():
+            pipeline.set(cache_key, _encode_value(value), ex=expire)
         if expire:
-            redis_client.expire(cache_key, expire)
+            for cache_key in refresh_expire_keys or []:
+                pipeline.expire(cache_key, expire)
+        pipeline.execute()
     except Exception as e:
         logger.error('Unable to write to redis host {}: {}'.format(REDIS_SERVICE_HOSTNAME, str(e)))
+
+
+def safe_redis_incr(cache_key):
+    try:
+        redis_client = get_redis_client()
+        redis_client.incr(cache_key)
+    except Exception as e:
+        logger.error('Unable to write to redis host {}: {}'.format(REDIS_SERVICE_HOSTNAME, str(e)))
+
+
+def safe_redis_delete(cache_key):
+    try:
+        redis_client = get_redis_client()
+        redis_client.delete(cache_key)
+    except Exception as e:
+        logger.error('Unable to write to redis host {}: {}'.format(REDIS_SERVICE_HOSTNAME, str(e)))
+
+
+def _encode_value(value):
+    encoded = json.dumps(value)
+    if len(encoded) < COMPRESSION_MIN_BYTES:
+        return encoded
+    return COMPRESSED_VALUE_HEADER + zlib.compress(encoded.encode('utf-8'), COMPRESSION_LEVEL)
+
+
+def _decode_value(value):
+    if isinstance(value, bytes) and value.startswith(COMPRESSED_VALUE_HEADER):
+        try:
+            value = zlib.decompress(value[len(COMPRESSED_VALUE_HEADER):])
+        except zlib.error as e:
+            raise ValueError('Invalid compressed value: {}'.format(e))
+    return json.loads(value)
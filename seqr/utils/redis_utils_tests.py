@@ -1,7 +1,8 @@
 import json
 import mock
 from unittest import TestCase
-from seqr.utils.redis_utils import safe_redis_set_json, safe_redis_get_json
+from seqr.utils.redis_utils import safe_redis_set_json, safe_redis_get_json, safe_redis_mget_json, \
+    safe_redis_mset_json, safe_redis_incr, safe_redis_delete
 
 
 @mock.patch('seqr.utils.redis_utils.logger')
@@ -39,15 +40,35 @@ class RedisUtilsTest(TestCase):
         mock_logger.warning.assert_not_called()
         mock_logger.error.assert_called_with('Unable to connect to redis host localhost: invalid redis')
 
+    def test_safe_redis_mget_json(self, mock_redis, mock_logger):
+        mock_redis.return_value.mget.side_effect = lambda keys: [
+            json.dumps({'a': 1}), None, 'invalid_json']
+        self.assertDictEqual(safe_redis_mget_json(['key_1', 'key_2', 'key_3']), {'key_1': {'a': 1}})
+        mock_redis.return_value.mget.assert_called_with(['key_1', 'key_2', 'key_3'])
+        mock_logger.info.assert_called_with('Loaded key_1 from redis')
+        self.assertEqual(mock_logger.warning.call_args.args[0].split('\t')[0], 'Unable to fetch "key_3" from redis:')
+        mock_logger.error.assert_not_called()
+
+        # test with no keys
+        mock_redis.reset_mock()
+        self.assertDictEqual(safe_redis_mget_json([]), {})
+        mock_redis.return_value.mget.assert_not_called()
+
+        # test with redis connection error
+        mock_logger.reset_mock()
+        mock_redis.side_effect = Exception('invalid redis')
+        self.assertDictEqual(safe_redis_mget_json(['key_1']), {})
+        mock_logger.error.assert_called_with('Unable to connect to redis host localhost: invalid redis')
+
     def test_safe_redis_set_json(self, mock_redis, mock_logger):
         safe_redis_set_json('test_key', {'a': 1})
-        mock_redis.return_value.set.assert_called_with('test_key', '{"a": 1}')
+        mock_redis.return_value.set.assert_called_with('test_key', '{"a": 1}', ex=None)
         mock_redis.return_value.expire.assert_not_called()
         mock_logger.error.assert_not_called()
 
         safe_redis_set_json('test_key', {'a': 1}, expire=100)
-        mock_redis.return_value.set.assert_called_with('test_key', '{"a": 1}')
-        mock_redis.return_value.expire.assert_called_with('test_key', 100)
+        mock_redis.return_value.set.assert_called_with('test_key', '{"a": 1}', ex=100)
+        mock_redis.return_value.expire.assert_not_called()
         mock_logger.error.assert_not_called()
 
         # test with redis connection error
@@ -55,3 +76,74 @@ class RedisUtilsTest(TestCase):
         mock_redis.side_effect = Exception('invalid redis')
         safe_redis_set_json('test_key', {'a': 1})
         mock_logger.error.assert_called_with('Unable to write to redis host localhost: invalid redis')
+
+    def test_safe_redis_mset_json(self, mock_redis, mock_logger):
+        mock_pipeline = mock_redis.return_value.pipeline.return_value
+        safe_redis_mset_json({'key_1': {'a': 1}, 'key_2': [1, 2]}, expire=100)
+        mock_redis.return_value.pipeline.assert_called_with(transaction=False)
+        mock_pipeline.set.assert_has_calls([
+            mock.call('key_1', '{"a": 1}', ex=100), mock.call('key_2', '[1, 2]', ex=100),
+        ])
+        mock_pipeline.expire.assert_not_called()
+        mock_pipeline.execute.assert_called_once()
+        mock_logger.error.assert_not_called()
+
+        mock_pipeline.reset_mock()
+        safe_redis_mset_json({'key_1': {'a': 1}}, expire=100, refresh_expire_keys=['key_2', 'key_3'])
+        mock_pipeline.set.assert_called_with('key_1', '{"a": 1}', ex=100)
+        mock_pipeline.expire.assert_has_calls([mock.call('key_2', 100), mock.call('key_3', 100)])
+        mock_pipeline.execute.assert_called_once()
+
+        # test with redis connection error
+        mock_redis.side_effect = Exception('invalid redis')
+        safe_redis_mset_json({'key_1': {'a': 1}})
+        mock_logger.error.assert_called_with('Unable to write to redis host localhost: invalid redis')
+
+    @mock.patch('seqr.utils.redis_utils.COMPRESSION_MIN_BYTES', 20)
+    def test_compressed_values(self, mock_redis, mock_logger):
+        cache = {}
+        mock_redis.return_value.set.side_effect = lambda key, value, ex=None: cache.update({key: value})
+        mock_redis.return_value.get.side_effect = lambda key: cache.get(key)
+
+        # small values are stored as plain json
+        safe_redis_set_json('small_key', {'a': 1})
+        self.assertEqual(cache['small_key'], '{"a": 1}')
+        self.assertDictEqual(safe_redis_get_json('small_key'), {'a': 1})
+
+        # large values are compressed with a version header
+        large_value = {'variants': ['1-248367227-TC-T'] * 100}
+        safe_redis_set_json('large_key', large_value)
+        self.assertTrue(cache['large_key'].startswith(b'seqr:zlib:1:'))
+        self.assertLess(len(cache['large_key']), len(json.dumps(large_value)))
+        self.assertDictEqual(safe_redis_get_json('large_key'), large_value)
+
+        # uncompressed values written before compression was added are still readable
+        cache['legacy_key'] = json.dumps(large_value).encode('utf-8')
+        self.assertDictEqual(safe_redis_get_json('legacy_key'), large_value)
+
+        # test with corrupted compressed value
+        cache['corrupt_key'] = b'seqr:zlib:1:invalid'
+        self.assertIsNone(safe_redis_get_json('corrupt_key'))
+        self.assertEqual(
+            mock_logger.warning.call_args.args[0].split('\t')[0], 'Unable to fetch "corrupt_key" from redis:')
+        mock_logger.error.assert_not_called()
+
+    def test_safe_redis_incr(self, mock_redis, mock_logger):
+        safe_redis_incr('test_key')
+        mock_redis.return_value.incr.assert_called_with('test_key')
+        mock_logger.error.assert_not_called()
+
+        # test with redis connection error
+        mock_redis.side_effect = Exception('invalid redis')
+        safe_redis_incr('test_key')
+        mock_logger.error.assert_called_with('Unable to write to redis host localhost: invalid redis')
+
+    def test_safe_redis_delete(self, mock_redis, mock_logger):
+        safe_redis_delete('test_key')
+        mock_redis.return_value.delete.assert_called_with('test_key')
+        mock_logger.error.assert_not_called()
+
+        # test with redis connection error
+        mock_redis.side_effect = Exception('invalid redis')
+        safe_redis_delete('test_key')
+        mock_logger.error.assert_called_with('Unable to write to redis host localhost: invalid redis')
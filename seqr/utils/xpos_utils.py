@@ -72,3 +72,21 @@ def get_chrom_pos(xpos):
         CHROM_NUMBER_TO_CHROM[chrom_idx],
         xpos % int(1e9)
     )
+
+
+def get_merged_xpos_intervals(intervals):
+    """Returns the minimal sorted list of (xstart, xstop) ranges covering all the given intervals, with overlapping and
+    adjacent intervals merged. Intervals on different chromosomes are never merged, as their xpos values are far apart
+
+    Args:
+        intervals (list): dictionaries with 'chrom', 'start' and 'end' keys
+    """
+    merged_intervals = []
+    for xstart, xstop in sorted(
+            (get_xpos(interval['chrom'], interval['start']), get_xpos(interval['chrom'], interval['end']))
+            for interval in intervals):
+        if merged_intervals and xstart <= merged_intervals[-1][1] + 1:
+            merged_intervals[-1] = (merged_intervals[-1][0], max(merged_intervals[-1][1], xstop))
+        else:
+            merged_intervals.append((xstart, xstop))
+    return merged_intervals
@@ -1,5 +1,5 @@
 from unittest import TestCase
-from seqr.utils.xpos_utils import get_chrom_pos, get_xpos
+from seqr.utils.xpos_utils import get_chrom_pos, get_xpos, get_merged_xpos_intervals
 
 
 class XposUtilsTest(TestCase):
@@ -28,3 +28,15 @@ class XposUtilsTest(TestCase):
         self.assertEqual(get_chrom_pos(23*1e9 + 12345), ('X', 12345))
         self.assertEqual(get_chrom_pos(24*1e9 + 12345), ('Y', 12345))
         self.assertEqual(get_chrom_pos(25*1e9 + 12345), ('M', 12345))
+
+    def test_get_merged_xpos_intervals(self):
+        self.assertListEqual(get_merged_xpos_intervals([]), [])
+        self.assertListEqual(get_merged_xpos_intervals([
+            {'chrom': '2', 'start': 500, 'end': 600},
+            {'chrom': '1', 'start': 300, 'end': 400},
+            {'chrom': '1', 'start': 100, 'end': 200},
+            {'chrom': '1', 'start': 150, 'end': 250},
+            {'chrom': '1', 'start': 251, 'end': 260},
+            {'chrom': '2', 'start': 520, 'end': 550},
+            {'chrom': '1', 'start': 400, 'end': 400},
+        ]), [(1e9 + 100, 1e9 + 260), (1e9 + 300, 1e9 + 400), (2e9 + 500, 2e9 + 600)])
@@ -43,15 +43,13 @@ def _get_projects_json(user):
         return {}
 
     projects = Project.objects.filter(guid__in=project_guids)
-    projects_with_counts = projects.annotate(
-        models.Count('family', distinct=True), models.Count('family__individual', distinct=True),
-        models.Count('family__savedvariant', distinct=True))
 
     projects_by_guid = {p['projectGuid']: p for p in get_json_for_projects(projects, user=user)}
-    for project in projects_with_counts:
-        projects_by_guid[project.guid]['numFamilies'] = project.family__count
-        projects_by_guid[project.guid]['numIndividuals'] = project.family__individual__count
-        projects_by_guid[project.guid]['numVariantTags'] = project.family__savedvariant__count
+    # summary counts are maintained on the project, so they are loaded with the projects rather than aggregated here
+    for project in projects:
+        projects_by_guid[project.guid]['numFamilies'] = project.num_families
+        projects_by_guid[project.guid]['numIndividuals'] = project.num_individuals
+        projects_by_guid[project.guid]['numVariantTags'] = project.num_saved_variants
 
     analysis_status_counts = Family.objects.filter(project__in=projects).values(
         'project__guid', 'analysis_status').annotate(count=models.Count('*'))
@@ -12,7 +12,7 @@ from django.http.response import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from requests.exceptions import ConnectionError as RequestConnectionError
 
-from seqr.utils.elasticsearch.utils import get_es_client, get_index_metadata
+from seqr.utils.elasticsearch.utils import get_es_client, get_index_metadata, get_search_results_cache_stats
 from seqr.utils.file_utils import file_iter
 
 from seqr.views.utils.file_utils import parse_file
@@ -83,6 +83,7 @@ def elasticsearch_status(request):
         'diskStats': list(disk_status.values()),
         'elasticsearchHost': ELASTICSEARCH_SERVER,
         'errors': errors,
+        'searchResultsCacheStats': get_search_results_cache_stats(),
     })
 
 
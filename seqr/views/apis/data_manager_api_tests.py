@@ -254,8 +254,9 @@ SAMPLE_SV_QC_DATA = [
 class DataManagerAPITest(AuthenticationTestCase):
     fixtures = ['users', '1kg_project', 'reference_data']
 
+    @mock.patch('seqr.utils.redis_utils.redis.StrictRedis')
     @urllib3_responses.activate
-    def test_elasticsearch_status(self):
+    def test_elasticsearch_status(self, mock_redis):
         url = reverse(elasticsearch_status)
         self.check_data_manager_login(url)
 
@@ -268,10 +269,16 @@ class DataManagerAPITest(AuthenticationTestCase):
         urllib3_responses.add_json('/_cat/aliases?format=json&h=alias,index', ES_CAT_ALIAS)
         urllib3_responses.add_json('/_all/_mapping', ES_INDEX_MAPPING)
 
+        mock_redis.return_value.mget.return_value = [b'7', None]
+
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
         response_json = response.json()
-        self.assertSetEqual(set(response_json.keys()), {'indices', 'errors', 'diskStats', 'elasticsearchHost'})
+        self.assertSetEqual(
+            set(response_json.keys()), {'indices', 'errors', 'diskStats', 'elasticsearchHost', 'searchResultsCacheStats'})
+        self.assertDictEqual(response_json['searchResultsCacheStats'], {'hits': 7, 'misses': 0})
+        mock_redis.return_value.mget.assert_called_with(
+            ['search_results_cache_stats__hits', 'search_results_cache_stats__misses'])
 
         self.assertEqual(len(response_json['indices']), 5)
         self.assertDictEqual(response_json['indices'][0], TEST_INDEX_EXPECTED_DICT)
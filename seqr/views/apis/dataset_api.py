@@ -1,16 +1,17 @@
 import json
 import logging
-from collections import defaultdict
 
-from django.db.models import prefetch_related_objects
+from django.contrib.postgres.aggregates import ArrayAgg
 from django.utils import timezone
 
 from seqr.models import Individual, Sample, Family
+from seqr.utils.elasticsearch.utils import clear_local_index_metadata
 from seqr.views.utils.dataset_utils import match_sample_ids_to_sample_records, validate_index_metadata, \
     get_elasticsearch_index_samples, load_mapping_file
 from seqr.views.utils.json_utils import create_json_response
 from seqr.views.utils.orm_to_json_utils import get_json_for_samples
 from seqr.views.utils.permissions_utils import get_project_and_check_permissions, data_manager_required
+from seqr.views.utils.variant_utils import reset_cached_search_results
 
 logger = logging.getLogger(__name__)
 
@@ -81,29 +82,30 @@ def add_variants_dataset_handler(request, project_guid):
                 'Matches not found for ES sample ids: {}. Uploading a mapping file for these samples, or select the "Ignore extra samples in callset" checkbox to ignore.'.format(
                     ", ".join(unmatched_samples)))
 
-        prefetch_related_objects(list(matched_sample_id_to_sample_record.values()), 'individual__family')
-        included_families = {sample.individual.family for sample in matched_sample_id_to_sample_record.values()}
+        matched_individual_ids = {sample.individual_id for sample in matched_sample_id_to_sample_record.values()}
+        included_families = Family.objects.filter(individual__id__in=matched_individual_ids).distinct()
 
-        missing_individuals = Individual.objects.filter(
+        missing_family_individuals = Individual.objects.filter(
             family__in=included_families,
             sample__is_active=True,
             sample__dataset_type=dataset_type,
             sample__sample_type=sample_type,
-        ).exclude(sample__in=matched_sample_id_to_sample_record.values()).select_related('family')
-        missing_family_individuals = defaultdict(list)
-        for individual in missing_individuals:
-            missing_family_individuals[individual.family].append(individual)
+        ).exclude(id__in=matched_individual_ids).values('family__family_id').annotate(
+            individual_ids=ArrayAgg('individual_id', distinct=True))
 
         if missing_family_individuals:
             raise Exception(
                 'The following families are included in the callset but are missing some family members: {}.'.format(
                     ', '.join(sorted(
-                        ['{} ({})'.format(family.family_id, ', '.join(sorted([i.individual_id for i in missing_indivs])))
-                         for family, missing_indivs in missing_family_individuals.items()]
+                        ['{} ({})'.format(agg['family__family_id'], ', '.join(sorted(agg['individual_ids'])))
+                         for agg in missing_family_individuals]
                     ))))
 
         inactivate_sample_guids = _update_variant_samples(
             matched_sample_id_to_sample_record, request.user, elasticsearch_index, loaded_date, dataset_type, sample_type)
+        clear_local_index_metadata()
+        # A callset can be reloaded under the same index name, which does not change the cached results fingerprint
+        reset_cached_search_results(project)
 
     except Exception as e:
         return create_json_response({'errors': [str(e)]}, status=400)
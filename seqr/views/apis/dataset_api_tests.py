@@ -18,11 +18,12 @@ ADD_DATASET_PAYLOAD = json.dumps({'elasticsearchIndex': INDEX_NAME, 'datasetType
 
 class DatasetAPITest(object):
 
+    @mock.patch('seqr.views.apis.dataset_api.reset_cached_search_results')
     @mock.patch('seqr.utils.redis_utils.redis.StrictRedis')
     @mock.patch('seqr.views.utils.dataset_utils.random.randint')
     @mock.patch('seqr.utils.file_utils.open')
     @urllib3_responses.activate
-    def test_add_variants_dataset(self, mock_open, mock_random, mock_redis):
+    def test_add_variants_dataset(self, mock_open, mock_random, mock_redis, mock_reset_cached_search_results):
         mock_file_iter = mock_open.return_value.__enter__.return_value.__iter__
 
         url = reverse(add_variants_dataset_handler, args=[PROJECT_GUID])
@@ -68,11 +69,12 @@ class DatasetAPITest(object):
         self.assertEqual(len(urllib3_responses.calls), 2)
         self.assertDictEqual(
             urllib3_responses.call_request_json(),
-            {'aggs': {'sample_ids': {'terms': {'field': 'samples_num_alt_1', 'size': 10000}}}}
+            {'aggs': {'sample_ids': {'composite': {
+                'sources': [{'sample_id': {'terms': {'field': 'samples_num_alt_1'}}}], 'size': 10000}}}}
         )
 
         urllib3_responses.replace_json('/{}/_search?size=0'.format(INDEX_NAME), {
-            'aggregations': {'sample_ids': {'buckets': [{'key': 'NA19679'}, {'key': 'NA19678_1'}]}}
+            'aggregations': {'sample_ids': {'buckets': [{'key': {'sample_id': 'NA19679'}}, {'key': {'sample_id': 'NA19678_1'}}]}}
         }, method=urllib3_responses.POST)
         response = self.client.post(url, content_type='application/json', data=ADD_DATASET_PAYLOAD)
         self.assertEqual(response.status_code, 400)
@@ -138,7 +140,7 @@ class DatasetAPITest(object):
         self.assertDictEqual(response.json(), {'errors': ['The following families are included in the callset but are missing some family members: 1 (NA19675_1, NA19678).']})
 
         urllib3_responses.replace_json('/{}/_search?size=0'.format(INDEX_NAME), {
-            'aggregations': {'sample_ids': {'buckets': [{'key': 'NA19673'}]}}
+            'aggregations': {'sample_ids': {'buckets': [{'key': {'sample_id': 'NA19673'}}]}}
         }, method=urllib3_responses.POST)
         response = self.client.post(url, content_type='application/json', data=json.dumps({
             'elasticsearchIndex': INDEX_NAME,
@@ -158,9 +160,11 @@ class DatasetAPITest(object):
         self.assertEqual(response.status_code, 400)
         self.assertDictEqual(response.json(), {'errors': ['Must contain 2 columns: NA19678_1, NA19678, metadata']})
 
+        mock_reset_cached_search_results.assert_not_called()
+
         # Send valid request
         urllib3_responses.replace_json('/{}/_search?size=0'.format(INDEX_NAME), {'aggregations': {
-            'sample_ids': {'buckets': [{'key': 'NA19675'}, {'key': 'NA19679'}, {'key': 'NA19678_1'}]}
+            'sample_ids': {'buckets': [{'key': {'sample_id': 'NA19675'}}, {'key': {'sample_id': 'NA19679'}}, {'key': {'sample_id': 'NA19678_1'}}]}
         }}, method=urllib3_responses.POST)
         mock_file_iter.return_value = StringIO('NA19678_1,NA19678\n')
         response = self.client.post(url, content_type='application/json', data=json.dumps({
@@ -172,6 +176,8 @@ class DatasetAPITest(object):
         mock_open.assert_called_with('mapping.csv', 'r')
         mock_redis.return_value.get.assert_called_with('index_metadata__test_index')
         mock_redis.return_value.set.assert_not_called()
+        mock_reset_cached_search_results.assert_called_once()
+        self.assertEqual(mock_reset_cached_search_results.call_args.args[0].guid, PROJECT_GUID)
 
         response_json = response.json()
         self.assertSetEqual(set(response_json.keys()), {'samplesByGuid', 'individualsByGuid', 'familiesByGuid'})
@@ -221,18 +227,33 @@ class DatasetAPITest(object):
                 'sourceFilePath': 'test_data.bed',
                 'datasetType': 'SV',
             }}}})
-        urllib3_responses.add_json('/{}/_search?size=0'.format(SV_INDEX_NAME), {
-            'aggregations': {'sample_ids': {'buckets': [{'key': 'NA19675_1'}]}}
-        }, method=urllib3_responses.POST)
-        response = self.client.post(url, content_type='application/json', data=json.dumps({
-            'elasticsearchIndex': SV_INDEX_NAME,
-            'datasetType': 'SV',
-        }))
+
+        def _get_sample_ids_page(request):
+            after_key = json.loads(request.body)['aggs']['sample_ids']['composite'].get('after')
+            sample_ids_agg = {'buckets': []} if after_key else {
+                'buckets': [{'key': {'sample_id': 'NA19675_1'}}], 'after_key': {'sample_id': 'NA19675_1'}}
+            return 200, {}, json.dumps({'aggregations': {'sample_ids': sample_ids_agg}})
+
+        urllib3_responses.add_callback(
+            urllib3_responses.POST, '/{}/_search?size=0'.format(SV_INDEX_NAME), callback=_get_sample_ids_page,
+            content_type='application/json', match_querystring=True)
+        with mock.patch('seqr.views.utils.dataset_utils.SAMPLE_ID_PAGE_SIZE', 1):
+            response = self.client.post(url, content_type='application/json', data=json.dumps({
+                'elasticsearchIndex': SV_INDEX_NAME,
+                'datasetType': 'SV',
+            }))
         self.assertEqual(response.status_code, 200)
 
+        self.assertDictEqual(
+            urllib3_responses.call_request_json(index=-2),
+            {'aggs': {'sample_ids': {'composite': {
+                'sources': [{'sample_id': {'terms': {'field': 'samples'}}}], 'size': 1}}}}
+        )
         self.assertDictEqual(
             urllib3_responses.call_request_json(),
-            {'aggs': {'sample_ids': {'terms': {'field': 'samples', 'size': 10000}}}}
+            {'aggs': {'sample_ids': {'composite': {
+                'sources': [{'sample_id': {'terms': {'field': 'samples'}}}], 'size': 1,
+                'after': {'sample_id': 'NA19675_1'}}}}}
         )
 
         response_json = response.json()
@@ -263,7 +284,7 @@ class DatasetAPITest(object):
                 'sourceFilePath': 'test_data.vds',
             }}}})
         urllib3_responses.add_json('/{}/_search?size=0'.format(NEW_SAMPLE_TYPE_INDEX_NAME), {
-            'aggregations': {'sample_ids': {'buckets': [{'key': 'NA19675_1'}]}}
+            'aggregations': {'sample_ids': {'buckets': [{'key': {'sample_id': 'NA19675_1'}}]}}
         }, method=urllib3_responses.POST)
         response = self.client.post(url, content_type='application/json', data=json.dumps({
             'elasticsearchIndex': NEW_SAMPLE_TYPE_INDEX_NAME,
@@ -196,7 +196,8 @@ def update_family_pedigree_image(request, family_guid):
     else:
         pedigree_image = next(iter((request.FILES.values())))
 
-    update_model_from_json(family, {'pedigree_image': pedigree_image}, request.user)
+    # clear the hash of the generated pedigree so uploaded images are overwritten the next time the pedigree is updated
+    update_model_from_json(family, {'pedigree_image': pedigree_image, 'pedigree_image_hash': None}, request.user)
 
     return create_json_response({
         family.guid: _get_json_for_family(family, request.user)
@@ -5,7 +5,7 @@ import mock
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls.base import reverse
 
-from seqr.models import Individual
+from seqr.models import Family, Individual
 from seqr.views.apis.individual_api import edit_individuals_handler, update_individual_handler, \
     delete_individuals_handler, receive_individuals_table_handler, save_individuals_table_handler, \
     receive_individuals_metadata_handler, save_individuals_metadata_table_handler, update_individual_hpo_terms, get_hpo_terms
@@ -113,7 +113,7 @@ class IndividualAPITest(AuthenticationTestCase):
         ])
 
     @mock.patch('seqr.views.utils.permissions_utils.PM_USER_GROUP')
-    @mock.patch('seqr.views.utils.pedigree_image_utils._update_pedigree_image')
+    @mock.patch('seqr.views.utils.individual_utils.update_pedigree_images')
     def test_edit_individuals(self, mock_update_pedigree, mock_pm_group):
         edit_individuals_url = reverse(edit_individuals_handler, args=[PROJECT_GUID])
         self.check_manager_login(edit_individuals_url)
@@ -149,7 +149,7 @@ class IndividualAPITest(AuthenticationTestCase):
         self.assertEqual(response_json['individualsByGuid'][CHILD_UPDATE_GUID]['paternalId'], UPDATED_ID)
         self.assertSetEqual(
             {'F000001_1', 'F000003_3'},
-            {call_arg.args[0].guid for call_arg in mock_update_pedigree.call_args_list}
+            {family.guid for call_arg in mock_update_pedigree.call_args_list for family in call_arg.args[0]}
         )
 
         # test only updating parental IDs
@@ -169,7 +169,7 @@ class IndividualAPITest(AuthenticationTestCase):
         self.assertSetEqual({ID_UPDATE_GUID}, set(response_json['individualsByGuid']))
         self.assertEqual(response_json['individualsByGuid'][ID_UPDATE_GUID]['individualId'], UPDATED_ID)
         self.assertEqual(response_json['individualsByGuid'][ID_UPDATE_GUID]['maternalId'], 'NA19679')
-        self.assertSetEqual({'F000001_1'}, {call_arg.args[0].guid for call_arg in mock_update_pedigree.call_args_list})
+        self.assertSetEqual({'F000001_1'}, {family.guid for call_arg in mock_update_pedigree.call_args_list for family in call_arg.args[0]})
 
         # Test PM permission
         pm_required_edit_individuals_url = reverse(edit_individuals_handler, args=[PM_REQUIRED_PROJECT_GUID])
@@ -192,7 +192,7 @@ class IndividualAPITest(AuthenticationTestCase):
         self.assertEqual(response.status_code, 200)
 
     @mock.patch('seqr.views.utils.permissions_utils.PM_USER_GROUP')
-    @mock.patch('seqr.views.utils.pedigree_image_utils._update_pedigree_image')
+    @mock.patch('seqr.views.utils.individual_utils.update_pedigree_images')
     def test_delete_individuals(self, mock_update_pedigree, mock_pm_group):
         individuals_url = reverse(delete_individuals_handler, args=[PROJECT_GUID])
         self.check_manager_login(individuals_url)
@@ -217,7 +217,7 @@ class IndividualAPITest(AuthenticationTestCase):
         self.assertFalse('I000002_na19678' in response_json['familiesByGuid']['F000001_1']['individualGuids'])
 
         mock_update_pedigree.assert_called_once()
-        self.assertEqual(mock_update_pedigree.call_args.args[0].guid, 'F000001_1')
+        self.assertSetEqual({family.guid for family in mock_update_pedigree.call_args.args[0]}, {'F000001_1'})
 
         # Test PM permission
         pm_required_delete_individuals_url = reverse(delete_individuals_handler, args=[PM_REQUIRED_PROJECT_GUID])
@@ -243,7 +243,7 @@ class IndividualAPITest(AuthenticationTestCase):
         self.assertEqual(response.status_code, 200)
 
     @mock.patch('seqr.views.utils.permissions_utils.PM_USER_GROUP', 'project-managers')
-    @mock.patch('seqr.views.utils.pedigree_image_utils._update_pedigree_image')
+    @mock.patch('seqr.views.utils.individual_utils.update_pedigree_images')
     def test_individuals_table_handler(self, mock_update_pedigree):
         individuals_url = reverse(receive_individuals_table_handler, args=[PROJECT_GUID])
         self.check_manager_login(individuals_url)
@@ -322,7 +322,7 @@ class IndividualAPITest(AuthenticationTestCase):
 
         self.assertSetEqual(
             {'F000001_1', new_family_guid},
-            {call_arg.args[0].guid for call_arg in mock_update_pedigree.call_args_list}
+            {family.guid for call_arg in mock_update_pedigree.call_args_list for family in call_arg.args[0]}
         )
 
         # Test PM permission
@@ -342,6 +342,67 @@ class IndividualAPITest(AuthenticationTestCase):
         response = self.client.post(save_url)
         self.assertEqual(response.status_code, 200)
 
+    @mock.patch('seqr.views.utils.individual_utils.update_pedigree_images')
+    def test_individuals_table_handler_new_parents(self, mock_update_pedigree):
+        individuals_url = reverse(receive_individuals_table_handler, args=[PROJECT_GUID])
+        self.check_manager_login(individuals_url)
+
+        data = 'Family ID	Individual ID	Previous Individual ID	Paternal ID	Maternal ID	Sex	Affected Status\n\
+"1"	"NA19675_1"	""	"NA19678_dad"	"NA19679"	"Male"	"Affected"\n\
+"1"	"NA19678_dad"	"NA19678"	""	""	"Male"	"Unaffected"\n\
+"22"	"HG00736"	""	"HG00737"	"HG00738"	"Female"	"Affected"\n\
+"22"	"HG00737"	""	""	""	"Male"	"Unaffected"\n\
+"22"	"HG00738"	""	""	""	"Female"	"Unaffected"\n\
+"23"	"HG00739"	""	""	""	"Male"	"Affected"'
+
+        response = self.client.post(individuals_url, {'f': SimpleUploadedFile('new_parents.tsv', data.encode('utf-8'))})
+        self.assertEqual(response.status_code, 200)
+        response_json = response.json()
+        self.assertListEqual(response_json['errors'], [])
+        self.assertListEqual(response_json['info'], [
+            '3 families, 6 individuals parsed from new_parents.tsv',
+            '2 new families, 4 new individuals will be added to the project',
+            '2 existing individuals will be updated',
+        ])
+
+        url = reverse(save_individuals_table_handler, args=[PROJECT_GUID, response_json['uploadedFileId']])
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        response_json = response.json()
+
+        # new models have their guids computed from their generated ids
+        families_by_id = {family['familyId']: family for family in response_json['familiesByGuid'].values()}
+        self.assertSetEqual(set(families_by_id.keys()), {'1', '22', '23'})
+        for family_id in ['22', '23']:
+            family = families_by_id[family_id]
+            self.assertRegex(family['familyGuid'], r'^F\d{{6}}_{}$'.format(family_id))
+            self.assertEqual(Family.objects.get(guid=family['familyGuid']).family_id, family_id)
+
+        individuals_by_id = {
+            individual['individualId']: individual for individual in response_json['individualsByGuid'].values()}
+        self.assertSetEqual(
+            set(individuals_by_id.keys()), {'NA19675_1', 'NA19678_dad', 'HG00736', 'HG00737', 'HG00738', 'HG00739'})
+        for individual_id in ['HG00736', 'HG00737', 'HG00738', 'HG00739']:
+            self.assertRegex(
+                individuals_by_id[individual_id]['individualGuid'], r'^I\d{{7}}_{}$'.format(individual_id.lower()))
+
+        # parents created in the same upload are resolved to the new individuals
+        new_child = individuals_by_id['HG00736']
+        self.assertEqual(new_child['familyGuid'], families_by_id['22']['familyGuid'])
+        self.assertEqual(new_child['paternalGuid'], individuals_by_id['HG00737']['individualGuid'])
+        self.assertEqual(new_child['maternalGuid'], individuals_by_id['HG00738']['individualGuid'])
+        self.assertIsNone(individuals_by_id['HG00739']['paternalGuid'])
+
+        # parents renamed in the same upload are resolved by their new id
+        self.assertEqual(individuals_by_id['NA19678_dad']['individualGuid'], 'I000002_na19678')
+        self.assertEqual(individuals_by_id['NA19675_1']['paternalGuid'], 'I000002_na19678')
+        self.assertEqual(individuals_by_id['NA19675_1']['maternalGuid'], 'I000003_na19679')
+
+        child = Individual.objects.get(guid=new_child['individualGuid'])
+        self.assertEqual(child.father.individual_id, 'HG00737')
+        self.assertEqual(child.mother.individual_id, 'HG00738')
+        self.assertEqual(Individual.objects.get(guid='I000001_na19675').father.individual_id, 'NA19678_dad')
+
     def _is_expected_individuals_metadata_upload(self, response):
         self.assertEqual(response.status_code, 200)
         response_json = response.json()
@@ -7,6 +7,7 @@ from django.db.utils import IntegrityError
 
 from reference_data.models import GENOME_VERSION_GRCh37
 from seqr.models import LocusList, LocusListGene, LocusListInterval
+from seqr.utils.elasticsearch.utils import clear_cached_locus_list_items
 from seqr.utils.gene_utils import get_genes, parse_locus_list_items
 from seqr.utils.logging_utils import log_model_update
 from seqr.views.utils.json_utils import create_json_response
@@ -158,6 +159,7 @@ def _update_locus_list_items(locus_list, genes_by_id, intervals, request_json, u
         interval_guids.add(interval_model.guid)
 
     LocusList.bulk_delete(user, queryset=locus_list.locuslistinterval_set.exclude(guid__in=interval_guids))
+    clear_cached_locus_list_items(locus_list.guid)
 
 
 def _get_sorted_project_locus_lists(project, user):
@@ -10,11 +10,13 @@ import logging
 from reference_data.models import GENOME_VERSION_GRCh37
 from seqr.models import Project, Family, Individual, SavedVariant, VariantSearch, VariantSearchResults, Sample, \
     IgvSample, AnalysisGroup, ProjectCategory, VariantTagType, LocusList
-from seqr.utils.elasticsearch.utils import get_es_variants, get_single_es_variant, get_es_variant_gene_counts
-from seqr.utils.elasticsearch.constants import XPOS_SORT_KEY, PATHOGENICTY_SORT_KEY, PATHOGENICTY_HGMD_SORT_KEY
+from seqr.utils.elasticsearch.utils import get_es_variants, get_single_es_variant, get_es_variant_gene_counts, \
+    InvalidSearchException
+from seqr.utils.elasticsearch.constants import XPOS_SORT_KEY, PATHOGENICTY_SORT_KEY, PATHOGENICTY_HGMD_SORT_KEY, \
+    MAX_VARIANTS
 from seqr.utils.xpos_utils import get_xpos
 from seqr.views.apis.saved_variant_api import _add_locus_lists
-from seqr.views.utils.export_utils import export_table
+from seqr.views.utils.export_utils import export_streaming_table
 from seqr.utils.gene_utils import get_genes_for_variant_display
 from seqr.views.utils.json_utils import create_json_response
 from seqr.views.utils.json_to_orm_utils import update_model_from_json, get_or_create_model_from_json, \
@@ -39,6 +41,8 @@ from seqr.views.utils.variant_utils import get_variant_key, saved_variant_genes
 logger = logging.getLogger(__name__)
 
 
+EXPORT_PAGE_SIZE = 1000
+
 GENOTYPE_AC_LOOKUP = {
     'ref_ref': [0, 0],
     'has_ref': [0, 1],
@@ -264,31 +268,34 @@ def export_variants_handler(request, search_hash):
     families = results_model.families.all()
     family_ids_by_guid = {family.guid: family.family_id for family in families}
 
-    variants, _ = get_es_variants(results_model, page=1, load_all=True)
-    variants = _flatten_variants(variants)
-
-    json, variants_to_saved_variants = _get_saved_variants(variants, families)
-
-    max_families_per_variant = max([len(variant['familyGuids']) for variant in variants])
-    max_samples_per_variant = max([len(variant['genotypes']) for variant in variants])
-
-    rows = []
-    for variant in variants:
-        row = [_get_field_value(variant, config) for config in VARIANT_EXPORT_DATA]
-        for i in range(max_families_per_variant):
-            family_guid = variant['familyGuids'][i] if i < len(variant['familyGuids']) else ''
-            variant_guid = variants_to_saved_variants.get(variant['variantId'], {}).get(family_guid, '')
-            family_tags = {
-                'family_id': family_ids_by_guid.get(family_guid),
-                'tags': [tag for tag in json['variantTagsByGuid'].values() if variant_guid in tag['variantGuids']],
-                'notes': [note for note in json['variantNotesByGuid'].values() if variant_guid in note['variantGuids']],
-            }
-            row += [_get_field_value(family_tags, config) for config in VARIANT_FAMILY_EXPORT_DATA]
-        genotypes = list(variant['genotypes'].values())
-        for i in range(max_samples_per_variant):
-            genotype = genotypes[i] if i < len(genotypes) else {}
-            row += [_get_field_value(genotype, config) for config in VARIANT_SAMPLE_DATA]
-        rows.append(row)
+    # Variants are loaded and exported a page at a time, so the full result set is never held in memory. The first pass
+    # loads and caches all the pages and determines the table width, and the second pass builds rows from the cache
+    max_families_per_variant = 0
+    max_samples_per_variant = 0
+    for variants in _get_export_variant_pages(results_model):
+        for variant in variants:
+            max_families_per_variant = max(max_families_per_variant, len(variant['familyGuids']))
+            max_samples_per_variant = max(max_samples_per_variant, len(variant['genotypes']))
+
+    def _get_rows():
+        for variants in _get_export_variant_pages(results_model):
+            json, variants_to_saved_variants = _get_saved_variants(variants, families)
+            for variant in variants:
+                row = [_get_field_value(variant, config) for config in VARIANT_EXPORT_DATA]
+                for i in range(max_families_per_variant):
+                    family_guid = variant['familyGuids'][i] if i < len(variant['familyGuids']) else ''
+                    variant_guid = variants_to_saved_variants.get(variant['variantId'], {}).get(family_guid, '')
+                    family_tags = {
+                        'family_id': family_ids_by_guid.get(family_guid),
+                        'tags': [tag for tag in json['variantTagsByGuid'].values() if variant_guid in tag['variantGuids']],
+                        'notes': [note for note in json['variantNotesByGuid'].values() if variant_guid in note['variantGuids']],
+                    }
+                    row += [_get_field_value(family_tags, config) for config in VARIANT_FAMILY_EXPORT_DATA]
+                genotypes = list(variant['genotypes'].values())
+                for i in range(max_samples_per_variant):
+                    genotype = genotypes[i] if i < len(genotypes) else {}
+                    row += [_get_field_value(genotype, config) for config in VARIANT_SAMPLE_DATA]
+                yield row
 
     header = [config['header'] for config in VARIANT_EXPORT_DATA]
     for i in range(max_families_per_variant):
@@ -298,7 +305,21 @@ def export_variants_handler(request, search_hash):
 
     file_format = request.GET.get('file_format', 'tsv')
 
-    return export_table('search_results_{}'.format(search_hash), header, rows, file_format, titlecase_header=False)
+    return export_streaming_table(
+        'search_results_{}'.format(search_hash), header, _get_rows(), file_format, titlecase_header=False)
+
+
+def _get_export_variant_pages(results_model):
+    page = 1
+    while True:
+        variants, total_results = get_es_variants(results_model, page=page, num_results=EXPORT_PAGE_SIZE)
+        # Checked on the first page, before any of the response is streamed, so the error can still be returned
+        if page == 1 and (total_results or 0) >= MAX_VARIANTS:
+            raise InvalidSearchException('Too many variants to load. Please refine your search and try again')
+        yield _flatten_variants(variants)
+        if not variants or page * EXPORT_PAGE_SIZE >= (total_results or 0):
+            return
+        page += 1
 
 
 def _get_field_value(value, config):
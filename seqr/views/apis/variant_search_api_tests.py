@@ -203,11 +203,21 @@ class VariantSearchAPITest(object):
             ['12', '48367227', 'TC', 'T', '', '', '', '', '', '', '', '', '', '', '', '', '', '', '', '', '', '', '',
              '', '2', 'Known gene for phenotype (None)|Excluded (None)', 'test n\xf8te (None)', '', '', '', '', '', '',
              '', '', '', '', '']]
-        self.assertEqual(response.content, ('\n'.join(['\t'.join(line) for line in expected_content])+'\n').encode('utf-8'))
+        self.assertEqual(
+            b''.join(response.streaming_content),
+            ('\n'.join(['\t'.join(line) for line in expected_content])+'\n').encode('utf-8'))
 
-        mock_get_variants.assert_called_with(results_model, page=1, load_all=True)
+        mock_get_variants.assert_called_with(results_model, page=1, num_results=1000)
         mock_error_logger.assert_not_called()
 
+        # Test export of too many variants fails before the file is streamed
+        with mock.patch('seqr.views.apis.variant_search_api.MAX_VARIANTS', 3):
+            response = self.client.get(export_url)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()['error'], 'Too many variants to load. Please refine your search and try again')
+        mock_error_logger.reset_mock()
+
         # Test gene breakdown
         gene_counts = {
             'ENSG00000227232': {'total': 2, 'families': {'F000001_1': 2, 'F000002_2': 1}},
@@ -611,7 +621,7 @@ class AnvilVariantSearchAPITest(AnvilAuthenticationTestCase, VariantSearchAPITes
 
     def test_query_variants(self, *args):
         super(AnvilVariantSearchAPITest, self).test_query_variants(*args)
-        assert_no_list_ws_has_al(self, 13)
+        assert_no_list_ws_has_al(self, 14)
 
     def test_query_all_projects_variants(self, *args):
         super(AnvilVariantSearchAPITest, self).test_query_all_projects_variants(*args)
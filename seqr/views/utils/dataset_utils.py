@@ -1,5 +1,6 @@
 import logging
 import elasticsearch_dsl
+from django.db import transaction
 from django.utils import timezone
 import random
 
@@ -17,16 +18,40 @@ SAMPLE_FIELDS_MAP = {
 }
 
 
+# Sample ids are listed with a paginated composite aggregation so callsets of any size are fully returned
+SAMPLE_ID_PAGE_SIZE = 10000
+
+SAMPLE_CREATE_BATCH_SIZE = 5000
+
+
 def get_elasticsearch_index_samples(elasticsearch_index, dataset_type=Sample.DATASET_TYPE_VARIANT_CALLS):
     es_client = get_es_client()
 
     index_metadata = get_index_metadata(elasticsearch_index, es_client).get(elasticsearch_index)
 
+    sample_ids = []
+    after_key = None
+    while True:
+        buckets, after_key = _get_index_sample_id_page(
+            es_client, elasticsearch_index, SAMPLE_FIELDS_MAP[dataset_type], after_key)
+        sample_ids += [bucket['key']['sample_id'] for bucket in buckets]
+        if not after_key or len(buckets) < SAMPLE_ID_PAGE_SIZE:
+            break
+
+    return sample_ids, index_metadata
+
+
+def _get_index_sample_id_page(es_client, elasticsearch_index, sample_field, after_key):
     s = elasticsearch_dsl.Search(using=es_client, index=elasticsearch_index)
     s = s.params(size=0)
-    s.aggs.bucket('sample_ids', elasticsearch_dsl.A('terms', field=SAMPLE_FIELDS_MAP[dataset_type], size=10000))
+    composite_kwargs = {'after': after_key} if after_key else {}
+    s.aggs.bucket('sample_ids', elasticsearch_dsl.A(
+        'composite', sources=[{'sample_id': elasticsearch_dsl.A('terms', field=sample_field)}],
+        size=SAMPLE_ID_PAGE_SIZE, **composite_kwargs))
     response = s.execute()
-    return [agg['key'] for agg in response.aggregations.sample_ids.buckets], index_metadata
+    sample_ids_agg = response.aggregations.sample_ids
+    after_key = getattr(sample_ids_agg, 'after_key', None)
+    return sample_ids_agg.buckets, after_key.to_dict() if after_key else None
 
 
 def validate_index_metadata(index_metadata, project, elasticsearch_index, genome_version=None,
@@ -117,24 +142,22 @@ def match_sample_ids_to_sample_records(
             sample.individual.individual_id for sample in sample_id_to_sample_record.values()
         }
 
-        remaining_individuals_dict = {
-            i.individual_id: i for i in
-            Individual.objects.filter(family__project=project).exclude(individual_id__in=already_matched_individual_ids)
+        # only the columns needed for matching are loaded, rather than full Individual models for the whole project
+        remaining_individual_db_ids = {
+            individual_id: individual_db_id for individual_id, individual_db_id in
+            Individual.objects.filter(family__project=project).values_list('individual_id', 'id')
+            if individual_id not in already_matched_individual_ids
         }
 
-        # find Individual records with exactly-matching individual_ids
-        sample_id_to_individual_record = {}
+        # find Individual records with exactly-matching or mapped individual_ids in a single pass
+        sample_id_to_individual_db_id = {}
         for sample_id in remaining_sample_ids:
-            individual_id = sample_id
-            if sample_id_to_individual_id_mapping and sample_id in sample_id_to_individual_id_mapping:
-                individual_id = sample_id_to_individual_id_mapping[sample_id]
-
-            if individual_id not in remaining_individuals_dict:
-                continue
-            sample_id_to_individual_record[sample_id] = remaining_individuals_dict[individual_id]
-            del remaining_individuals_dict[individual_id]
+            individual_id = (sample_id_to_individual_id_mapping or {}).get(sample_id, sample_id)
+            individual_db_id = remaining_individual_db_ids.pop(individual_id, None)
+            if individual_db_id:
+                sample_id_to_individual_db_id[sample_id] = individual_db_id
 
-        logger.info(str(len(sample_id_to_individual_record)) + " matched individual ids")
+        logger.info(str(len(sample_id_to_individual_db_id)) + " matched individual ids")
 
         # create new Sample records for Individual records that matches
         if create_sample_records:
@@ -145,13 +168,16 @@ def match_sample_ids_to_sample_records(
                     sample_type=sample_type,
                     dataset_type=dataset_type,
                     elasticsearch_index=elasticsearch_index,
-                    individual=individual,
+                    individual_id=individual_db_id,
                     created_date=timezone.now(),
                     loaded_date=loaded_date or timezone.now(),
-                ) for sample_id, individual in sample_id_to_individual_record.items()]
-            sample_id_to_sample_record.update({
-                sample.sample_id: sample for sample in Sample.bulk_create(user, new_samples)
-            })
+                ) for sample_id, individual_db_id in sample_id_to_individual_db_id.items()]
+            with transaction.atomic():
+                for i in range(0, len(new_samples), SAMPLE_CREATE_BATCH_SIZE):
+                    sample_id_to_sample_record.update({
+                        sample.sample_id: sample for sample in
+                        Sample.bulk_create(user, new_samples[i:i + SAMPLE_CREATE_BATCH_SIZE])
+                    })
             log_model_bulk_update(logger, new_samples, user, 'create')
 
     return sample_id_to_sample_record
@@ -4,7 +4,7 @@ import openpyxl as xl
 from tempfile import NamedTemporaryFile
 import zipfile
 
-from django.http.response import HttpResponse
+from django.http.response import HttpResponse, StreamingHttpResponse, FileResponse
 
 from seqr.views.utils.json_utils import _to_title_case
 
@@ -26,37 +26,18 @@ def export_table(filename_prefix, header, rows, file_format='tsv', titlecase_hea
         Django HttpResponse object with the table data as an attachment.
     """
 
-    for i, row in enumerate(rows):
-        if len(header) != len(row):
-            raise ValueError('len(header) != len(row): %s != %s\n%s\n%s' % (
-                len(header), len(row), ','.join(header), ','.join(row)))
-        rows[i] = ['' if value is None else value for value in row]
-
     if file_format == "tsv":
         response = HttpResponse(content_type='text/tsv')
         response['Content-Disposition'] = 'attachment; filename="{}.tsv"'.format(filename_prefix).encode('ascii', 'ignore')
-        response.writelines(['\t'.join(header)+'\n'])
-        response.writelines(('\t'.join(map(str, row))+'\n' for row in rows))
+        response.writelines(_stream_tsv_rows(header, rows))
         return response
     elif file_format == "json":
         response = HttpResponse(content_type='application/json')
         response['Content-Disposition'] = 'attachment; filename="{}.json"'.format(filename_prefix).encode('ascii', 'ignore')
-        for row in rows:
-            json_keys = [s.replace(" ", "_").lower() for s in header]
-            json_values = list(map(str, row))
-            response.write(json.dumps(OrderedDict(zip(json_keys, json_values)))+'\n')
+        response.writelines(_stream_json_rows(header, rows))
         return response
     elif file_format == "xls":
-        wb = xl.Workbook(write_only=True)
-        ws = wb.create_sheet()
-        if titlecase_header:
-            header = list(map(_to_title_case, header))
-        ws.append(header)
-        for row in rows:
-            ws.append(row)
-        with NamedTemporaryFile() as temporary_file:
-            wb.save(temporary_file.name)
-            temporary_file.seek(0)
+        with _write_xls_file(header, rows, titlecase_header) as temporary_file:
             response = HttpResponse(temporary_file.read(), content_type="application/ms-excel")
             response['Content-Disposition'] = 'attachment; filename="{}.xlsx"'.format(filename_prefix).encode('ascii', 'ignore')
             return response
@@ -64,6 +45,70 @@ def export_table(filename_prefix, header, rows, file_format='tsv', titlecase_hea
         raise ValueError("Invalid file_format: %s" % file_format)
 
 
+def export_streaming_table(filename_prefix, header, rows, file_format='tsv', titlecase_header=True):
+    """Generates a streaming HTTP response for a table with the given header and rows, exported into the given
+    file_format. Rows are consumed one at a time, so the full table is never held in memory.
+
+    Args:
+        filename_prefix (string): Filename without the extension.
+        header (list): List of column names
+        rows (iterable): Iterable of rows, where each row is a list of column values
+        file_format (string): "tsv", "xls", or "json"
+    Returns:
+        Django StreamingHttpResponse object with the table data as an attachment.
+    """
+    if file_format == "tsv":
+        response = StreamingHttpResponse(_stream_tsv_rows(header, rows), content_type='text/tsv')
+        response['Content-Disposition'] = 'attachment; filename="{}.tsv"'.format(filename_prefix).encode('ascii', 'ignore')
+        return response
+    elif file_format == "json":
+        response = StreamingHttpResponse(_stream_json_rows(header, rows), content_type='application/json')
+        response['Content-Disposition'] = 'attachment; filename="{}.json"'.format(filename_prefix).encode('ascii', 'ignore')
+        return response
+    elif file_format == "xls":
+        # The saved file is streamed back in blocks, and is deleted once the response is closed
+        response = FileResponse(_write_xls_file(header, rows, titlecase_header), content_type="application/ms-excel")
+        response['Content-Disposition'] = 'attachment; filename="{}.xlsx"'.format(filename_prefix).encode('ascii', 'ignore')
+        return response
+    else:
+        raise ValueError("Invalid file_format: %s" % file_format)
+
+
+def _stream_tsv_rows(header, rows):
+    yield '\t'.join(header)+'\n'
+    for row in rows:
+        yield '\t'.join(map(str, _format_row(header, row)))+'\n'
+
+
+def _stream_json_rows(header, rows):
+    json_keys = [s.replace(" ", "_").lower() for s in header]
+    for row in rows:
+        json_values = list(map(str, _format_row(header, row)))
+        yield json.dumps(OrderedDict(zip(json_keys, json_values)))+'\n'
+
+
+def _write_xls_file(header, rows, titlecase_header):
+    # Write-only workbooks flush each appended row to disk, so the full table is never held in memory
+    wb = xl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    if titlecase_header:
+        header = list(map(_to_title_case, header))
+    ws.append(header)
+    for row in rows:
+        ws.append(_format_row(header, row))
+    temporary_file = NamedTemporaryFile()
+    wb.save(temporary_file.name)
+    temporary_file.seek(0)
+    return temporary_file
+
+
+def _format_row(header, row):
+    if len(header) != len(row):
+        raise ValueError('len(header) != len(row): %s != %s\n%s\n%s' % (
+            len(header), len(row), ','.join(header), ','.join(row)))
+    return ['' if value is None else value for value in row]
+
+
 def export_multiple_files(files, zip_filename, file_format='csv', add_header_prefix=False, blank_value=''):
     if file_format not in DELIMITERS:
         raise ValueError('Invalid file_format: {}'.format(file_format))
@@ -5,7 +5,7 @@ from openpyxl import load_workbook
 from io import BytesIO
 import mock
 
-from seqr.views.utils.export_utils import export_table, export_multiple_files
+from seqr.views.utils.export_utils import export_table, export_streaming_table, export_multiple_files
 
 
 class ExportTableUtilsTest(TestCase):
@@ -22,6 +22,14 @@ class ExportTableUtilsTest(TestCase):
         self.assertEqual(response.get('content-disposition'), 'attachment; filename="test_file.tsv"')
         self.assertEqual(response.content, ('\n'.join(['\t'.join(row) for row in [header]+rows]) + '\n').encode('utf-8'))
 
+        # test json format
+        response = export_table('test_file', header, rows, file_format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get('content-disposition'), 'attachment; filename="test_file.json"')
+        self.assertEqual(
+            response.content,
+            '{"column1": "row1_v1\\u00e2", "column2": "row1_v2"}\n{"column1": "row2_v1", "column2": "row2_v2"}\n'.encode('utf-8'))
+
         # test Excel format
         response = export_table('test_file', header, rows, file_format='xls')
         self.assertEqual(response.status_code, 200)
@@ -42,6 +50,46 @@ class ExportTableUtilsTest(TestCase):
             export_table('test_file', ['column1'], rows)
         self.assertEqual(str(cm.exception), 'len(header) != len(row): 1 != 2\ncolumn1\nrow1_v1\xe2,row1_v2')
 
+    def test_export_streaming_table(self):
+        header = ['column1', 'column2']
+        rows = [['row1_v1\xe2', 'row1_v2'], ['row2_v1', None]]
+
+        # test tsv format
+        response = export_streaming_table('test_file', header, iter(rows), file_format='tsv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get('content-disposition'), 'attachment; filename="test_file.tsv"')
+        self.assertEqual(
+            b''.join(response.streaming_content),
+            'column1\tcolumn2\nrow1_v1\xe2\trow1_v2\nrow2_v1\t\n'.encode('utf-8'))
+
+        # test json format
+        response = export_streaming_table('test_file', header, iter(rows), file_format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get('content-disposition'), 'attachment; filename="test_file.json"')
+        self.assertEqual(
+            b''.join(response.streaming_content),
+            b'{"column1": "row1_v1\\u00e2", "column2": "row1_v2"}\n{"column1": "row2_v1", "column2": ""}\n')
+
+        # test Excel format
+        response = export_streaming_table('test_file', header, iter(rows), file_format='xls')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get('content-disposition'), 'attachment; filename="test_file.xlsx"')
+        wb = load_workbook(BytesIO(b''.join(response.streaming_content)))
+        worksheet = wb.active
+
+        self.assertListEqual([cell.value for cell in worksheet['A']], ['Column1', 'row1_v1\xe2', 'row2_v1'])
+        self.assertListEqual([cell.value for cell in worksheet['B']], ['Column2', 'row1_v2', None])
+
+        # test invalid input
+        with self.assertRaises(ValueError) as cm:
+            export_streaming_table('test_file', header, iter(rows), file_format='unknown_format')
+        self.assertEqual(str(cm.exception), 'Invalid file_format: unknown_format')
+
+        response = export_streaming_table('test_file', ['column1'], iter(rows))
+        with self.assertRaises(ValueError) as cm:
+            b''.join(response.streaming_content)
+        self.assertEqual(str(cm.exception), 'len(header) != len(row): 1 != 2\ncolumn1\nrow1_v1\xe2,row1_v2')
+
     @mock.patch('seqr.views.utils.export_utils.zipfile.ZipFile')
     def test_export_multiple_files(self, mock_zip):
         mock_zip_content = {}
@@ -4,15 +4,19 @@ APIs for retrieving, updating, creating, and deleting Individual records
 
 import logging
 from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
 
 from seqr.models import Sample, IgvSample, Individual, Family
 from seqr.views.utils.pedigree_image_utils import update_pedigree_images
-from seqr.views.utils.json_to_orm_utils import update_individual_from_json, update_family_from_json, \
-    create_model_from_json
+from seqr.utils.logging_utils import log_model_bulk_update
+from seqr.views.utils.json_to_orm_utils import update_individual_from_json, update_family_from_json
 from seqr.views.utils.pedigree_info_utils import JsonConstants
 
 logger = logging.getLogger(__name__)
 
+BULK_UPDATE_BATCH_SIZE = 1000
+
 _SEX_TO_EXPORTED_VALUE = dict(Individual.SEX_LOOKUP)
 _SEX_TO_EXPORTED_VALUE['U'] = ''
 
@@ -31,7 +35,8 @@ def _get_record_individual_id(record):
 
 def add_or_update_individuals_and_families(project, individual_records, user):
     """
-    Add or update individual and family records in the given project.
+    Add or update individual and family records in the given project. New families and individuals are created in
+    bulk, and all individual updates are saved in bulk once every record has been parsed.
 
     Args:
         project (object): Django ORM model for the project to add families to
@@ -42,19 +47,32 @@ def add_or_update_individuals_and_families(project, individual_records, user):
         2-tuple: updated_families, updated_individuals containing Django ORM models
 
     """
+    with transaction.atomic():
+        updated_families, updated_individuals = _add_or_update_individuals_and_families(
+            project, individual_records, user)
+
+    # update pedigree images
+    update_pedigree_images(updated_families, user, project_guid=project.guid)
+
+    return list(updated_families), list(updated_individuals)
+
+
+def _add_or_update_individuals_and_families(project, individual_records, user):
     updated_families = set()
     updated_individuals = set()
+    individual_updated_fields = defaultdict(set)
     parent_updates = []
 
     family_ids = {_get_record_family_id(record) for record in individual_records}
     families_by_id = {f.family_id: f for f in Family.objects.filter(project=project, family_id__in=family_ids)}
 
-    missing_family_ids = family_ids - set(families_by_id.keys())
-    for family_id in missing_family_ids:
-        family = create_model_from_json(Family, {'project': project, 'family_id': family_id}, user)
-        families_by_id[family_id] = family
-        updated_families.add(family)
-        logger.info('Created family: {}'.format(family))
+    missing_family_ids = sorted(family_ids - set(families_by_id.keys()))
+    if missing_family_ids:
+        new_families = Family.bulk_create(
+            user, [Family(project=project, family_id=family_id) for family_id in missing_family_ids])
+        for family in new_families:
+            families_by_id[family.family_id] = family
+            updated_families.add(family)
 
     individual_models = Individual.objects.filter(family__project=project).prefetch_related(
         'family', 'mother', 'father')
@@ -70,19 +88,25 @@ def add_or_update_individuals_and_families(project, individual_records, user):
                 individual_id__in=[_get_record_individual_id(record) for record in individual_records]):
             individual_lookup[i.individual_id][i.family] = i
 
+        # uploaded files do not have unique guid's so fall back to a combination of family and individualId
+        new_individuals = {}
+        for record in individual_records:
+            individual_id = _get_record_individual_id(record)
+            family = families_by_id.get(_get_record_family_id(record))
+            if family not in individual_lookup[individual_id] and (family, individual_id) not in new_individuals:
+                new_individuals[(family, individual_id)] = Individual(
+                    family=family, individual_id=individual_id, case_review_status='I')
+        for individual in Individual.bulk_create(user, list(new_individuals.values())):
+            individual_lookup[individual.individual_id][individual.family] = individual
+
+    updated_individual_models = []
     for record in individual_records:
-        family_id = _get_record_family_id(record)
-        family = families_by_id.get(family_id)
-
+        family = families_by_id.get(_get_record_family_id(record))
         if has_individual_guid:
             individual = individual_lookup[record.pop('individualGuid')]
         else:
-            # uploaded files do not have unique guid's so fall back to a combination of family and individualId
-            individual_id = _get_record_individual_id(record)
-            individual = individual_lookup[individual_id].get(family)
-            if not individual:
-                individual = create_model_from_json(
-                    Individual, {'family': family, 'individual_id': individual_id, 'case_review_status': 'I'}, user)
+            individual = individual_lookup[_get_record_individual_id(record)][family]
+        updated_individual_models.append(individual)
 
         record['family'] = family
         record.pop('familyId', None)
@@ -109,22 +133,52 @@ def add_or_update_individuals_and_families(project, individual_records, user):
             update_family_from_json(family, {'analysis_notes': family_notes}, user)
             updated_families.add(family)
 
-        is_updated = update_individual_from_json(individual, record, user=user, allow_unknown_keys=True)
+        is_updated = update_individual_from_json(
+            individual, record, user=user, allow_unknown_keys=True, save=False,
+            updated_fields=individual_updated_fields[individual])
         if is_updated:
             updated_individuals.add(individual)
             updated_families.add(family)
 
+    if parent_updates:
+        # Parents are resolved from all the individuals in the updated families in a single query. Individuals being
+        # updated take precedence over their database copies, as their updates are not yet saved
+        individuals_by_id = {i.id: i for i in Individual.objects.filter(family__in=families_by_id.values())}
+        individuals_by_id.update({individual.id: individual for individual in updated_individual_models})
+        parent_lookup = {(i.family_id, i.individual_id): i for i in individuals_by_id.values()}
+
     for update in parent_updates:
         individual = update.pop('individual')
-        is_updated = update_individual_from_json(individual, update, user=user)
+        is_updated = update_individual_from_json(
+            individual, update, user=user, save=False, parent_lookup=parent_lookup,
+            updated_fields=individual_updated_fields[individual])
         if is_updated:
             updated_individuals.add(individual)
             updated_families.add(individual.family)
 
-    # update pedigree images
-    update_pedigree_images(updated_families, user, project_guid=project.guid)
+    _bulk_save_individual_updates(individual_updated_fields, user)
 
-    return list(updated_families), list(updated_individuals)
+    return updated_families, updated_individuals
+
+
+def _bulk_save_individual_updates(individual_updated_fields, user):
+    individual_updated_fields = {
+        individual: fields for individual, fields in individual_updated_fields.items() if fields
+    }
+    if not individual_updated_fields:
+        return
+
+    current_time = timezone.now()
+    for individual in individual_updated_fields.keys():
+        individual.last_modified_date = current_time
+
+    updated_fields = set()
+    for fields in individual_updated_fields.values():
+        updated_fields.update(fields)
+    individuals = list(individual_updated_fields.keys())
+    Individual.objects.bulk_update(
+        individuals, sorted(updated_fields) + ['last_modified_date'], batch_size=BULK_UPDATE_BATCH_SIZE)
+    log_model_bulk_update(logger, individuals, user, 'update', update_fields=sorted(updated_fields))
 
 
 def delete_individuals(project, individual_guids, user):
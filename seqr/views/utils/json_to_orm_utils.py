@@ -24,9 +24,9 @@ def update_family_from_json(family, json, user, allow_unknown_keys=False):
     )
 
 
-def update_individual_from_json(individual, json, user, allow_unknown_keys=False):
-    _parse_parent_field(json, individual, 'mother', 'maternalId')
-    _parse_parent_field(json, individual, 'father', 'paternalId')
+def update_individual_from_json(individual, json, user, allow_unknown_keys=False, parent_lookup=None, **kwargs):
+    _parse_parent_field(json, individual, 'mother', 'maternalId', parent_lookup)
+    _parse_parent_field(json, individual, 'father', 'paternalId', parent_lookup)
 
     if json.get('displayName') and json['displayName'] == individual.individual_id:
         json['displayName'] = ''
@@ -38,23 +38,28 @@ def update_individual_from_json(individual, json, user, allow_unknown_keys=False
             'features', 'absent_features', 'nonstandard_features', 'absent_nonstandard_features',
             'case_review_status', 'case_review_status_last_modified_date', 'case_review_status_last_modified_by',
             'case_review_discussion'
-        ],
+        ], **kwargs
     )
 
 
-def _parse_parent_field(json, individual, parent_key, parent_id_key):
+def _parse_parent_field(json, individual, parent_key, parent_id_key, parent_lookup=None):
     parent = getattr(individual, parent_key, None)
     if parent_id_key in json:
         parent_id = json.pop(parent_id_key)
         if parent_id != (parent.individual_id if parent else None):
-            json[parent_key] = Individual.objects.get(individual_id=parent_id, family=individual.family) if parent_id else None
+            parent = None
+            if parent_id and parent_lookup:
+                parent = parent_lookup.get((individual.family_id, parent_id))
+            if parent_id and not parent:
+                parent = Individual.objects.get(individual_id=parent_id, family=individual.family)
+            json[parent_key] = parent
 
 
-def update_model_from_json(model_obj, json, user, allow_unknown_keys=False, immutable_keys=None, updated_fields=None, verbose=True):
+def update_model_from_json(model_obj, json, user, allow_unknown_keys=False, immutable_keys=None, updated_fields=None, verbose=True, save=True):
     immutable_keys = (immutable_keys or []) + ['created_by', 'created_date', 'last_modified_date', 'id']
     internal_fields = model_obj._meta.internal_json_fields if hasattr(model_obj._meta, 'internal_json_fields') else []
 
-    if not updated_fields:
+    if updated_fields is None:
         updated_fields = set()
     for json_key, value in json.items():
         orm_key = _to_snake_case(json_key)
@@ -70,7 +75,7 @@ def update_model_from_json(model_obj, json, user, allow_unknown_keys=False, immu
             updated_fields.add(orm_key)
             setattr(model_obj, orm_key, value)
 
-    if updated_fields:
+    if updated_fields and save:
         model_obj.save()
         if verbose:
             log_model_update(logger, model_obj, user, 'update', updated_fields)
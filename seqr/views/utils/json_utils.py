@@ -1,9 +1,13 @@
+import json
 import logging
+import orjson
 import re
 
-from django.http import JsonResponse
+from django.http import HttpResponse
 from django.core.serializers.json import DjangoJSONEncoder
 
+from settings import DEBUG
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,24 +20,35 @@ class DjangoJSONEncoderWithSets(DjangoJSONEncoder):
         return super(DjangoJSONEncoderWithSets, self).default(o)
 
 
+# datetimes are passed through to the django encoder so responses are formatted the same as with the standard library
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def _encode_json(obj):
+    """Encodes the given object to json bytes. Responses are only indented and key-sorted in development, and production
+    responses use orjson with a fallback to the standard library for values orjson does not support (i.e. integers
+    outside the 64-bit range)"""
+    encoder = DjangoJSONEncoderWithSets()
+    if DEBUG:
+        return json.dumps(obj, sort_keys=True, indent=4, default=encoder.default).encode('utf-8')
+
+    try:
+        return orjson.dumps(obj, default=encoder.default, option=ORJSON_OPTIONS)
+    except orjson.JSONEncodeError:
+        return json.dumps(obj, separators=(',', ':'), default=encoder.default).encode('utf-8')
+
+
 def create_json_response(obj, **kwargs):
-    """Encodes the give object into json and create a django JsonResponse object with it.
+    """Encodes the give object into json and create a django HttpResponse object with it.
 
     Args:
         obj (object): json response object
-        **kwargs: any addition args to pass to the JsonResponse constructor
+        **kwargs: any addition args to pass to the HttpResponse constructor
     Returns:
-        JsonResponse
+        HttpResponse
     """
-
-    dumps_params = {
-        'sort_keys': True,
-        'indent': 4,
-        'default': DjangoJSONEncoderWithSets().default
-    }
-
-    return JsonResponse(
-        obj, json_dumps_params=dumps_params, encoder=DjangoJSONEncoderWithSets, **kwargs)
+    kwargs.setdefault('content_type', 'application/json')
+    return HttpResponse(_encode_json(obj), **kwargs)
 
 
 CAMEL_CASE_MAP = {}
@@ -0,0 +1,33 @@
+from datetime import datetime
+import mock
+from unittest import TestCase
+
+from seqr.views.utils.json_utils import create_json_response
+
+TEST_DATE = datetime(2021, 3, 4, 5, 6, 7)
+
+
+class JsonUtilsTest(TestCase):
+
+    @mock.patch('seqr.views.utils.json_utils.DEBUG', False)
+    def test_create_json_response(self):
+        response = create_json_response({'guids': {'F000001_1'}, 'date': TEST_DATE, 1: 'int key'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get('content-type'), 'application/json')
+        self.assertEqual(response.content, b'{"guids":["F000001_1"],"date":"2021-03-04T05:06:07","1":"int key"}')
+
+        # integers outside the 64-bit range are encoded with the standard library
+        response = create_json_response({'guids': {'F000001_1'}, 'date': TEST_DATE, 1: 'int key', 'count': 2 ** 64})
+        self.assertEqual(
+            response.content,
+            b'{"guids":["F000001_1"],"date":"2021-03-04T05:06:07","1":"int key","count":18446744073709551616}')
+
+        response = create_json_response({'error': 'Not found'}, status=404)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.content, b'{"error":"Not found"}')
+
+    @mock.patch('seqr.views.utils.json_utils.DEBUG', True)
+    def test_create_debug_json_response(self):
+        response = create_json_response({'guids': {'F000001_1'}, 'date': TEST_DATE})
+        self.assertEqual(
+            response.content, b'{\n    "date": "2021-03-04T05:06:07",\n    "guids": [\n        "F000001_1"\n    ]\n}')
@@ -7,12 +7,15 @@ import logging
 import os
 from collections import defaultdict
 from copy import copy, deepcopy
+from django.contrib.postgres.aggregates import ArrayAgg
 from django.db.models import prefetch_related_objects, Prefetch
-from django.db.models.fields.files import ImageFieldFile
+from django.db.models.fields.files import FileField, ImageFieldFile
+from django.db.models.query import QuerySet
 from django.contrib.auth.models import User
 
 from reference_data.models import HumanPhenotypeOntology
-from seqr.models import GeneNote, VariantNote, VariantTag, VariantFunctionalData, SavedVariant, CAN_EDIT, CAN_VIEW
+from seqr.models import GeneNote, VariantNote, VariantTag, VariantFunctionalData, SavedVariant, FamilyAnalysedBy, \
+    Individual, Sample, IgvSample, CAN_EDIT, CAN_VIEW
 from seqr.views.utils.json_utils import _to_camel_case
 from seqr.views.utils.permissions_utils import has_project_permissions, has_case_review_permissions, \
     project_has_anvil, get_workspace_collaborator_perms, user_is_analyst, user_is_data_manager, user_is_pm
@@ -39,13 +42,7 @@ def _get_json_for_models(models, nested_fields=None, user=None, is_analyst=None,
         return []
 
     model_class = type(models[0])
-    fields = copy(model_class._meta.json_fields)
-    if is_analyst is None:
-        is_analyst = user and user_is_analyst(user)
-    if is_analyst:
-        fields += getattr(model_class._meta, 'internal_json_fields', [])
-    if additional_model_fields:
-        fields += additional_model_fields
+    fields = _get_model_json_fields(model_class, user, is_analyst, additional_model_fields)
 
     if 'created_by' in fields:
         prefetch_related_objects(models, 'created_by')
@@ -77,6 +74,99 @@ def _get_json_for_models(models, nested_fields=None, user=None, is_analyst=None,
     return results
 
 
+def _get_model_json_fields(model_class, user, is_analyst, additional_model_fields):
+    fields = copy(model_class._meta.json_fields)
+    if is_analyst is None:
+        is_analyst = user and user_is_analyst(user)
+    if is_analyst:
+        fields += getattr(model_class._meta, 'internal_json_fields', [])
+    if additional_model_fields:
+        fields += additional_model_fields
+    return fields
+
+
+def _can_get_json_for_model_values(models):
+    return isinstance(models, QuerySet) and models._result_cache is None
+
+
+def _get_json_for_model_values(queryset, nested_fields=None, user=None, is_analyst=None, process_result=None, guid_key=None, additional_model_fields=None):
+    """Returns an array JSON representations of the models in the given queryset. Produces the same JSON as
+    _get_json_for_models, but reads the fields directly from the queryset values without instantiating each model.
+
+    Args:
+        queryset (object): Django queryset
+        user (object): Django User object for determining whether to include restricted/internal-only fields
+        nested_fields (array): Optional array of fields to get from the model that are nested on related objects
+        process_result (lambda): Optional function to post-process a given model json, called with the json and model id
+        guid_key (string): Optional key to use for the model's guid
+    Returns:
+        array: json objects
+    """
+    model_class = queryset.model
+    fields = _get_model_json_fields(model_class, user, is_analyst, additional_model_fields)
+
+    columns = ['id']
+    field_configs = []
+    for field in fields:
+        model_field = model_class._meta.get_field(field)
+        # Related models are loaded once per distinct related object, as they would be when prefetched
+        related_model = model_field.related_model if model_field.is_relation and field == model_field.name else None
+        file_field = model_field if isinstance(model_field, FileField) else None
+        columns.append(model_field.name)
+        field_configs.append((_to_camel_case(field), model_field.name, related_model, file_field))
+
+    nested_configs = []
+    for nested_field in (nested_fields or []):
+        column = None if nested_field.get('value') else '__'.join(nested_field['fields'])
+        if column:
+            columns.append(column)
+        nested_configs.append((
+            nested_field.get('key', _to_camel_case('_'.join(nested_field['fields']))), column, nested_field.get('value'),
+        ))
+
+    rows = list(queryset.values(*columns))
+    if not rows:
+        return []
+
+    related_objects = {}
+    for _, column, related_model, _ in field_configs:
+        if related_model:
+            related_ids = {row[column] for row in rows if row[column] is not None}
+            related_objects[column] = related_model.objects.in_bulk(related_ids) if related_ids else {}
+
+    guid_key = guid_key or '{}{}Guid'.format(model_class.__name__[0].lower(), model_class.__name__[1:])
+    results = []
+    for row in rows:
+        result = {}
+        for key, column, related_model, file_field in field_configs:
+            value = row[column]
+            if related_model:
+                value = related_objects[column].get(value) if value is not None else None
+            elif file_field:
+                value = file_field.attr_class(None, file_field, value)
+            result[key] = value
+        for key, column, value in nested_configs:
+            result[key] = row[column] if column else value
+
+        if result.get('guid'):
+            result[guid_key] = result.pop('guid')
+        if result.get('createdBy'):
+            result['createdBy'] = result['createdBy'].get_full_name() or result['createdBy'].email
+        if process_result:
+            process_result(result, row['id'])
+        results.append(result)
+
+    return results
+
+
+def _get_related_guids_by_model_id(related_model_class, related_field, models):
+    guids_by_model_id = defaultdict(list)
+    for model_id, guid in related_model_class.objects.filter(**{'{}__in'.format(related_field): models}).values_list(
+            '{}_id'.format(related_field), 'guid'):
+        guids_by_model_id[model_id].append(guid)
+    return guids_by_model_id
+
+
 def _get_json_for_model(model, get_json_for_models=_get_json_for_models, **kwargs):
     """Helper function to return a JSON representations of the given model.
 
@@ -172,12 +262,14 @@ def _get_json_for_project(project, user, **kwargs):
     return _get_json_for_model(project, get_json_for_models=get_json_for_projects, user=user, **kwargs)
 
 
-def _get_case_review_fields(model, has_case_review_perm, user, get_project):
+def _get_case_review_fields(models, has_case_review_perm, user, get_project):
     if has_case_review_perm is None:
-        has_case_review_perm = user and has_case_review_permissions(get_project(model), user)
+        model = models.first() if isinstance(models, QuerySet) else models[0]
+        has_case_review_perm = user and model and has_case_review_permissions(get_project(model), user)
     if not has_case_review_perm:
         return []
-    return [field.name for field in type(model)._meta.fields if field.name.startswith('case_review')]
+    model_class = models.model if isinstance(models, QuerySet) else type(models[0])
+    return [field.name for field in model_class._meta.fields if field.name.startswith('case_review')]
 
 
 def _get_json_for_families(families, user=None, add_individual_guids_field=False, project_guid=None, skip_nested=False, is_analyst=None, has_case_review_perm=None):
@@ -191,7 +283,8 @@ def _get_json_for_families(families, user=None, add_individual_guids_field=False
     Returns:
         array: json objects
     """
-    if not families:
+    use_model_values = _can_get_json_for_model_values(families)
+    if not use_model_values and not families:
         return []
 
     def _get_pedigree_image_url(pedigree_image):
@@ -203,15 +296,21 @@ def _get_json_for_families(families, user=None, add_individual_guids_field=False
         return os.path.join("/media/", pedigree_image) if pedigree_image else None
 
     analyst_users = set(User.objects.filter(groups__name=ANALYST_USER_GROUP) if ANALYST_USER_GROUP else [])
-    def _process_result(result, family):
+    analysed_by_by_family_id = defaultdict(list)
+    for ab in FamilyAnalysedBy.objects.filter(family__in=families).select_related('created_by'):
+        analysed_by_by_family_id[ab.family_id].append(ab)
+    if add_individual_guids_field:
+        individual_guids_by_family_id = _get_related_guids_by_model_id(Individual, 'family', families)
+
+    def _process_result(result, family_id):
         result['analysedBy'] = [{
             'createdBy': {'fullName': ab.created_by.get_full_name(), 'email': ab.created_by.email, 'isAnalyst': ab.created_by in analyst_users},
             'lastModifiedDate': ab.last_modified_date,
-        } for ab in family.familyanalysedby_set.all()]
+        } for ab in analysed_by_by_family_id[family_id]]
         pedigree_image = _get_pedigree_image_url(result.pop('pedigreeImage'))
         result['pedigreeImage'] = pedigree_image
         if add_individual_guids_field:
-            result['individualGuids'] = [i.guid for i in family.individual_set.all()]
+            result['individualGuids'] = individual_guids_by_family_id[family_id]
         if not result['displayName']:
             result['displayName'] = result['familyId']
         if result['assignedAnalyst']:
@@ -222,20 +321,22 @@ def _get_json_for_families(families, user=None, add_individual_guids_field=False
         else:
             result['assignedAnalyst'] = None
 
-    prefetch_related_objects(families, 'assigned_analyst')
-    prefetch_related_objects(families, 'familyanalysedby_set__created_by')
-    if add_individual_guids_field:
-        prefetch_related_objects(families, 'individual_set')
-
     kwargs = {'additional_model_fields': _get_case_review_fields(
-        families[0], has_case_review_perm, user, lambda family: family.project)
+        families, has_case_review_perm, user, lambda family: family.project)
     }
     if project_guid or not skip_nested:
         kwargs.update({'nested_fields': [{'fields': ('project', 'guid'), 'value': project_guid}]})
     else:
         kwargs['additional_model_fields'].append('project_id')
 
-    return _get_json_for_models(families, user=user, is_analyst=is_analyst, process_result=_process_result, **kwargs)
+    if use_model_values:
+        return _get_json_for_model_values(
+            families, user=user, is_analyst=is_analyst, process_result=_process_result, **kwargs)
+
+    prefetch_related_objects(families, 'assigned_analyst')
+    return _get_json_for_models(
+        families, user=user, is_analyst=is_analyst, process_result=lambda result, family: _process_result(result, family.id),
+        **kwargs)
 
 
 def _get_json_for_family(family, user=None, **kwargs):
@@ -266,13 +367,18 @@ def _get_json_for_individuals(individuals, user=None, project_guid=None, family_
         array: array of json objects
     """
 
-    if not individuals:
+    use_model_values = _can_get_json_for_model_values(individuals)
+    if not use_model_values and not individuals:
         return []
 
     def _get_case_review_status_modified_by(modified_by):
         return modified_by.email or modified_by.username if hasattr(modified_by, 'email') else modified_by
 
-    def _process_result(result, individual):
+    if add_sample_guids_field:
+        sample_guids_by_individual_id = _get_related_guids_by_model_id(Sample, 'individual', individuals)
+        igv_sample_guids_by_individual_id = _get_related_guids_by_model_id(IgvSample, 'individual', individuals)
+
+    def _process_result(result, individual_id):
         mother = result.pop('mother', None)
         father = result.pop('father', None)
 
@@ -286,12 +392,12 @@ def _get_json_for_individuals(individuals, user=None, project_guid=None, family_
         })
 
         if add_sample_guids_field:
-            result['sampleGuids'] = [s.guid for s in individual.sample_set.all()]
-            result['igvSampleGuids'] = [s.guid for s in individual.igvsample_set.all()]
+            result['sampleGuids'] = sample_guids_by_individual_id[individual_id]
+            result['igvSampleGuids'] = igv_sample_guids_by_individual_id[individual_id]
 
     kwargs = {
         'additional_model_fields': _get_case_review_fields(
-            individuals[0], has_case_review_perm, user, lambda indiv: indiv.family.project)
+            individuals, has_case_review_perm, user, lambda indiv: indiv.family.project)
     }
     if project_guid or not skip_nested:
         nested_fields = [
@@ -309,15 +415,17 @@ def _get_json_for_individuals(individuals, user=None, project_guid=None, family_
         kwargs['additional_model_fields'] += [
             'features', 'absent_features', 'nonstandard_features', 'absent_nonstandard_features']
 
-    prefetch_related_objects(individuals, 'mother')
-    prefetch_related_objects(individuals, 'father')
-    if 'case_review_status_last_modified_by' in kwargs['additional_model_fields']:
-        prefetch_related_objects(individuals, 'case_review_status_last_modified_by')
-    if add_sample_guids_field:
-        prefetch_related_objects(individuals, 'sample_set')
-        prefetch_related_objects(individuals, 'igvsample_set')
-
-    parsed_individuals = _get_json_for_models(individuals, user=user, is_analyst=is_analyst, process_result=_process_result, **kwargs)
+    if use_model_values:
+        parsed_individuals = _get_json_for_model_values(
+            individuals, user=user, is_analyst=is_analyst, process_result=_process_result, **kwargs)
+    else:
+        prefetch_related_objects(individuals, 'mother')
+        prefetch_related_objects(individuals, 'father')
+        if 'case_review_status_last_modified_by' in kwargs['additional_model_fields']:
+            prefetch_related_objects(individuals, 'case_review_status_last_modified_by')
+        parsed_individuals = _get_json_for_models(
+            individuals, user=user, is_analyst=is_analyst,
+            process_result=lambda result, individual: _process_result(result, individual.id), **kwargs)
     if add_hpo_details:
         all_hpo_ids = set()
         for i in parsed_individuals:
@@ -366,6 +474,8 @@ def get_json_for_samples(samples, project_guid=None, individual_guid=None, skip_
     else:
         kwargs = {'additional_model_fields': ['individual_id']}
 
+    if _can_get_json_for_model_values(samples):
+        return _get_json_for_model_values(samples, guid_key='sampleGuid', **kwargs)
     return _get_json_for_models(samples, guid_key='sampleGuid', **kwargs)
 
 
@@ -457,63 +567,32 @@ def get_json_for_saved_variants_with_tags(saved_variants, include_missing_varian
     missing_ids = set()
     saved_variant_id_map = {var.id: var.guid for var in saved_variants}
 
-    variant_tag_id_map = defaultdict(list)
-    for tag_mapping in VariantTag.saved_variants.through.objects.filter(savedvariant_id__in=saved_variant_id_map.keys()):
-        variant_tag_id_map[tag_mapping.varianttag_id].append(tag_mapping.savedvariant_id)
-    tag_models = VariantTag.objects.filter(id__in=variant_tag_id_map.keys())
-    tag_id_map = {tag.guid: tag.id for tag in tag_models}
-
-    tags = get_json_for_variant_tags(tag_models, add_variant_guids=False)
-    for tag in tags:
-        tag_guid = tag['tagGuid']
-        tag['variantGuids'] = []
-        variant_ids = variant_tag_id_map[tag_id_map[tag_guid]]
-        for variant_id in variant_ids:
-            variant_guid = saved_variant_id_map.get(variant_id)
-            if variant_guid:
-                variants_by_guid[variant_guid]['tagGuids'].append(tag['tagGuid'])
-                tag['variantGuids'].append(variant_guid)
-            else:
-                missing_ids.add(variant_id)
-
-    variant_functional_id_map = defaultdict(list)
-    for functional_mapping in VariantFunctionalData.saved_variants.through.objects.filter(
-            savedvariant_id__in=saved_variant_id_map.keys()):
-        variant_functional_id_map[functional_mapping.variantfunctionaldata_id].append(functional_mapping.savedvariant_id)
-    functional_models = VariantFunctionalData.objects.filter(id__in=variant_functional_id_map.keys())
-    functional_id_map = {tag.guid: tag.id for tag in functional_models}
-
-    functional_data = get_json_for_variant_functional_data_tags(functional_models, add_variant_guids=False)
-    for tag in functional_data:
-        tag_guid = tag['tagGuid']
-        tag['variantGuids'] = []
-        variant_ids = variant_functional_id_map[functional_id_map[tag_guid]]
-        for variant_id in variant_ids:
-            variant_guid = saved_variant_id_map.get(variant_id)
-            if variant_guid:
-                variants_by_guid[variant_guid]['functionalDataGuids'].append(tag['tagGuid'])
-                tag['variantGuids'].append(variant_guid)
-            else:
-                missing_ids.add(variant_id)
-
-    variant_note_id_map = defaultdict(list)
-    for note_mapping in VariantNote.saved_variants.through.objects.filter(savedvariant_id__in=saved_variant_id_map.keys()):
-        variant_note_id_map[note_mapping.variantnote_id].append(note_mapping.savedvariant_id)
-    note_models = VariantNote.objects.filter(id__in=variant_note_id_map.keys())
-    note_id_map = {note.guid: note.id for note in note_models}
-
-    notes = get_json_for_variant_notes(note_models, add_variant_guids=False)
-    for note in notes:
-        note_guid = note['noteGuid']
-        note['variantGuids'] = []
-        variant_ids = variant_note_id_map[note_id_map[note_guid]]
-        for variant_id in variant_ids:
-            variant_guid = saved_variant_id_map.get(variant_id)
-            if variant_guid:
-                variants_by_guid[variant_guid]['noteGuids'].append(note['noteGuid'])
-                note['variantGuids'].append(variant_guid)
-            else:
-                missing_ids.add(variant_id)
+    def _add_variant_guids(key, tag_key, process_tag_json=None):
+        def _process_result(tag_json, saved_variant_ids):
+            if process_tag_json:
+                process_tag_json(tag_json)
+            tag_json['variantGuids'] = []
+            for variant_id in saved_variant_ids:
+                variant_guid = saved_variant_id_map.get(variant_id)
+                if variant_guid:
+                    variants_by_guid[variant_guid][key].append(tag_json[tag_key])
+                    tag_json['variantGuids'].append(variant_guid)
+                else:
+                    missing_ids.add(variant_id)
+        return _process_result
+
+    tags = _get_json_for_saved_variant_tag_models(
+        VariantTag, saved_variant_id_map.keys(), nested_fields=VARIANT_TAG_NESTED_FIELDS, guid_key='tagGuid',
+        process_result=_add_variant_guids('tagGuids', 'tagGuid'))
+
+    functional_data = _get_json_for_saved_variant_tag_models(
+        VariantFunctionalData, saved_variant_id_map.keys(), guid_key='tagGuid',
+        process_result=_add_variant_guids('functionalDataGuids', 'tagGuid', process_tag_json=lambda tag_json: \
+            _add_functional_data_tag_display(tag_json, FUNCTIONAL_DATA_TAG_DISPLAY[tag_json['functionalDataTag']])))
+
+    notes = _get_json_for_saved_variant_tag_models(
+        VariantNote, saved_variant_id_map.keys(), guid_key='noteGuid',
+        process_result=_add_variant_guids('noteGuids', 'noteGuid'))
 
     if include_missing_variants and missing_ids:
         variants_by_guid.update({
@@ -531,6 +610,30 @@ def get_json_for_saved_variants_with_tags(saved_variants, include_missing_varian
     return response
 
 
+def _get_json_for_saved_variant_tag_models(model_class, saved_variant_ids, process_result=None, nested_fields=None, **kwargs):
+    """Returns the json for the tags or notes on the given saved variants. The ids of the saved variants for each tag
+    are aggregated in the same query, so all the tags of a given type are loaded without any per-tag lookups.
+
+    Args:
+        model_class (class): VariantTag, VariantFunctionalData or VariantNote
+        saved_variant_ids (array): ids of the saved variants to get tags for
+        process_result (lambda): Optional function to post-process a given tag json, called with the json and the ids
+            of the given saved variants the tag is on
+    Returns:
+        array: json objects
+    """
+    tags = model_class.objects.filter(saved_variants__id__in=saved_variant_ids).annotate(
+        saved_variant_ids=ArrayAgg('saved_variants__id', ordering='saved_variants__id'))
+
+    def _process_result(tag_json, tag_id):
+        tag_saved_variant_ids = tag_json.pop('savedVariantIds')
+        if process_result:
+            process_result(tag_json, tag_saved_variant_ids)
+
+    nested_fields = (nested_fields or []) + [{'fields': ('saved_variant_ids',)}]
+    return _get_json_for_model_values(tags, nested_fields=nested_fields, process_result=_process_result, **kwargs)
+
+
 def get_json_for_discovery_tags(variants):
     from seqr.views.utils.variant_utils import get_variant_key
     response = {}
@@ -581,6 +684,11 @@ def get_json_for_discovery_tags(variants):
     return discovery_tags, response
 
 
+VARIANT_TAG_NESTED_FIELDS = [
+    {'fields': ('variant_tag_type', field), 'key': field} for field in ['name', 'category', 'color']
+]
+
+
 def get_json_for_variant_tags(tags, add_variant_guids=True):
     """Returns a JSON representation of the given variant tags.
 
@@ -596,8 +704,8 @@ def get_json_for_variant_tags(tags, add_variant_guids=True):
     if add_variant_guids:
         prefetch_related_objects(tags, Prefetch('saved_variants', queryset=SavedVariant.objects.only('guid')))
 
-    nested_fields = [{'fields': ('variant_tag_type', field), 'key': field} for field in ['name', 'category', 'color']]
-    return _get_json_for_models(tags, nested_fields=nested_fields, guid_key='tagGuid', process_result=_process_result)
+    return _get_json_for_models(
+        tags, nested_fields=VARIANT_TAG_NESTED_FIELDS, guid_key='tagGuid', process_result=_process_result)
 
 
 def get_json_for_variant_functional_data_tags(tags, add_variant_guids=True):
@@ -610,12 +718,7 @@ def get_json_for_variant_functional_data_tags(tags, add_variant_guids=True):
     """
 
     def _process_result(tag_json, tag):
-        display_data = json.loads(tag.get_functional_data_tag_display())
-        tag_json.update({
-            'name': tag_json.pop('functionalDataTag'),
-            'metadataTitle': display_data.get('metadata_title', 'Notes'),
-            'color': display_data['color'],
-        })
+        _add_functional_data_tag_display(tag_json, tag.get_functional_data_tag_display())
         if add_variant_guids:
             tag_json['variantGuids'] = [variant.guid for variant in tag.saved_variants.all()]
 
@@ -625,6 +728,20 @@ def get_json_for_variant_functional_data_tags(tags, add_variant_guids=True):
     return _get_json_for_models(tags, guid_key='tagGuid', process_result=_process_result)
 
 
+FUNCTIONAL_DATA_TAG_DISPLAY = {
+    name: tag_json for _, tags in VariantFunctionalData.FUNCTIONAL_DATA_CHOICES for name, tag_json in tags
+}
+
+
+def _add_functional_data_tag_display(tag_json, tag_display):
+    display_data = json.loads(tag_display)
+    tag_json.update({
+        'name': tag_json.pop('functionalDataTag'),
+        'metadataTitle': display_data.get('metadata_title', 'Notes'),
+        'color': display_data['color'],
+    })
+
+
 def get_json_for_variant_functional_data_tag_types():
     functional_tag_types = []
     for category, tags in VariantFunctionalData.FUNCTIONAL_DATA_CHOICES:
@@ -5,7 +5,7 @@ import mock
 from seqr.models import Project, Family, Individual, Sample, IgvSample, SavedVariant, VariantTag, VariantFunctionalData, \
     VariantNote, LocusList, VariantSearch
 from seqr.views.utils.orm_to_json_utils import _get_json_for_user, _get_json_for_project, _get_json_for_family, \
-    _get_json_for_individual, get_json_for_sample, get_json_for_saved_variant, get_json_for_variant_tags, \
+    _get_json_for_families, _get_json_for_individual, _get_json_for_individuals, get_json_for_sample, get_json_for_samples, get_json_for_saved_variant, get_json_for_variant_tags, \
     get_json_for_variant_functional_data_tags, get_json_for_variant_note, get_json_for_locus_list, \
  get_json_for_saved_search, get_json_for_saved_variants_with_tags
 from seqr.views.utils.test_utils import USER_FIELDS, PROJECT_FIELDS, FAMILY_FIELDS, INTERNAL_FAMILY_FIELDS, \
@@ -88,6 +88,44 @@ class JSONUtilsTest(TestCase):
 
         self.assertSetEqual(set(json.keys()), IGV_SAMPLE_FIELDS)
 
+    @mock.patch('seqr.views.utils.permissions_utils.ANALYST_PROJECT_CATEGORY', 'analyst-projects')
+    @mock.patch('seqr.views.utils.permissions_utils.ANALYST_USER_GROUP')
+    def test_json_for_model_values(self, mock_analyst_group):
+        # Unevaluated querysets are serialized from their values, which should match serializing the models. Both are
+        # ordered explicitly, as the values query joins nested tables and so may return rows in a different order
+        user = User.objects.get(username='test_user')
+        mock_analyst_group.__bool__.return_value = True
+        mock_analyst_group.resolve_expression.return_value = 'analysts'
+
+        for kwargs in [
+            {}, {'user': user, 'add_individual_guids_field': True}, {'is_analyst': True, 'has_case_review_perm': True},
+            {'project_guid': 'R0001_1kg'}, {'skip_nested': True},
+        ]:
+            self.assertListEqual(
+                _get_json_for_families(Family.objects.order_by('id'), **kwargs),
+                _get_json_for_families(list(Family.objects.order_by('id')), **kwargs),
+            )
+
+        for kwargs in [
+            {}, {'user': user, 'add_sample_guids_field': True, 'add_hpo_details': True},
+            {'is_analyst': True, 'has_case_review_perm': True, 'family_fields': ['family_id']},
+            {'project_guid': 'R0001_1kg', 'family_guid': 'F000001_1'}, {'skip_nested': True},
+        ]:
+            self.assertListEqual(
+                _get_json_for_individuals(Individual.objects.order_by('id'), **kwargs),
+                _get_json_for_individuals(list(Individual.objects.order_by('id')), **kwargs),
+            )
+
+        for sample_model in [Sample, IgvSample]:
+            for kwargs in [{}, {'project_guid': 'R0001_1kg', 'individual_guid': 'I000001_na19675'}, {'skip_nested': True}]:
+                self.assertListEqual(
+                    get_json_for_samples(sample_model.objects.order_by('id'), **kwargs),
+                    get_json_for_samples(list(sample_model.objects.order_by('id')), **kwargs),
+                )
+
+        self.assertListEqual(_get_json_for_families(Family.objects.none()), [])
+        self.assertListEqual(_get_json_for_individuals(Individual.objects.none(), user=user), [])
+
     def test_json_for_saved_variant(self):
         variant = SavedVariant.objects.get(guid='SV0000001_2103343353_r0390_100')
         json = get_json_for_saved_variant(variant)
@@ -116,7 +154,9 @@ class JSONUtilsTest(TestCase):
             'VFD0000026_1248367227_r0390_10'}
 
         variants = SavedVariant.objects.filter(guid__in=[variant_guid_1, variant_guid_2])
-        json = get_json_for_saved_variants_with_tags(variants)
+        # saved variants, their families, and one aggregated query each for tags, functional data and notes
+        with self.assertNumQueries(5):
+            json = get_json_for_saved_variants_with_tags(variants)
 
         keys = {'variantTagsByGuid', 'variantNotesByGuid', 'variantFunctionalDataByGuid', 'savedVariantsByGuid'}
         self.assertSetEqual(set(json.keys()), keys)
@@ -7,6 +7,9 @@
 
 """
 import collections
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
 import logging
 import os
 import random
@@ -22,35 +25,77 @@ from settings import BASE_DIR
 
 logger = logging.getLogger(__name__)
 
+PEDIGREE_IMAGE_MAX_WORKERS = 4
+
 
 def update_pedigree_images(families, user, project_guid=None):
     """Regenerate pedigree image for one or more families
 
+    Images are only regenerated for families whose pedigree has changed since their current image was generated, and
+    HaploPainter is run for multiple families in parallel.
+
     Args:
          families (list): List of Django ORM models for families to update.
     """
+    families_by_id = {family.id: family for family in families}
+    if not families_by_id:
+        return
+
+    individuals_by_family_guid = collections.defaultdict(list)
+    for individual_json in _get_json_for_individuals(
+            Individual.objects.filter(family_id__in=families_by_id.keys()), project_guid=project_guid):
+        individuals_by_family_guid[individual_json['familyGuid']].append(individual_json)
+
+    families_to_update = []
+    for family in families_by_id.values():
+        parsed_individuals = _get_parsed_individuals(family, individuals_by_family_guid[family.guid], user)
+        if parsed_individuals:
+            families_to_update.append((family, *parsed_individuals))
+
+    if not families_to_update:
+        return
+
+    # HaploPainter runs in a subprocess, so threads are sufficient to render images in parallel. Database updates are
+    # made from this thread once each image is generated
+    with ThreadPoolExecutor(max_workers=min(PEDIGREE_IMAGE_MAX_WORKERS, len(families_to_update))) as executor:
+        generated_images = executor.map(
+            _generate_pedigree_image,
+            [family.family_id for family, _, _ in families_to_update],
+            [individual_records for _, individual_records, _ in families_to_update],
+        )
+        for (family, _, pedigree_hash), generated_image in zip(families_to_update, generated_images):
+            _save_generated_pedigree_image(family, pedigree_hash, user, *generated_image)
+
 
-    for family in families:
-        _update_pedigree_image(family, user, project_guid=project_guid)
+def _get_pedigree_hash(family, individual_records):
+    # The family id is drawn in the image, so renaming the family also requires a new image
+    pedigree = sorted(
+        [individual[key] or '' for key in ['individualId', 'paternalId', 'maternalId', 'sex', 'affected']]
+        for individual in individual_records
+    )
+    return hashlib.md5(json.dumps([family.family_id, pedigree]).encode('utf-8')).hexdigest()
 
 
-def _get_parsed_individuals(family, user, project_guid=None):
-    """Uses HaploPainter to (re)generate the pedigree image for the given family.
+def _get_parsed_individuals(family, individual_records, user):
+    """Parses the given individual json into the .fam file records used to generate the pedigree image for the given
+    family.
 
     Args:
          family (object): seqr Family model.
+         individual_records (list): json for the family's individuals
+    Returns:
+        tuple: the parsed records and a hash of the pedigree, or None if the family's image does not need to be updated
     """
-    individuals = Individual.objects.filter(family=family)
-
-    if len(individuals) < 2:
+    if len(individual_records) < 2:
         _save_pedigree_image_file(family, None, user)
         return None
 
-    # convert individuals to json
-    individual_records = {
-        individual['individualId']: individual for individual in
-        _get_json_for_individuals(individuals, project_guid=project_guid, family_guid=family.guid)
-    }
+    pedigree_hash = _get_pedigree_hash(family, individual_records)
+    if family.pedigree_image and family.pedigree_image_hash == pedigree_hash and \
+            family.pedigree_image.storage.exists(family.pedigree_image.name):
+        return None
+
+    individual_records = {individual['individualId']: individual for individual in individual_records}
 
     # compute a map of parent ids to list of children
     parent_ids_to_children_map = collections.defaultdict(list)
@@ -100,23 +145,17 @@ def _get_parsed_individuals(family, user, project_guid=None):
             'sex': SEX_TO_FAM_FILE_VALUE[individual_records[individual_id]['sex']],
             'affected': AFFECTED_STATUS_TO_FAM_FILE_VALUE[individual_records[individual_id]['affected']],
         } for individual_id in sorted(individual_records.keys())
-    ]
+    ], pedigree_hash
 
 
-def _update_pedigree_image(family, user, project_guid=None):
-    """Uses HaploPainter to (re)generate the pedigree image for the given family.
+def _generate_pedigree_image(family_id, individual_records):
+    """Uses HaploPainter to generate the pedigree image for the given family. Does not access the database, so it is
+    safe to run outside the request thread.
 
-    Args:
-         family (object): seqr Family model.
+    Returns:
+        tuple: the path to the generated png, the HaploPainter process, and the rows of the .fam file
     """
-
-    individual_records = _get_parsed_individuals(family, user, project_guid)
-    if not individual_records:
-        return
-
-    # run HaploPainter to generate the pedigree image
     png_file_path = os.path.join(tempfile.gettempdir(), "pedigree_image_%s.png" % _random_string(10))
-    family_id = family.family_id
     ped_file_rows = [
         [family_id] + [indiv[key] for key in ['individualId', 'paternalId', 'maternalId', 'sex', 'affected']]
         for indiv in individual_records
@@ -137,6 +176,11 @@ def _update_pedigree_image(family, user, project_guid=None):
         ]
         completed_process = subprocess.run(haplopainter_command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
 
+    return png_file_path, completed_process, ped_file_rows
+
+
+def _save_generated_pedigree_image(family, pedigree_hash, user, png_file_path, completed_process, ped_file_rows):
+    family_id = family.family_id
     if not os.path.isfile(png_file_path):
         logger.error('Failed to generate pedigree image for family {}: {}'.format(family_id, completed_process.stdout),
                      extra={'detail': {'ped_file': ped_file_rows}})
@@ -149,19 +193,24 @@ def _update_pedigree_image(family, user, project_guid=None):
     elif completed_process.stdout:
         logger.info(completed_process.stdout)
 
-    _save_pedigree_image_file(family, png_file_path, user)
+    _save_pedigree_image_file(family, png_file_path, user, pedigree_hash=pedigree_hash)
 
     os.remove(png_file_path)
 
 
-def _save_pedigree_image_file(family, png_file_path, user):
+def _save_pedigree_image_file(family, png_file_path, user, pedigree_hash=None):
+    if not (png_file_path or family.pedigree_image):
+        return
+
+    family.pedigree_image_hash = pedigree_hash
     if png_file_path:
         with open(png_file_path, 'rb') as pedigree_image_file:
             family.pedigree_image.save(os.path.basename(png_file_path), File(pedigree_image_file))
     else:
         family.pedigree_image = None
     family.save()
-    log_model_update(logger, family, user, update_type='update', update_fields=['pedigree_image'])
+    log_model_update(
+        logger, family, user, update_type='update', update_fields=['pedigree_image', 'pedigree_image_hash'])
 
 
 def _random_string(size=10):
@@ -40,7 +40,6 @@ class PedigreeImageTest(TestCase):
         pedigree_image = test_families.first().pedigree_image
         self.assertTrue(bool(pedigree_image))
         self.assertEqual(pedigree_image.name, 'pedigree_images/pedigree_image_123456.png')
-        os.remove(pedigree_image.path)
         mock_run.assert_called_with(
             ['perl', '/seqr/management/commands/HaploPainter1.043.pl', '-b', '-outformat', 'png', '-pedfile', 'temp.fam', '-family', '1', '-outfile', '/tmp/pedigree_image_123456.png'],
             stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
@@ -57,6 +56,28 @@ class PedigreeImageTest(TestCase):
         mock_logger.warning.assert_not_called()
         mock_logger.error.assert_not_called()
 
+        # Do not regenerate unchanged pedigrees
+        mock_run.reset_mock()
+        update_pedigree_images([test_families.first(), test_families.first()], None)
+        mock_run.assert_not_called()
+        self.assertEqual(test_families.first().pedigree_image.name, pedigree_image.name)
+        os.remove(pedigree_image.path)
+
+        # Regenerate when the family is renamed, as the family id is included in the image
+        test_families.update(family_id='1_renamed')
+        mock_logger.reset_mock()
+        update_pedigree_images(test_families, None)
+        mock_run.assert_called_with(
+            ['perl', '/seqr/management/commands/HaploPainter1.043.pl', '-b', '-outformat', 'png', '-pedfile', 'temp.fam', '-family', '1_renamed', '-outfile', '/tmp/pedigree_image_123456.png'],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+        mock_logger.info.assert_called_with('update Family F000001_1', extra={'user': None, 'db_update': {
+            'dbEntity': 'Family', 'entityId': 'F000001_1', 'updateType': 'update',
+            'updateFields': ['pedigree_image', 'pedigree_image_hash'],
+        }})
+        os.remove(test_families.first().pedigree_image.path)
+        test_families.update(family_id='1')
+
         # Create placeholder when only has one parent
         Sample.objects.get(guid='S000130_na19678').delete()
         Individual.objects.get(individual_id='NA19678').delete()
@@ -1,11 +1,11 @@
 import logging
-import redis
 
 from seqr.models import SavedVariant, VariantSearchResults
-from seqr.utils.elasticsearch.utils import get_es_variants_for_variant_ids
+from seqr.utils.elasticsearch.utils import get_es_variants_for_variant_ids, clear_local_index_metadata, \
+    get_search_results_fingerprints
 from seqr.utils.gene_utils import get_genes_for_variants
+from seqr.utils.redis_utils import get_redis_client
 from seqr.views.utils.json_to_orm_utils import update_model_from_json
-from settings import REDIS_SERVICE_HOSTNAME
 
 logger = logging.getLogger(__name__)
 
@@ -41,16 +41,20 @@ def update_project_saved_variant_json(project, family_id=None, user=None):
 
 def reset_cached_search_results(project, reset_index_metadata=False):
     try:
-        redis_client = redis.StrictRedis(host=REDIS_SERVICE_HOSTNAME, socket_connect_timeout=3)
+        redis_client = get_redis_client()
         keys_to_delete = []
         if project:
-            result_guids = [res.guid for res in VariantSearchResults.objects.filter(families__project=project)]
-            for guid in result_guids:
-                keys_to_delete += redis_client.keys(pattern='search_results__{}*'.format(guid))
+            # Cached results are shared between all searches with the same fingerprint
+            fingerprints = set(get_search_results_fingerprints(
+                VariantSearchResults.objects.filter(families__project=project).distinct().select_related('variant_search')
+            ).values())
+            for fingerprint in sorted(fingerprints):
+                keys_to_delete += redis_client.keys(pattern='search_results__{}*'.format(fingerprint))
         else:
             keys_to_delete = redis_client.keys(pattern='search_results__*')
         if reset_index_metadata:
             keys_to_delete += redis_client.keys(pattern='index_metadata__*')
+            clear_local_index_metadata()
         if keys_to_delete:
             redis_client.delete(*keys_to_delete)
             logger.info('Reset {} cached results'.format(len(keys_to_delete)))
@@ -50,6 +50,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'seqr.utils.middleware.JsonGZipMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -295,6 +296,9 @@ if ELASTICSEARCH_CA_PATH:
 else:
     ES_SSL_CONTEXT = None
 
+# Multi-index searches are sent as a single multi-search request unless concurrent per-index searches are enabled
+ELASTICSEARCH_MAX_CONCURRENT_SEARCHES = int(os.environ.get('ELASTICSEARCH_MAX_CONCURRENT_SEARCHES', 1))
+
 KIBANA_SERVER = '{host}:{port}'.format(
     host=os.environ.get('KIBANA_SERVICE_HOSTNAME', 'localhost'),
     port=os.environ.get('KIBANA_SERVICE_PORT', 5601)
@@ -302,6 +306,10 @@ KIBANA_SERVER = '{host}:{port}'.format(
 KIBANA_ELASTICSEARCH_PASSWORD = os.environ.get('KIBANA_ES_PASSWORD')
 
 REDIS_SERVICE_HOSTNAME = os.environ.get('REDIS_SERVICE_HOSTNAME', 'localhost')
+REDIS_SERVICE_PORT = int(os.environ.get('REDIS_SERVICE_PORT', 6379))
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+REDIS_SOCKET_CONNECT_TIMEOUT = int(os.environ.get('REDIS_SOCKET_CONNECT_TIMEOUT', 3))
+REDIS_SOCKET_TIMEOUT = int(os.environ.get('REDIS_SOCKET_TIMEOUT', 10))
 
 # Matchmaker
 MME_DEFAULT_CONTACT_NAME = 'Samantha Baxter'